@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+告警历史环形缓冲区
+
+固定容量，时间戳与id存放在预分配的数组中，写满后覆盖最旧的记录。
+时间戳与id都单调递增，时间窗口和游标查询用二分查找定位，
+套利结果只保存对象引用，读取时才转换为字典。
+"""
+
+import bisect
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from models import ArbitrageResult
+
+
+class _RingView:
+    """按逻辑顺序（最旧到最新）访问环形数组，供 bisect 使用"""
+
+    def __init__(self, values: array, start: int, size: int):
+        self.values = values
+        self.start = start
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int):
+        return self.values[(self.start + index) % len(self.values)]
+
+
+class AlertHistory:
+    """固定容量的告警历史（线程安全）"""
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = max(1, capacity)
+        self._timestamps = array('d', bytes(8 * self.capacity))
+        self._ids = array('q', bytes(8 * self.capacity))
+        self._types: List[Optional[str]] = [None] * self.capacity
+        self._messages: List[Optional[str]] = [None] * self.capacity
+        self._results: List[Optional[ArbitrageResult]] = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, result: ArbitrageResult, message: str, alert_type: str,
+               timestamp: Optional[float] = None) -> int:
+        """追加一条告警，返回其id"""
+        with self._lock:
+            now = time.time() if timestamp is None else timestamp
+            if self._size:
+                # 系统时钟回拨时保持时间戳单调，二分查找依赖有序
+                now = max(now, self._timestamps[(self._start + self._size - 1) % self.capacity])
+
+            if self._size < self.capacity:
+                slot = (self._start + self._size) % self.capacity
+                self._size += 1
+            else:
+                slot = self._start
+                self._start = (self._start + 1) % self.capacity
+
+            alert_id = self._next_id
+            self._next_id += 1
+            self._timestamps[slot] = now
+            self._ids[slot] = alert_id
+            self._types[slot] = alert_type
+            self._messages[slot] = message
+            self._results[slot] = result
+            return alert_id
+
+    def _materialize(self, index: int) -> Dict[str, Any]:
+        # 调用方已持有锁，index 为逻辑下标
+        slot = (self._start + index) % self.capacity
+        return {
+            'id': self._ids[slot],
+            'timestamp': datetime.fromtimestamp(self._timestamps[slot]).isoformat(),
+            'result': self._results[slot].to_dict(),
+            'message': self._messages[slot],
+            'alert_type': self._types[slot]
+        }
+
+    def _index_since(self, since: float) -> int:
+        return bisect.bisect_left(_RingView(self._timestamps, self._start, self._size), since)
+
+    def count_since(self, since: float) -> int:
+        """时间戳不早于 since 的告警数量，O(log n)"""
+        with self._lock:
+            return self._size - self._index_since(since)
+
+    def since(self, since: float) -> List[Dict[str, Any]]:
+        """时间戳不早于 since 的告警（从旧到新），O(log n + k)"""
+        with self._lock:
+            return [self._materialize(i) for i in range(self._index_since(since), self._size)]
+
+    def page(self, after_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """id大于 after_id 的最多 limit 条告警（从旧到新）"""
+        with self._lock:
+            start = 0
+            if after_id is not None:
+                start = bisect.bisect_right(_RingView(self._ids, self._start, self._size), after_id)
+            return [self._materialize(i) for i in range(start, min(start + limit, self._size))]
+
+    def clear(self):
+        with self._lock:
+            self._types = [None] * self.capacity
+            self._messages = [None] * self.capacity
+            self._results = [None] * self.capacity
+            self._start = 0
+            self._size = 0
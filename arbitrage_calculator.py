@@ -1,8 +1,15 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Callable
+from concurrent.futures import ThreadPoolExecutor
 from models import ArbitrageResult, ArbitrageStep
 from exchange_service import ExchangeService
-from config import MonitorConfig
+from config import (MonitorConfig, USE_ASYNC_PIPELINE, BROWSER_TASK_TIMEOUT, ROUTE_CYCLES,
+                    OPTIMIZE_MIN_AMOUNT, OPTIMIZE_MAX_AMOUNT, OPTIMIZE_OBJECTIVE, OPTIMIZE_MIN_PROFIT,
+                    OPTIMIZE_TOLERANCE, OPTIMIZE_MAX_EVALUATIONS, OPTIMIZE_BRACKET_POINTS)
+from route_graph import RouteGraph, build_cycles
+from size_optimizer import TradeSizeOptimizer, SizeSearchResult
+from metrics import STAGE_SECONDS
+import asyncio
 import traceback
 
 class ArbitrageCalculator:
@@ -11,9 +18,29 @@ class ArbitrageCalculator:
     def __init__(self):
         self.exchange_service = ExchangeService()
         self.config = MonitorConfig()
+        self.route_graph = RouteGraph(build_cycles(ROUTE_CYCLES), self.config.ladder_max_workers)
+        self.use_async_pipeline = USE_ASYNC_PIPELINE
+        self._async_runner = None
+        self._async_service = None
+        self._background_tasks = set()
     
-    def calculate_arbitrage(self, initial_amount: float = None) -> Optional[ArbitrageResult]:
-        """计算套利机会"""
+    def calculate_arbitrage(self, initial_amount: float = None,
+                            on_result: Callable[[ArbitrageResult], None] = None) -> Optional[ArbitrageResult]:
+        """计算套利机会
+        
+        on_result（如保存结果）在得到结果后调用：异步流水线中在线程里后台执行，与收尾工作重叠；
+        同步流水线中在返回前执行
+        """
+        with STAGE_SECONDS.time(stage='calculate_arbitrage'):
+            if self.use_async_pipeline:
+                # 同步调用方的薄封装：在共享事件循环上执行异步流水线
+                return self.run_async(self.calculate_arbitrage_async(initial_amount, on_result))
+            result = self._calculate_arbitrage(initial_amount)
+        if result is not None and on_result is not None:
+            on_result(result)
+        return result
+    
+    def _calculate_arbitrage(self, initial_amount: float = None) -> Optional[ArbitrageResult]:
         if initial_amount is None:
             initial_amount = self.config.initial_amount
         
@@ -50,36 +77,282 @@ class ArbitrageCalculator:
                 return None
             
             steps.append(step3)
-            final_amount = step3.output_amount
             print(f"第三步完成: {step3.input_amount} USDE → {step3.output_amount} USDT")
             
-            # 计算收益
-            profit_loss = final_amount - initial_amount
-            profit_percentage = (profit_loss / initial_amount) * 100
-            
-            # 计算年化收益率 (基于7天期收益)
-            # 公式: (收益 / 7 * 365) / 初始金额 * 100
-            annualized_return = (profit_loss / 7 * 365) / initial_amount * 100
-            
-            result = ArbitrageResult(
-                initial_amount=initial_amount,
-                final_amount=final_amount,
-                profit_loss=profit_loss,
-                profit_percentage=profit_percentage,
-                annualized_return=annualized_return,
-                steps=steps,
-                calculation_time=datetime.now()
+            return self._build_result(initial_amount, steps)
+            
+        except Exception as e:
+            print(f"计算套利时出错: {e}")
+            print(traceback.format_exc())
+            return None
+    
+    def calculate_ladder(self, amounts: List[float] = None) -> List[ArbitrageResult]:
+        """并发计算多个金额阶梯的套利结果
+        
+        各阶梯共享同一个 ExchangeService（浏览器池、RPC连接）：
+        第一、三步的报价并发获取，第二步所有阶梯合并为一次批量RPC调用。
+        返回成功计算的结果，按输入金额顺序排列
+        """
+        with STAGE_SECONDS.time(stage='calculate_ladder'):
+            return self._calculate_ladder(amounts)
+    
+    def _calculate_ladder(self, amounts: List[float] = None) -> List[ArbitrageResult]:
+        if amounts is None:
+            amounts = self.config.ladder_amounts
+        if not amounts:
+            return []
+        
+        print(f"开始计算金额阶梯: {amounts}")
+        
+        try:
+            workers = min(len(amounts), self.config.ladder_max_workers)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ladder') as executor:
+                # 第一步：USDT → SUSDE（并发）
+                rungs = [[step] for step in executor.map(self.exchange_service.get_usdt_to_susde, amounts)]
+                
+                # 第二步：SUSDE → USDE（一次批量调用）
+                pending = [rung for rung in rungs if rung[-1]]
+                step2s = self.exchange_service.get_susde_to_usde_many([rung[-1].output_amount for rung in pending])
+                for rung, step2 in zip(pending, step2s):
+                    rung.append(step2)
+                
+                # 第三步：USDE → USDT（并发）
+                pending = [rung for rung in pending if rung[-1]]
+                step3s = executor.map(self.exchange_service.get_usde_to_usdt, [rung[-1].output_amount for rung in pending])
+                for rung, step3 in zip(pending, step3s):
+                    rung.append(step3)
+        
+        except Exception as e:
+            print(f"计算金额阶梯时出错: {e}")
+            print(traceback.format_exc())
+            return []
+        
+        results = []
+        for amount, rung in zip(amounts, rungs):
+            if len(rung) == 3 and rung[-1]:
+                results.append(self._build_result(amount, rung))
+            else:
+                print(f"阶梯 {amount} USDT 第{len(rung)}步失败")
+        
+        print(f"金额阶梯计算完成: {len(results)}/{len(amounts)} 个成功")
+        return results
+    
+    def calculate_routes(self, initial_amount: float = None) -> List[ArbitrageResult]:
+        """对所有配置的套利路径求值，路径之间共享相同兑换边的报价
+        
+        返回成功计算的结果，按配置的路径顺序排列
+        """
+        with STAGE_SECONDS.time(stage='calculate_routes'):
+            if initial_amount is None:
+                initial_amount = self.config.initial_amount
+            
+            print(f"开始计算套利路径: {[cycle.name for cycle in self.route_graph.cycles]}")
+            try:
+                route_steps = self.route_graph.evaluate(self.exchange_service, initial_amount)
+            except Exception as e:
+                print(f"计算套利路径时出错: {e}")
+                print(traceback.format_exc())
+                return []
+            
+            results = []
+            for name, steps in route_steps.items():
+                if steps:
+                    result = self._build_result(initial_amount, steps)
+                    result.route_name = name
+                    results.append(result)
+            return results
+    
+    def estimate_arbitrage(self, initial_amount: float = None) -> Optional[ArbitrageResult]:
+        """按价格影响曲线估算套利结果，不打开浏览器
+        
+        第一、三步由曲线计算，第二步仍按金库状态计算。曲线不可用（未就绪、已过期）、
+        金额超出曲线采样范围或未启用曲线时返回None，不会为估算发起报价
+        """
+        impact_model = self.exchange_service.impact_model
+        if impact_model is None:
+            return None
+        if initial_amount is None:
+            initial_amount = self.config.initial_amount
+        
+        try:
+            quote1 = impact_model.estimate('USDT_TO_SUSDE', initial_amount)
+            if not quote1:
+                return None
+            step2 = self.exchange_service.get_susde_to_usde(quote1['output_amount'])
+            if not step2:
+                return None
+            quote3 = impact_model.estimate('USDE_TO_USDT', step2.output_amount)
+            if not quote3:
+                return None
+        except Exception as e:
+            print(f"按曲线估算套利时出错: {e}")
+            print(traceback.format_exc())
+            return None
+        
+        steps = [
+            ArbitrageStep(step_number=1, from_token="USDT", to_token="SUSDE",
+                          input_amount=initial_amount, output_amount=quote1['output_amount'],
+                          price_impact=quote1['price_impact'], route="曲线估算"),
+            step2,
+            ArbitrageStep(step_number=3, from_token="USDE", to_token="USDT",
+                          input_amount=step2.output_amount, output_amount=quote3['output_amount'],
+                          price_impact=quote3['price_impact'], route="曲线估算")
+        ]
+        return self._build_result(initial_amount, steps)
+    
+    def optimize_trade_size(self, min_amount: float = None, max_amount: float = None,
+                            objective: str = None, min_profit: float = None) -> SizeSearchResult:
+        """在金额上下限之间搜索最优交易金额
+        
+        先按等比金额计算一次阶梯找到最优区间，再黄金分割逐个细化；每个金额只计算一次。
+        objective 为 'profit'（最大绝对收益）或 'apy'（收益不低于 min_profit 时最大年化收益率）
+        """
+        optimizer = TradeSizeOptimizer(
+            self.calculate_ladder,
+            OPTIMIZE_MIN_AMOUNT if min_amount is None else min_amount,
+            OPTIMIZE_MAX_AMOUNT if max_amount is None else max_amount,
+            objective or OPTIMIZE_OBJECTIVE,
+            OPTIMIZE_MIN_PROFIT if min_profit is None else min_profit,
+            OPTIMIZE_TOLERANCE, OPTIMIZE_MAX_EVALUATIONS, OPTIMIZE_BRACKET_POINTS
+        )
+        with STAGE_SECONDS.time(stage='optimize_trade_size'):
+            print(f"开始搜索最优金额: {optimizer.min_amount} - {optimizer.max_amount} USDT, 目标 {optimizer.objective}")
+            search = optimizer.search()
+        
+        if search.optimum:
+            print(f"最优金额 {search.optimum.initial_amount} USDT: 收益 {search.optimum.profit_loss:.2f}, "
+                  f"年化 {search.optimum.annualized_return:.2f}%（计算 {search.evaluations} 个金额）")
+        else:
+            print(f"未找到满足条件的金额（计算 {search.evaluations} 个金额）")
+        return search
+    
+    def run_async(self, coro, timeout: float = BROWSER_TASK_TIMEOUT * 2):
+        """在后台事件循环上执行协程并等待结果"""
+        if self._async_runner is None:
+            from async_exchange_service import AsyncRunner
+            self._async_runner = AsyncRunner()
+        return self._async_runner.run(coro, timeout)
+    
+    @property
+    def async_service(self):
+        if self._async_service is None:
+            from async_exchange_service import AsyncExchangeService
+            self._async_service = AsyncExchangeService(impact_model=self.exchange_service.impact_model)
+        return self._async_service
+    
+    async def calculate_arbitrage_async(self, initial_amount: float = None,
+                                        on_result: Callable[[ArbitrageResult], None] = None) -> Optional[ArbitrageResult]:
+        """异步计算套利机会
+        
+        第一步报价、金库状态读取和第三步页面预热同时进行；
+        on_result（同步函数，如保存数据库）在线程中后台执行，不阻塞返回
+        """
+        if initial_amount is None:
+            initial_amount = self.config.initial_amount
+        
+        service = self.async_service
+        prewarm = None
+        try:
+            print(f"开始异步计算套利，初始金额: {initial_amount} USDT")
+            
+            prewarm = asyncio.ensure_future(service.open_quote_page('USDE_TO_USDT', prewarm=True))
+            step1, state = await asyncio.gather(
+                service.get_usdt_to_susde(initial_amount),
+                service.read_vault_state()
             )
+            if not step1:
+                print("第一步USDT → SUSDE失败")
+                return None
             
-            print(f"套利计算完成:")
-            print(f"初始: {initial_amount} USDT")
-            print(f"最终: {final_amount} USDT") 
-            print(f"收益: {profit_loss:.3f} USDT ({profit_percentage:.2f}%)")
-            print(f"年化收益率: {annualized_return:.2f}%")
+            step2 = service.get_susde_to_usde(step1.output_amount, state)
             
-            return result
+            step3 = await service.get_usde_to_usdt(step2.output_amount, await prewarm)
+            prewarm = None
+            if not step3:
+                print("第三步USDE → USDT失败")
+                return None
+            
+            result = self._build_result(initial_amount, [step1, step2, step3])
             
+            if on_result is not None:
+                task = asyncio.ensure_future(asyncio.to_thread(self._handle_result, on_result, result))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            
+            return result
+        
         except Exception as e:
-            print(f"计算套利时出错: {e}")
+            print(f"异步计算套利时出错: {e}")
             print(traceback.format_exc())
             return None
+        finally:
+            if prewarm is not None:
+                page = await prewarm
+                if page is not None:
+                    await page.close()
+    
+    @staticmethod
+    def _handle_result(on_result: Callable[[ArbitrageResult], None], result: ArbitrageResult):
+        try:
+            on_result(result)
+        except Exception as e:
+            print(f"处理计算结果时出错: {e}")
+            print(traceback.format_exc())
+    
+    async def _wait_background_tasks(self):
+        if self._background_tasks:
+            await asyncio.gather(*list(self._background_tasks), return_exceptions=True)
+    
+    async def calculate_ladder_async(self, amounts: List[float] = None,
+                                     on_result: Callable[[ArbitrageResult], None] = None) -> List[ArbitrageResult]:
+        """异步并发计算金额阶梯，每个阶梯完成后立即交给 on_result 处理"""
+        if amounts is None:
+            amounts = self.config.ladder_amounts
+        
+        rung_results = await asyncio.gather(
+            *(self.calculate_arbitrage_async(amount, on_result) for amount in amounts)
+        )
+        return [result for result in rung_results if result]
+    
+    def close(self):
+        """释放同步与异步流水线的资源"""
+        if self._async_service is not None:
+            try:
+                # 先等待后台的结果处理（如保存）完成
+                self.run_async(self._wait_background_tasks(), timeout=10)
+                self.run_async(self._async_service.close(), timeout=10)
+            except Exception as e:
+                print(f"关闭异步服务失败: {e}")
+        if self._async_runner is not None:
+            self._async_runner.close()
+        self.exchange_service.close()
+    
+    def _build_result(self, initial_amount: float, steps: List[ArbitrageStep]) -> ArbitrageResult:
+        """根据各步骤结果计算收益"""
+        final_amount = steps[-1].output_amount
+        
+        # 计算收益
+        profit_loss = final_amount - initial_amount
+        profit_percentage = (profit_loss / initial_amount) * 100
+        
+        # 计算年化收益率 (基于7天期收益)
+        # 公式: (收益 / 7 * 365) / 初始金额 * 100
+        annualized_return = (profit_loss / 7 * 365) / initial_amount * 100
+        
+        result = ArbitrageResult(
+            initial_amount=initial_amount,
+            final_amount=final_amount,
+            profit_loss=profit_loss,
+            profit_percentage=profit_percentage,
+            annualized_return=annualized_return,
+            steps=steps,
+            calculation_time=datetime.now()
+        )
+        
+        print(f"套利计算完成:")
+        print(f"初始: {initial_amount} USDT")
+        print(f"最终: {final_amount} USDT") 
+        print(f"收益: {profit_loss:.3f} USDT ({profit_percentage:.2f}%)")
+        print(f"年化收益率: {annualized_return:.2f}%")
+        
+        return result
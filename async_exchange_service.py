@@ -0,0 +1,419 @@
+"""
+异步交易所服务
+
+基于 async Playwright、AsyncWeb3 和 aiohttp，所有报价、区块读取在同一个事件循环上并发执行。
+AsyncRunner 在后台线程中运行事件循环，供同步调用方提交协程。
+"""
+
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+from eth_abi import decode as abi_decode
+from web3 import AsyncWeb3, AsyncHTTPProvider
+
+from config import (INFURA_URL, ONEINCH_URLS, SUSDE_ABI, MULTICALL3_ADDRESS, MULTICALL3_ABI,
+                    QUOTE_PROVIDERS, QUOTE_CAPTURE_TIMEOUT_MS, QUOTE_RESPONSE_URL_PATTERN,
+                    AGGREGATOR_API_URL, AGGREGATOR_API_KEY, AGGREGATOR_TIMEOUT,
+                    ASYNC_MAX_PAGES, BROWSER_MAX_QUOTES, RPC_TIMEOUT, TokenConfig)
+from metrics import STAGE_SECONDS, EXTRACTION_METHOD, record_leg
+from models import ArbitrageStep
+from impact_curve import ImpactModel
+from onchain_reader import VaultState
+from page_profile import PageProfile, RequestStats
+from quote_capture import extract_quote, to_raw_amount, from_raw_amount
+from quote_providers import pair_tokens
+
+
+class AsyncRunner:
+    """在后台线程中运行的事件循环，同步代码通过 run() 提交协程"""
+
+    def __init__(self, name: str = 'async-pipeline'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """提交协程并阻塞等待结果；超时时取消协程，释放其占用的页面与浏览器上下文"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(5)
+
+
+class QuotePage:
+    """已打开并定位到输入框的报价页面，可提前预热
+
+    页面在整个生命周期内占用一个页面槽位和所属浏览器的引用，close() 时释放
+    """
+
+    def __init__(self, pair: str, context, page, input_field, stats: RequestStats,
+                 release: Callable[[], Awaitable[None]]):
+        self.pair = pair
+        self.context = context
+        self.page = page
+        self.input_field = input_field
+        self.stats = stats
+        self._release = release
+
+    async def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+        await release()
+
+
+class AsyncExchangeService:
+    """异步交易所服务"""
+
+    def __init__(self, max_pages: int = ASYNC_MAX_PAGES, impact_model: Optional[ImpactModel] = None):
+        self.web3 = AsyncWeb3(AsyncHTTPProvider(INFURA_URL, request_kwargs={'timeout': aiohttp.ClientTimeout(RPC_TIMEOUT)},
+                                                cache_allowed_requests=True))
+        self.vault = self.web3.eth.contract(
+            address=AsyncWeb3.to_checksum_address(TokenConfig.SUSDE['address']),
+            abi=SUSDE_ABI
+        )
+        self.multicall = self.web3.eth.contract(
+            address=AsyncWeb3.to_checksum_address(MULTICALL3_ADDRESS),
+            abi=MULTICALL3_ABI
+        )
+        self.pair_providers = dict(QUOTE_PROVIDERS)
+        self.max_pages = max_pages
+        self.url_pattern = re.compile(QUOTE_RESPONSE_URL_PATTERN, re.IGNORECASE)
+        self.page_profile = PageProfile.from_config()
+        # 价格影响曲线与同步服务共用，曲线采样在同步服务上执行
+        self.impact_model = impact_model
+
+        # 以下资源必须在事件循环内创建，首次使用时初始化
+        self._page_slots: Optional[asyncio.Semaphore] = None
+        self._prewarm_slots: Optional[asyncio.Semaphore] = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._playwright = None
+        self._browser = None
+        self._browser_quotes = 0
+        # 每个浏览器上未关闭的页面数；回收的浏览器在最后一个页面关闭后才关闭
+        self._open_pages: Dict[Any, int] = {}
+        self._retired: set = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._vault_state: Optional[VaultState] = None
+
+    # ---- 资源管理 ----
+
+    def _ensure_slots(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+            self._page_slots = asyncio.Semaphore(self.max_pages)
+            # 预热页面最多占一半槽位，其余槽位留给不依赖其他页面的报价，阶梯并发时不会互相等待
+            self._prewarm_slots = asyncio.Semaphore(self.max_pages // 2)
+
+    async def _acquire_browser(self):
+        """返回当前浏览器并计入一个打开的页面，调用方之后必须调用 _release_browser"""
+        async with self._browser_lock:
+            if self._browser is not None and (not self._browser.is_connected()
+                                              or self._browser_quotes >= BROWSER_MAX_QUOTES):
+                # 浏览器断开或达到回收次数：换用新浏览器，旧浏览器上进行中的页面关闭后再关闭它
+                old, self._browser = self._browser, None
+                if old.is_connected() and self._open_pages.get(old):
+                    self._retired.add(old)
+                else:
+                    await self._close_browser(old)
+
+            if self._browser is None:
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(**self.page_profile.launch_options())
+                self._browser_quotes = 0
+                print("异步流水线: 浏览器已启动")
+
+            self._open_pages[self._browser] = self._open_pages.get(self._browser, 0) + 1
+            return self._browser
+
+    async def _release_browser(self, browser):
+        async with self._browser_lock:
+            remaining = self._open_pages.get(browser, 1) - 1
+            if remaining > 0:
+                self._open_pages[browser] = remaining
+                return
+            self._open_pages.pop(browser, None)
+            if browser in self._retired:
+                self._retired.discard(browser)
+                await self._close_browser(browser)
+
+    async def _close_browser(self, browser):
+        self._open_pages.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            headers = {'Accept': 'application/json'}
+            if AGGREGATOR_API_KEY:
+                headers['Authorization'] = f'Bearer {AGGREGATOR_API_KEY}'
+            self._session = aiohttp.ClientSession(
+                headers=headers, timeout=aiohttp.ClientTimeout(total=AGGREGATOR_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        for browser in [self._browser, *self._retired]:
+            if browser is not None:
+                await self._close_browser(browser)
+        self._retired.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._session = self._browser = self._playwright = None
+
+    # ---- 报价 ----
+
+    async def get_quote(self, pair: str, input_amount: float,
+                        prepared: Optional[QuotePage] = None) -> Optional[Dict[str, Any]]:
+        """按配置的报价来源获取报价；prepared 为预热好的页面（仅playwright来源使用）"""
+        if self.pair_providers.get(pair) == 'http':
+            if prepared is not None:
+                await prepared.close()
+            return await self._get_http_quote(pair, input_amount)
+        return await self._get_page_quote(pair, input_amount, prepared)
+
+    async def _get_http_quote(self, pair: str, input_amount: float) -> Optional[Dict[str, Any]]:
+        src, dst = pair_tokens(pair)
+        try:
+            async with self._get_session().get(f"{AGGREGATOR_API_URL}/quote", params={
+                'src': src['address'],
+                'dst': dst['address'],
+                'amount': str(to_raw_amount(input_amount, src['decimals']))
+            }) as response:
+                response.raise_for_status()
+                payload = await response.json()
+
+            output_amount = from_raw_amount(payload.get('dstAmount', payload.get('toAmount')), dst['decimals'])
+            return self._build_quote(input_amount, output_amount, 'http')
+
+        except Exception as e:
+            print(f"获取聚合器报价失败 ({pair}): {e}")
+            return None
+
+    async def open_quote_page(self, pair: str, prewarm: bool = False) -> Optional[QuotePage]:
+        """打开报价页面并等待输入框就绪，金额确定后再输入
+
+        页面槽位从打开一直占用到 QuotePage.close()，ASYNC_MAX_PAGES 限制同时打开的页面数。
+        prewarm=True 为提前预热：预热名额已满时不等待，直接返回None（报价时再打开页面）
+        """
+        if self.pair_providers.get(pair) == 'http':
+            return None
+
+        self._ensure_slots()
+        if prewarm:
+            if self._prewarm_slots.locked():
+                return None
+            await self._prewarm_slots.acquire()
+        await self._page_slots.acquire()
+        browser = None
+
+        async def release():
+            if browser is not None:
+                await self._release_browser(browser)
+            self._page_slots.release()
+            if prewarm:
+                self._prewarm_slots.release()
+
+        context = None
+        try:
+            browser = await self._acquire_browser()
+            context = await browser.new_context(**self.page_profile.context_options())
+            stats = await self.page_profile.route_async(context)
+            page = await context.new_page()
+            page.set_default_timeout(30000)
+            with STAGE_SECONDS.time(stage='page_navigation'):
+                await page.goto(ONEINCH_URLS[pair], timeout=30000, wait_until='domcontentloaded')
+
+            selector = '.token-amount-input input'
+            await page.wait_for_selector(selector, timeout=10000)
+            for elem in await page.query_selector_all(selector):
+                if await elem.is_visible() and await elem.is_enabled():
+                    return QuotePage(pair, context, page, elem, stats, release)
+
+            print(f"未找到可用输入框: {pair}")
+        except Exception as e:
+            print(f"打开报价页面失败 ({pair}): {e}")
+
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        await release()
+        return None
+
+    async def _get_page_quote(self, pair: str, input_amount: float,
+                              prepared: Optional[QuotePage]) -> Optional[Dict[str, Any]]:
+        quote_page = prepared or await self.open_quote_page(pair)
+        if quote_page is None:
+            return None
+
+        src, dst = pair_tokens(pair)
+        expected_raw = to_raw_amount(input_amount, src['decimals'])
+        responses: asyncio.Queue = asyncio.Queue()
+
+        def on_response(response):
+            if self.url_pattern.search(response.url) and response.request.resource_type in ('xhr', 'fetch'):
+                responses.put_nowait(response)
+
+        page = quote_page.page
+        try:
+            page.on("response", on_response)
+            with STAGE_SECONDS.time(stage='input_entry'):
+                await quote_page.input_field.click()
+                await quote_page.input_field.fill('')
+                await page.keyboard.type(str(input_amount))
+            started = time.perf_counter()
+
+            # 等待与输入金额匹配的报价响应
+            deadline = time.monotonic() + QUOTE_CAPTURE_TIMEOUT_MS / 1000
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    response = await asyncio.wait_for(responses.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                try:
+                    if not response.ok:
+                        continue
+                    payload = await response.json()
+                    post_data = response.request.post_data_json
+                except Exception:
+                    continue
+                output = extract_quote(payload, response.url, post_data, expected_raw,
+                                       src['decimals'], dst['decimals'])
+                if output is not None:
+                    self._record_extraction(started, 'network')
+                    return self._build_quote(input_amount, output, 'network')
+
+            # 超时回退：读取输出输入框
+            print(f"报价响应等待超时，回退到DOM读取 ({pair})")
+            for inp in await page.query_selector_all('input'):
+                if not await inp.is_visible():
+                    continue
+                value = re.sub(r'[^\d.]', '', await inp.input_value() or '')
+                if not value or value == str(input_amount):
+                    continue
+                try:
+                    if 0.1 <= float(value) / float(input_amount) <= 2.0:
+                        self._record_extraction(started, 'dom_inputs')
+                        return self._build_quote(input_amount, float(value), 'dom')
+                except ValueError:
+                    continue
+            self._record_extraction(started, 'failed')
+            return None
+
+        except Exception as e:
+            print(f"获取页面报价失败 ({pair}): {e}")
+            return None
+        finally:
+            self._browser_quotes += 1
+            self.page_profile.finish(quote_page.stats)
+            await quote_page.close()
+
+    def _record_extraction(self, started: float, method: str):
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage='output_extraction')
+        EXTRACTION_METHOD.inc(method=method)
+
+    def _build_quote(self, input_amount: float, output_amount: Optional[float], source: str) -> Optional[Dict[str, Any]]:
+        if output_amount is None:
+            return None
+        rate = output_amount / float(input_amount)
+        if rate > 5 or rate < 0.1:  # 与同步版本相同的合理性检查
+            print(f"汇率异常: {rate}, 输入: {input_amount}, 输出: {output_amount}")
+            return None
+        return {
+            'input_amount': float(input_amount),
+            'output_amount': output_amount,
+            'exchange_rate': rate,
+            'source': source
+        }
+
+    # ---- 链上读取 ----
+
+    async def read_vault_state(self) -> VaultState:
+        """一次eth_call读取区块号、totalAssets、totalSupply"""
+        calls = [
+            (self.multicall.address, False, self.multicall.encode_abi('getBlockNumber')),
+            (self.vault.address, False, self.vault.encode_abi('totalAssets')),
+            (self.vault.address, False, self.vault.encode_abi('totalSupply')),
+        ]
+        responses = await self.multicall.functions.aggregate3(calls).call()
+        if not all(success for success, _ in responses):
+            raise Exception("Multicall读取金库状态失败")
+        block_number, total_assets, total_supply = (abi_decode(['uint256'], data)[0] for _, data in responses)
+        state = VaultState(block_number, total_assets, total_supply, time.time())
+        self._vault_state = state
+        return state
+
+    # ---- 套利步骤 ----
+
+    def _price_impact(self, pair: str, input_amount: float, output_amount: float) -> Optional[float]:
+        if self.impact_model is None:
+            return None
+        return self.impact_model.observe(pair, input_amount, output_amount)
+
+    async def get_usdt_to_susde(self, usdt_amount: float,
+                                prepared: Optional[QuotePage] = None) -> Optional[ArbitrageStep]:
+        """USDT转换为SUSDE"""
+        result = await self.get_quote('USDT_TO_SUSDE', usdt_amount, prepared)
+        record_leg('USDT_TO_SUSDE', bool(result))
+        if not result:
+            return None
+        return ArbitrageStep(step_number=1, from_token="USDT", to_token="SUSDE",
+                             input_amount=usdt_amount, output_amount=result['output_amount'],
+                             price_impact=self._price_impact('USDT_TO_SUSDE', usdt_amount, result['output_amount']),
+                             route="Uniswap V3")
+
+    def get_susde_to_usde(self, susde_amount: float, state: VaultState) -> ArbitrageStep:
+        """SUSDE解质押为USDE，使用已读取的金库状态本地计算"""
+        decimals = TokenConfig.SUSDE['decimals']
+        assets = state.convert_to_assets(to_raw_amount(susde_amount, decimals))
+        record_leg('SUSDE_TO_USDE', True)
+        return ArbitrageStep(step_number=2, from_token="SUSDE", to_token="USDE",
+                             input_amount=susde_amount, output_amount=from_raw_amount(assets, decimals),
+                             price_impact=0.0, route="解质押")
+
+    async def get_usde_to_usdt(self, usde_amount: float,
+                               prepared: Optional[QuotePage] = None) -> Optional[ArbitrageStep]:
+        """USDE转换为USDT"""
+        result = await self.get_quote('USDE_TO_USDT', usde_amount, prepared)
+        record_leg('USDE_TO_USDT', bool(result))
+        if not result:
+            return None
+        return ArbitrageStep(step_number=3, from_token="USDE", to_token="USDT",
+                             input_amount=usde_amount, output_amount=result['output_amount'],
+                             price_impact=self._price_impact('USDE_TO_USDT', usde_amount, result['output_amount']),
+                             route="Uniswap V3")
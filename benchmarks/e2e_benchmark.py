@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+离线端到端基准测试
+
+在本进程内启动本地替身服务（local_standins.py）：1inch兑换页面与报价接口、以太坊JSON-RPC、
+Supabase(PostgREST)，不需要外网。对以下环节测量延迟分位数（p50/p95/p99）与吞吐：
+- exchange.*: ExchangeService 的三段兑换
+- calculator.calculate_arbitrage: 一次完整套利计算
+- endpoint.*: Flask接口（进程内 test_client），/arbitrage/check 使用 max_age=0 强制重新计算
+
+结果JSON包含提交号和运行参数，--compare 与另一次（例如上一个提交）的结果逐项对比。
+
+用法:
+    python benchmarks/e2e_benchmark.py --runs 20 --output bench-$(git rev-parse --short HEAD).json
+    python benchmarks/e2e_benchmark.py --provider http --quote-delay 0.05 --compare bench-abc1234.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from local_standins import (StandinServer, StandinQuoteBook, StandinVault, StandinPostgrest,
+                            add_oneinch_routes, add_jsonrpc_routes, add_postgrest_routes)
+
+SCENARIOS = ('legs', 'calculator', 'endpoints')
+
+
+def _git_commit() -> Optional[Dict[str, object]]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return {'commit': commit or None, 'dirty': bool(status)}
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """线性插值分位数，q 取 0-100"""
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    position = (len(sorted_samples) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+
+def measure(fn: Callable[[], object], runs: int, concurrency: int = 1, warmup: int = 1) -> dict:
+    """调用 fn 共 runs 次（返回假值或抛出异常记为失败），统计延迟与吞吐"""
+    for _ in range(warmup):
+        try:
+            fn()
+        except Exception:
+            pass
+
+    def timed(_):
+        started = time.perf_counter()
+        try:
+            ok = bool(fn())
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        samples = list(executor.map(timed, range(runs)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in samples)
+    failures = sum(1 for _, ok in samples if not ok)
+    return {
+        'runs': runs,
+        'concurrency': concurrency,
+        'failures': failures,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'mean': sum(latencies) / len(latencies),
+        'min': latencies[0],
+        'max': latencies[-1],
+        'wall_seconds': wall,
+        'throughput_per_second': (runs - failures) / wall if wall > 0 else None
+    }
+
+
+def start_standins(args) -> dict:
+    """启动替身服务，并在导入项目模块之前把配置指向它"""
+    server = StandinServer()
+    quote_book = StandinQuoteBook(delay=args.quote_delay)
+    vault = StandinVault(delay=args.rpc_delay)
+    store = StandinPostgrest(delay=args.db_delay)
+    add_oneinch_routes(server, quote_book, args.debounce_ms)
+    add_jsonrpc_routes(server, vault)
+    add_postgrest_routes(server, store)
+    server.start()
+
+    os.environ.update({
+        'ONEINCH_APP_URL': server.url,
+        'AGGREGATOR_API_URL': server.url,
+        'INFURA_URL': f'{server.url}/rpc',
+        'STORAGE_BACKEND': 'supabase',
+        'SUPABASE_URL': server.url,
+        # supabase客户端只校验密钥格式
+        'SUPABASE_SERVICE_ROLE_KEY': 'standin.standin.standin',
+        'QUOTE_PROVIDER': args.provider,
+    })
+    return {'server': server, 'quote_book': quote_book, 'vault': vault, 'store': store}
+
+
+def seed_history(store: StandinPostgrest, count: int):
+    """预置检查和告警记录，使历史与统计接口有数据可读"""
+    now = datetime.now()
+    checks, alerts = [], []
+    for i in range(count):
+        apy = (i % 50) - 10.0
+        timestamp = (now - timedelta(seconds=i * 86400 / max(count, 1))).isoformat()
+        checks.append({
+            'timestamp': timestamp, 'check_type': 'scheduled', 'amount': 100000.0,
+            'usdt_to_susde_price': 0.855, 'susde_to_usde_rate': 1.18, 'usde_to_usdt_price': 0.9995,
+            'profit_loss': apy * 19.2, 'profit_percentage': apy / 52, 'annualized_return': apy,
+            'is_profitable': apy > 0, 'execution_steps': ['USDT -> SUSDE', 'SUSDE -> USDE', 'USDE -> USDT'],
+            'market_data': {}
+        })
+        if apy >= 20:
+            alerts.append({'timestamp': timestamp, 'alert_type': 'opportunity', 'message': f'年化收益率 {apy:.2f}%',
+                           'arbitrage_data': {}, 'is_opportunity': True})
+    store.insert('arbitrage_checks', checks)
+    store.insert('alerts', alerts)
+
+
+def run(args) -> dict:
+    standins = start_standins(args)
+    if args.seed_rows:
+        seed_history(standins['store'], args.seed_rows)
+
+    # 配置在导入时读取环境变量，必须在替身启动之后导入
+    import main_backend
+    from database_service import db_service
+
+    amount = args.amount
+    results = {}
+    calculator = None
+    try:
+        if 'legs' in args.scenarios or 'calculator' in args.scenarios:
+            calculator = main_backend.get_calculator()
+
+        if 'legs' in args.scenarios:
+            service = calculator.exchange_service
+            legs = {
+                'exchange.usdt_to_susde': lambda: service.get_usdt_to_susde(amount),
+                'exchange.susde_to_usde': lambda: service.get_susde_to_usde(amount * 0.855),
+                'exchange.usde_to_usdt': lambda: service.get_usde_to_usdt(amount * 1.009),
+            }
+            for name, fn in legs.items():
+                results[name] = measure(fn, args.runs, args.concurrency, args.warmup)
+
+        if 'calculator' in args.scenarios:
+            results['calculator.calculate_arbitrage'] = measure(
+                lambda: calculator.calculate_arbitrage(amount), args.runs, args.concurrency, args.warmup)
+
+        if 'endpoints' in args.scenarios:
+            client = main_backend.app.test_client()
+            endpoints = {
+                'endpoint.health': '/',
+                'endpoint.arbitrage_status': '/arbitrage/status',
+                'endpoint.arbitrage_check': f'/arbitrage/check?amount={amount:g}&max_age=0',
+                'endpoint.database_checks': '/database/checks?limit=100',
+                'endpoint.database_opportunities': '/database/opportunities',
+                'endpoint.database_statistics': '/database/statistics',
+                'endpoint.metrics': '/metrics',
+            }
+            for name, path in endpoints.items():
+                results[name] = measure(lambda path=path: client.get(path).status_code == 200,
+                                        args.runs, args.concurrency, args.warmup)
+
+        db_service.flush(timeout=10)
+    finally:
+        if calculator is not None:
+            calculator.close()
+        db_service.close()
+        standins['server'].stop()
+
+    return {
+        'scenarios': results,
+        'standins': {
+            'quotes_served': standins['quote_book'].quotes_served,
+            'rpc_requests': standins['vault'].rpc_requests,
+            'eth_calls': standins['vault'].eth_calls,
+            'postgrest_requests': standins['store'].requests,
+        }
+    }
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """逐项对比：延迟为当前/基线的比值（<1 更快），吞吐为当前/基线的比值（>1 更高）"""
+    comparison = {}
+    for name, stats in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        entry = {}
+        for key in ('p50', 'p95', 'p99', 'throughput_per_second'):
+            if stats.get(key) and base.get(key):
+                entry[key] = round(stats[key] / base[key], 3)
+        entry['failures'] = stats['failures'] - base.get('failures', 0)
+        comparison[name] = entry
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线端到端基准测试（本地替身1inch / RPC / Supabase）")
+    parser.add_argument('--runs', type=int, default=20, help='每个场景的测量次数')
+    parser.add_argument('--warmup', type=int, default=1, help='每个场景测量前的预热次数')
+    parser.add_argument('--concurrency', type=int, default=1, help='并发调用数')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"逗号分隔: {', '.join(SCENARIOS)}")
+    parser.add_argument('--provider', choices=('playwright', 'http'), default='playwright',
+                        help='报价来源: playwright 抓取替身页面, http 直接请求替身报价接口')
+    parser.add_argument('--amount', type=float, default=100000)
+    parser.add_argument('--quote-delay', type=float, default=0.3, help='替身报价接口延迟（秒）')
+    parser.add_argument('--debounce-ms', type=int, default=150, help='替身页面输入防抖（毫秒）')
+    parser.add_argument('--rpc-delay', type=float, default=0.0, help='替身JSON-RPC延迟（秒）')
+    parser.add_argument('--db-delay', type=float, default=0.0, help='替身PostgREST延迟（秒）')
+    parser.add_argument('--seed-rows', type=int, default=2000, help='预置的历史检查记录数')
+    parser.add_argument('--output', help='结果JSON文件路径，默认输出到标准输出')
+    parser.add_argument('--compare', help='基线结果JSON，输出各场景相对基线的比值')
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    results = {
+        'benchmark': 'e2e',
+        'timestamp': time.time(),
+        'git': _git_commit(),
+        'python': sys.version.split()[0],
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        **run(args)
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        results['baseline'] = {'file': args.compare, 'git': baseline.get('git')}
+        results['comparison'] = compare(results, baseline)
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
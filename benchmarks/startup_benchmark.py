@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准测试
+
+测量两项指标（每项重复多次，取中位数）：
+- import_seconds: 新进程中 import main_backend 的耗时
+- first_response_seconds: 启动 main_backend.py 到 GET / 首次返回200的耗时
+
+默认将 INFURA_URL 指向一个不可达的本地端口，模拟RPC节点异常时的冷启动。
+
+用法:
+    python benchmarks/startup_benchmark.py --runs 5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main_backend; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr else 'import failed')
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def measure_first_response(env: dict, timeout: float = 60.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'main_backend.py'], cwd=ROOT,
+                               env={**env, 'PORT': str(port)},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f'main_backend.py 退出，返回码 {process.returncode}')
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError('等待首次响应超时')
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _summary(samples: list) -> dict:
+    return {
+        'runs': len(samples),
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main_backend 启动耗时基准测试")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--infura-url', default='http://127.0.0.1:9', help='RPC地址，默认不可达')
+    parser.add_argument('--output', help='结果JSON文件路径，默认输出到标准输出')
+    args = parser.parse_args()
+
+    env = {**os.environ, 'INFURA_URL': args.infura_url, 'PYTHONDONTWRITEBYTECODE': '1'}
+    results = {'benchmark': 'startup', 'timestamp': time.time(), 'infura_url': args.infura_url}
+
+    for name, fn in (('import_seconds', measure_import), ('first_response_seconds', measure_first_response)):
+        samples = []
+        try:
+            for _ in range(args.runs):
+                samples.append(fn(env))
+            results[name] = _summary(samples)
+        except Exception as e:
+            results[name] = {'error': str(e), 'completed_runs': len(samples)}
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+常驻Chromium浏览器池
+
+每个工作线程持有一个Playwright实例和一个无头Chromium，
+每次报价在独立的浏览器上下文(BrowserContext)中执行，执行完即关闭上下文。
+浏览器在处理指定次数的报价或内存超过上限后回收，崩溃后自动重启。
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from config import BROWSER_POOL_SIZE, BROWSER_MAX_QUOTES, BROWSER_MAX_RSS_MB, BROWSER_TASK_TIMEOUT
+from metrics import STAGE_SECONDS
+
+# 启动浏览器时串行化，便于识别新启动的Chromium主进程
+_launch_lock = threading.Lock()
+
+
+def _read_process_table() -> Dict[int, tuple]:
+    """读取/proc中的进程表，返回 {pid: (ppid, rss_kb, cmdline)}"""
+    table = {}
+    if not os.path.isdir('/proc'):
+        return table
+
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # comm字段可能包含空格，从最后一个')'之后解析
+                fields = f.read().rsplit(')', 1)[1].split()
+            ppid = int(fields[1])
+            rss_kb = int(fields[21]) * os.sysconf('SC_PAGE_SIZE') // 1024
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='ignore')
+            table[int(entry)] = (ppid, rss_kb, cmdline)
+        except (OSError, IndexError, ValueError):
+            continue
+
+    return table
+
+
+def _descendants(table: Dict[int, tuple], root: int) -> List[int]:
+    """获取某进程的全部子孙进程"""
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+
+    result = []
+    stack = [root]
+    while stack:
+        pid = stack.pop()
+        for child in children.get(pid, []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+
+def _chromium_root_pids() -> Set[int]:
+    """当前进程树下所有Chromium主进程（不含 --type= 的渲染/GPU子进程）"""
+    table = _read_process_table()
+    return {pid for pid in _descendants(table, os.getpid())
+            if 'chrom' in table[pid][2] and '--type=' not in table[pid][2]}
+
+
+def _process_tree_rss_mb(root: int) -> float:
+    """某进程及其子孙进程的常驻内存总和（MB）"""
+    table = _read_process_table()
+    if root not in table:
+        return 0.0
+    pids = [root] + _descendants(table, root)
+    return sum(table[pid][1] for pid in pids if pid in table) / 1024
+
+
+class _BrowserWorker(threading.Thread):
+    """持有单个浏览器的工作线程（Playwright同步API对象不能跨线程使用）"""
+
+    def __init__(self, pool: 'BrowserPool', index: int, warm: bool = False):
+        super().__init__(name=f'browser-pool-{index}', daemon=True)
+        self.pool = pool
+        self.warm = warm
+        self.playwright = None
+        self.browser = None
+        self.browser_pid: Optional[int] = None
+        self.quotes_served = 0
+        self.launches = 0
+        self.restarts = 0
+        self.recycles = 0
+
+    def run(self):
+        try:
+            from playwright.sync_api import sync_playwright
+            self.playwright = sync_playwright().start()
+        except Exception as e:
+            print(f"浏览器池工作线程启动Playwright失败: {e}")
+            self.pool._worker_failed(e)
+            return
+
+        try:
+            if self.warm:
+                # 预热只启动浏览器，不计入报价次数
+                try:
+                    self._ensure_browser()
+                except Exception as e:
+                    print(f"{self.name}: 预热浏览器失败: {e}")
+
+            while True:
+                task = self.pool._tasks.get()
+                if task is None:
+                    break
+
+                fn, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    browser = self._ensure_browser()
+                    context = browser.new_context(**self.pool.context_options)
+                    try:
+                        future.set_result(fn(context))
+                    finally:
+                        try:
+                            context.close()
+                        except Exception:
+                            pass
+                except Exception as e:
+                    future.set_exception(e)
+
+                self.quotes_served += 1
+                self._recycle_if_needed()
+        finally:
+            self._close_browser()
+            try:
+                self.playwright.stop()
+            except Exception:
+                pass
+
+    def _ensure_browser(self):
+        """确保浏览器可用，崩溃或断开时重新启动"""
+        if self.browser is not None and self.browser.is_connected():
+            return self.browser
+
+        if self.browser is not None:
+            print(f"{self.name}: 浏览器已断开，正在重启...")
+            self.restarts += 1
+            self._close_browser()
+
+        with _launch_lock:
+            before = _chromium_root_pids()
+            with STAGE_SECONDS.time(stage='browser_launch'):
+                self.browser = self.playwright.chromium.launch(**self.pool.launch_options)
+            new_pids = _chromium_root_pids() - before
+
+        self.browser_pid = min(new_pids) if new_pids else None
+        self.launches += 1
+        self.quotes_served = 0
+        print(f"{self.name}: 浏览器已启动 (pid={self.browser_pid})")
+        return self.browser
+
+    def _recycle_if_needed(self):
+        """达到报价次数或内存上限时回收浏览器"""
+        if self.browser is None:
+            return
+
+        reason = None
+        if self.pool.max_quotes and self.quotes_served >= self.pool.max_quotes:
+            reason = f"已处理 {self.quotes_served} 次报价"
+        elif self.pool.max_rss_mb and self.browser_pid:
+            rss_mb = self.rss_mb()
+            if rss_mb > self.pool.max_rss_mb:
+                reason = f"内存 {rss_mb:.0f}MB 超过上限 {self.pool.max_rss_mb:.0f}MB"
+
+        if reason:
+            print(f"{self.name}: 回收浏览器 - {reason}")
+            self.recycles += 1
+            self._close_browser()
+
+    def _close_browser(self):
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+        self.browser = None
+        self.browser_pid = None
+
+    def rss_mb(self) -> float:
+        return _process_tree_rss_mb(self.browser_pid) if self.browser_pid else 0.0
+
+
+class BrowserPool:
+    """浏览器池，为每次报价分配隔离的浏览器上下文"""
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE,
+                 max_quotes: int = BROWSER_MAX_QUOTES,
+                 max_rss_mb: float = BROWSER_MAX_RSS_MB,
+                 launch_options: Optional[Dict[str, Any]] = None,
+                 context_options: Optional[Dict[str, Any]] = None):
+        self.size = max(1, size)
+        self.max_quotes = max_quotes
+        self.max_rss_mb = max_rss_mb
+        self.launch_options = launch_options or {'headless': True}
+        self.context_options = context_options or {}
+        self._tasks: queue.Queue = queue.Queue()
+        self._workers: List[_BrowserWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._failed_workers = 0
+        # 全部工作线程都无法启动Playwright时记录原因，之后提交的任务立即失败
+        self._error: Optional[Exception] = None
+
+    def _start(self, warm: bool = False):
+        """首次使用时才启动工作线程；warm 为True时工作线程启动后立即启动浏览器"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+            if not self._workers:
+                for i in range(self.size):
+                    worker = _BrowserWorker(self, i, warm)
+                    worker.start()
+                    self._workers.append(worker)
+
+    def _worker_failed(self, error: Exception):
+        """工作线程启动Playwright失败；全部失败时标记浏览器池不可用并让排队任务立即失败"""
+        with self._lock:
+            self._failed_workers += 1
+            if self._failed_workers < len(self._workers):
+                return
+            self._error = error
+
+        # 标记之后 submit 不再入队，队列中剩余的都是标记之前提交的任务
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+            if task is None:
+                continue
+            _, future = task
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """提交任务，fn 在浏览器工作线程中以 BrowserContext 为参数执行"""
+        self._start()
+        future: Future = Future()
+        with self._lock:
+            error = self._error
+            if error is None:
+                self._tasks.put((fn, future))
+        if error is not None:
+            future.set_exception(RuntimeError(f"浏览器池不可用: {error}"))
+        return future
+
+    def run(self, fn: Callable[[Any], Any], timeout: float = BROWSER_TASK_TIMEOUT) -> Any:
+        """提交任务并等待结果"""
+        future = self.submit(fn)
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def warm_up(self):
+        """提前启动所有浏览器，不等待完成（工作线程已启动时不做任何事）"""
+        self._start(warm=True)
+
+    def close(self, timeout: float = 10.0):
+        """关闭浏览器池：取消排队任务，等待进行中的任务结束后关闭浏览器"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[1].cancel()
+
+        for _ in workers:
+            self._tasks.put(None)
+        for worker in workers:
+            worker.join(timeout)
+
+        print("浏览器池已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        """浏览器池状态"""
+        return {
+            'size': self.size,
+            'started': bool(self._workers),
+            'closed': self._closed,
+            'error': str(self._error) if self._error else None,
+            'pending_tasks': self._tasks.qsize(),
+            'browsers': [{
+                'name': w.name,
+                'alive': w.is_alive(),
+                'browser_running': w.browser is not None,
+                'pid': w.browser_pid,
+                'rss_mb': round(w.rss_mb(), 1),
+                'quotes_served': w.quotes_served,
+                'launches': w.launches,
+                'restarts': w.restarts,
+                'recycles': w.recycles
+            } for w in self._workers]
+        }
@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 @dataclass
@@ -15,6 +15,8 @@ class MonitorConfig:
     """监控配置"""
     check_interval: int = 3600  # 检查间隔（秒），默认1小时
     initial_amount: float = 100000.0  # 初始金额 USDT
+    ladder_amounts: list = field(default_factory=lambda: list(LADDER_AMOUNTS))  # 多金额阶梯 USDT
+    ladder_max_workers: int = 8  # 阶梯并发计算的最大线程数
     
 @dataclass
 class TokenConfig:
@@ -36,6 +38,18 @@ class TokenConfig:
         'decimals': 18,
         'symbol': "SUSDE"
     }
+    
+    USDC = {
+        'address': "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+        'decimals': 6,
+        'symbol': "USDC"
+    }
+    
+    DAI = {
+        'address': "0x6B175474E89094C44Da98b954EedeAC495271d0F",
+        'decimals': 18,
+        'symbol': "DAI"
+    }
 
 import os
 from dotenv import load_dotenv
@@ -49,25 +63,159 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 # 以太坊节点配置 
 INFURA_URL = os.getenv('INFURA_URL', 'https://mainnet.infura.io/v3/your_project_id')
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', '10'))  # 单次RPC请求超时（秒）
 
 # 监控配置
 CHECK_INTERVAL_HOURS = float(os.getenv('CHECK_INTERVAL_HOURS', '1'))
 ALERT_THRESHOLD = float(os.getenv('ALERT_THRESHOLD', '20.0'))
+ALERT_HISTORY_CAPACITY = int(os.getenv('ALERT_HISTORY_CAPACITY', '10000'))  # 内存中保留的告警条数
+SERIES_RETENTION_HOURS = float(os.getenv('SERIES_RETENTION_HOURS', '168'))  # 内存时间序列保留时长（小时）
+SERIES_MAX_POINTS = int(os.getenv('SERIES_MAX_POINTS', '200000'))  # 内存时间序列最多保留的点数
+CHECK_FRESHNESS_SECONDS = float(os.getenv('CHECK_FRESHNESS_SECONDS', '10'))  # 手动检查复用同金额结果的时长（秒）
+CHECK_CACHE_MAX_ENTRIES = int(os.getenv('CHECK_CACHE_MAX_ENTRIES', '64'))  # 手动检查最多缓存的金额数
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # 异步检查任务的工作线程数（同时运行的浏览器会话上限）
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '20'))  # 排队任务上限，超出返回429
+JOB_RETENTION = int(os.getenv('JOB_RETENTION', '500'))  # 保留供查询的任务数
+# 监控模式: 'single' 单一金额 / 'ladder' 每次检查计算整个金额阶梯 / 'routes' 每次检查计算所有配置的套利路径
+# / 'optimize' 每次检查搜索最优交易金额
+MONITOR_MODE = os.getenv('MONITOR_MODE', 'single')
+LADDER_AMOUNTS = [float(x) for x in os.getenv('LADDER_AMOUNTS', '10000,50000,100000,250000,1000000').split(',') if x.strip()]
+# 价格影响曲线：由实时报价累积采样点拟合单调插值曲线；http 报价来源的交易对按以下金额主动采样
+IMPACT_MODEL = os.getenv('IMPACT_MODEL', 'false').lower() == 'true'
+IMPACT_SAMPLE_AMOUNTS = [float(x) for x in os.getenv('IMPACT_SAMPLE_AMOUNTS', '1000,10000,100000,500000,2000000').split(',') if x.strip()]
+IMPACT_CURVE_MAX_AGE = float(os.getenv('IMPACT_CURVE_MAX_AGE', '300'))  # 曲线有效期（秒），过期后重新采样
+IMPACT_MAX_ERROR_BPS = float(os.getenv('IMPACT_MAX_ERROR_BPS', '25'))  # 与实时报价误差超过该值（基点）时曲线作废
+# 最优交易金额搜索（optimize 模式与 /arbitrage/optimize）
+OPTIMIZE_MIN_AMOUNT = float(os.getenv('OPTIMIZE_MIN_AMOUNT', '10000'))  # 搜索下限 USDT
+OPTIMIZE_MAX_AMOUNT = float(os.getenv('OPTIMIZE_MAX_AMOUNT', '1000000'))  # 搜索上限 USDT
+OPTIMIZE_OBJECTIVE = os.getenv('OPTIMIZE_OBJECTIVE', 'profit')  # 'profit' 最大绝对收益 / 'apy' 收益不低于下限时最大年化
+OPTIMIZE_MIN_PROFIT = float(os.getenv('OPTIMIZE_MIN_PROFIT', '0'))  # apy 目标要求的最低收益 USDT
+OPTIMIZE_TOLERANCE = float(os.getenv('OPTIMIZE_TOLERANCE', '0.02'))  # 搜索区间收敛到的相对宽度
+OPTIMIZE_MAX_EVALUATIONS = int(os.getenv('OPTIMIZE_MAX_EVALUATIONS', '12'))  # 每次搜索最多计算的金额数
+OPTIMIZE_BRACKET_POINTS = int(os.getenv('OPTIMIZE_BRACKET_POINTS', '4'))  # 括区间时并发计算的等比金额数
+# 上一次检查未结束时新触发的处理: 'skip' 跳过 / 'queue' 排队依次执行 / 'coalesce' 合并为一次补跑
+MONITOR_RUN_POLICY = os.getenv('MONITOR_RUN_POLICY', 'skip')
+MONITOR_RUN_DEADLINE = float(os.getenv('MONITOR_RUN_DEADLINE', '90'))  # 单次检查截止时间（秒），超时结果不保存，0 不限制
+MONITOR_MAX_QUEUED = int(os.getenv('MONITOR_MAX_QUEUED', '2'))  # queue 策略下最多排队的触发数
+MONITOR_MISFIRE_GRACE = int(os.getenv('MONITOR_MISFIRE_GRACE', '30'))  # 调度器错过触发时间后仍补跑的宽限（秒）
 
 # Supabase配置
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
 SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
+# 存储后端: 'supabase' / 'sqlite'（内嵌本地库，离线可用） / 'spool'（先写本地，后台同步到Supabase）
+# 未配置 SUPABASE_URL 时默认使用 sqlite
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase' if SUPABASE_URL else 'sqlite')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'data/arbitrage.db')
+SPOOL_SYNC_INTERVAL = float(os.getenv('SPOOL_SYNC_INTERVAL', '30'))  # spool模式同步间隔（秒）
+SPOOL_SYNC_BATCH_SIZE = int(os.getenv('SPOOL_SYNC_BATCH_SIZE', '500'))  # 每次同步的最大行数
+
+# 数据库查询缓存：各查询结果的缓存时长（秒），0为不缓存；有新数据写入时相关缓存立即失效
+QUERY_CACHE_TTLS = {
+    'get_recent_checks': float(os.getenv('QUERY_CACHE_TTL_CHECKS', '5')),
+    'get_recent_alerts': float(os.getenv('QUERY_CACHE_TTL_ALERTS', '5')),
+    'get_profitable_opportunities': float(os.getenv('QUERY_CACHE_TTL_OPPORTUNITIES', '30')),
+    'get_statistics': float(os.getenv('QUERY_CACHE_TTL_STATISTICS', '30')),
+}
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '256'))
+
+# 历史记录接口分页：默认每页条数与上限
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '100'))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', '500'))
+
+# 数据库写后队列配置
+DB_WRITE_QUEUE_SIZE = int(os.getenv('DB_WRITE_QUEUE_SIZE', '10000'))  # 队列最多缓存的行数，满后丢弃新数据
+DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', '100'))  # 积累多少行立即写入
+DB_WRITE_MAX_AGE = float(os.getenv('DB_WRITE_MAX_AGE', '2'))  # 最早一行最多等待多久写入（秒）
+DB_WRITE_MAX_RETRIES = int(os.getenv('DB_WRITE_MAX_RETRIES', '3'))  # 单批写入失败重试次数
+DB_WRITE_RETRY_BACKOFF = float(os.getenv('DB_WRITE_RETRY_BACKOFF', '0.5'))  # 重试退避基数（秒），按2的幂增长
+DB_SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('DB_SHUTDOWN_DRAIN_TIMEOUT', '10'))  # 关闭时等待队列写完的时长（秒）
+
 # Flask配置
 PORT = int(os.getenv('PORT', '8081'))
+# 主端口服务方式: 'aiohttp'（SSE由事件循环推送，其他接口在线程池中转交Flask） / 'flask'（Flask内置多线程服务）
+HTTP_SERVER = os.getenv('HTTP_SERVER', 'aiohttp')
+HTTP_THREADS = int(os.getenv('HTTP_THREADS', '16'))  # aiohttp 模式下同时处理的普通请求数
+
+# 实时推送（SSE）配置
+SSE_REPLAY_SIZE = int(os.getenv('SSE_REPLAY_SIZE', '1000'))  # 断线重连可补发的最近事件数
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))  # 空闲时心跳间隔
+# HTTP_SERVER=flask 时 /arbitrage/stream 同时连接数上限（每个连接占用一个Flask线程），超出返回503，0 不限制
+SSE_MAX_THREAD_SUBSCRIBERS = int(os.getenv('SSE_MAX_THREAD_SUBSCRIBERS', '16'))
+
+# 浏览器池配置
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '2'))  # 常驻浏览器数量
+BROWSER_MAX_QUOTES = int(os.getenv('BROWSER_MAX_QUOTES', '50'))  # 单个浏览器处理多少次报价后回收
+BROWSER_MAX_RSS_MB = float(os.getenv('BROWSER_MAX_RSS_MB', '800'))  # 浏览器进程树内存上限（MB）
+BROWSER_TASK_TIMEOUT = float(os.getenv('BROWSER_TASK_TIMEOUT', '120'))  # 单次报价任务超时（秒）
+
+# 异步流水线: 开启后 calculate_arbitrage 通过 AsyncExchangeService 在单个事件循环上执行
+USE_ASYNC_PIPELINE = os.getenv('USE_ASYNC_PIPELINE', 'false').lower() == 'true'
+ASYNC_MAX_PAGES = int(os.getenv('ASYNC_MAX_PAGES', '4'))  # 异步模式下同时打开的报价页面上限
+
+# 1inch URL配置（ONEINCH_APP_URL 可指向本地替身页面用于离线测试）
+ONEINCH_APP_URL = os.getenv('ONEINCH_APP_URL', 'https://app.1inch.io').rstrip('/')
+# 代币名 -> 1inch页面URL中使用的代币符号
+ONEINCH_SYMBOLS = {'USDT': 'USDT', 'USDE': 'USDe', 'SUSDE': 'sUSDe', 'USDC': 'USDC', 'DAI': 'DAI'}
+
+# 报价抓取方式: 'network' 监听页面报价请求的响应，超时后回退到DOM读取; 'dom' 固定等待后读取DOM
+QUOTE_CAPTURE_MODE = os.getenv('QUOTE_CAPTURE_MODE', 'network')
+QUOTE_CAPTURE_TIMEOUT_MS = int(os.getenv('QUOTE_CAPTURE_TIMEOUT_MS', '8000'))
+# 页面报价请求URL匹配规则（正则，不区分大小写）
+QUOTE_RESPONSE_URL_PATTERN = os.getenv('QUOTE_RESPONSE_URL_PATTERN', r'quote')
+
+# 报价页面资源策略: 'light' 拦截图片/字体/媒体与第三方脚本并缩小视口; 'full' 加载完整页面
+PAGE_PROFILE = os.getenv('PAGE_PROFILE', 'light')
+# 按资源类型拦截（Playwright resource_type，逗号分隔）
+PAGE_BLOCK_RESOURCE_TYPES = [x.strip() for x in os.getenv('PAGE_BLOCK_RESOURCE_TYPES', 'image,media,font,manifest,texttrack').split(',') if x.strip()]
+# 非空时只放行这些资源类型（页面文档始终放行）
+PAGE_ALLOW_RESOURCE_TYPES = [x.strip() for x in os.getenv('PAGE_ALLOW_RESOURCE_TYPES', '').split(',') if x.strip()]
+# 按URL拦截的正则：统计、监控、客服与钱包连接等第三方脚本
+PAGE_BLOCK_URL_PATTERN = os.getenv(
+    'PAGE_BLOCK_URL_PATTERN',
+    r'google-analytics\.com|googletagmanager\.com|doubleclick\.net|facebook\.(net|com)/tr|hotjar|'
+    r'segment\.(io|com)|mixpanel|amplitude|sentry\.io|intercom|walletconnect|web3modal|cloudflareinsights'
+)
+# 始终放行的URL正则，优先于所有拦截规则（报价请求URL规则总是放行）
+PAGE_ALLOW_URL_PATTERN = os.getenv('PAGE_ALLOW_URL_PATTERN', '')
+PAGE_VIEWPORT = os.getenv('PAGE_VIEWPORT', '800x600')  # light 模式的视口大小
+
+# 套利路径（分号分隔，每条路径用 > 连接代币名，首尾相同），同时监控多条路径时共享相同兑换边的报价
+# SUSDE>USDE 为解质押、USDE>SUSDE 为质押（链上金库计算），其余为1inch兑换
+ROUTE_CYCLES = [[token.strip().upper() for token in cycle.split('>')]
+                for cycle in os.getenv('ROUTE_CYCLES', 'USDT>SUSDE>USDE>USDT').split(';') if cycle.strip()]
+# 由链上金库完成的兑换边
+VAULT_EDGES = {('SUSDE', 'USDE'): 'unstake', ('USDE', 'SUSDE'): 'stake'}
+
+# 报价交易对: 名称 -> (源代币, 目标代币)，代币名对应 TokenConfig 属性
+QUOTE_PAIRS = {
+    'USDT_TO_SUSDE': ('USDT', 'SUSDE'),
+    'USDE_TO_USDT': ('USDE', 'USDT')
+}
+# 套利路径中的其余兑换边
+QUOTE_PAIRS.update({
+    f'{src}_TO_{dst}': (src, dst)
+    for cycle in ROUTE_CYCLES for src, dst in zip(cycle, cycle[1:])
+    if (src, dst) not in VAULT_EDGES
+})
 
-# 1inch URL配置
 ONEINCH_URLS = {
-    'USDT_TO_SUSDE': "https://app.1inch.io/swap?src=1:USDT&dst=1:sUSDe",
-    'USDE_TO_USDT': "https://app.1inch.io/swap?src=1:USDe&dst=1:USDT"
+    pair: f"{ONEINCH_APP_URL}/swap?src=1:{ONEINCH_SYMBOLS.get(src, src)}&dst=1:{ONEINCH_SYMBOLS.get(dst, dst)}"
+    for pair, (src, dst) in QUOTE_PAIRS.items()
+}
+
+# 每个交易对的报价来源: 'playwright'（抓取1inch页面） / 'http'（聚合器JSON报价接口）
+QUOTE_PROVIDERS = {
+    pair: os.getenv(f'QUOTE_PROVIDER_{pair}', os.getenv('QUOTE_PROVIDER', 'playwright'))
+    for pair in QUOTE_PAIRS
 }
 
+# 聚合器报价接口配置（1inch Swap API 风格: GET {url}/quote?src=&dst=&amount=）
+AGGREGATOR_API_URL = os.getenv('AGGREGATOR_API_URL', 'https://api.1inch.dev/swap/v6.0/1').rstrip('/')
+AGGREGATOR_API_KEY = os.getenv('AGGREGATOR_API_KEY')
+AGGREGATOR_TIMEOUT = float(os.getenv('AGGREGATOR_TIMEOUT', '10'))
+
 # SUSDE合约ABI
 SUSDE_ABI = [
     {
@@ -88,5 +236,94 @@ SUSDE_ABI = [
         ],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "assets", "type": "uint256"}],
+        "name": "previewDeposit",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "uint256",
+                "name": "shares",
+                "type": "uint256"
+            }
+        ],
+        "name": "convertToAssets",
+        "outputs": [
+            {
+                "internalType": "uint256",
+                "name": "",
+                "type": "uint256"
+            }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "totalAssets",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "totalSupply",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
     }
 ]
+
+# Multicall3合约（各EVM链地址相同）
+MULTICALL3_ADDRESS = os.getenv('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "view",  # 实际为payable，声明为view以便直接eth_call
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# 批量链上读取方式: 'multicall'（一次Multicall3 eth_call） / 'batch'（一次JSON-RPC批量请求）
+ONCHAIN_BATCH_MODE = os.getenv('ONCHAIN_BATCH_MODE', 'multicall')
+MULTICALL_CHUNK_SIZE = int(os.getenv('MULTICALL_CHUNK_SIZE', '200'))
+
+# sUSDe赎回率计算方式: 'local'（按区块缓存金库状态并在本地计算） / 'rpc'（每次调用previewRedeem）
+VAULT_RATE_MODE = os.getenv('VAULT_RATE_MODE', 'local')
+VAULT_STATE_MAX_AGE = float(os.getenv('VAULT_STATE_MAX_AGE', '12'))  # 金库状态缓存时长（秒），约一个出块时间
+VAULT_VERIFY_EVERY = int(os.getenv('VAULT_VERIFY_EVERY', '50'))  # 每N次本地计算与链上结果核对一次，0为关闭
@@ -40,6 +40,12 @@ CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts(timestamp);
 CREATE INDEX IF NOT EXISTS idx_alerts_alert_type ON alerts(alert_type);
 CREATE INDEX IF NOT EXISTS idx_alerts_is_opportunity ON alerts(is_opportunity);
 
+-- 游标分页使用的复合索引：按 (timestamp, id) 倒序翻页，盈利机会按 (annualized_return, id) 倒序翻页
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_timestamp_id ON arbitrage_checks(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_timestamp_id ON alerts(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_profitable_apy_id ON arbitrage_checks(annualized_return DESC, id DESC)
+    WHERE is_profitable = TRUE;
+
 -- 4. 创建视图：最近的盈利机会
 CREATE OR REPLACE VIEW recent_profitable_opportunities AS
 SELECT 
@@ -151,8 +157,176 @@ $$ LANGUAGE plpgsql;
 --     ARRAY['USDT -> sUSDe', 'sUSDe -> USDe', 'USDe -> USDT']
 -- );
 
+-- 11. 统计汇总表：按小时/按天汇总 arbitrage_checks，插入时由触发器增量维护
+--     get_rollup_statistics 只读取窗口内完整的天/小时汇总，加上两端不足一小时的原始记录，
+--     统计耗时不随历史数据量增长。cleanup_old_data 只删除原始记录，汇总表保留长期统计；
+--     删除触发器把指向已删除记录的 best_opportunity_id 改为桶内剩余的最佳记录（没有则置空）。
+CREATE TABLE IF NOT EXISTS arbitrage_checks_hourly (
+    bucket_start TIMESTAMPTZ PRIMARY KEY,
+    check_count BIGINT NOT NULL DEFAULT 0,
+    profitable_count BIGINT NOT NULL DEFAULT 0,
+    apy_count BIGINT NOT NULL DEFAULT 0,          -- annualized_return 非空的记录数（用于平均值）
+    apy_sum DECIMAL NOT NULL DEFAULT 0,
+    apy_min DECIMAL(10, 6),
+    apy_max DECIMAL(10, 6),
+    best_opportunity_id BIGINT,                   -- 盈利记录中年化收益率最高的一条
+    best_opportunity_apy DECIMAL(10, 6)
+);
+
+CREATE TABLE IF NOT EXISTS arbitrage_checks_daily (LIKE arbitrage_checks_hourly INCLUDING ALL);
+
+CREATE OR REPLACE FUNCTION rollup_arbitrage_check()
+RETURNS TRIGGER AS $$
+DECLARE
+    apy_known INTEGER := CASE WHEN NEW.annualized_return IS NULL THEN 0 ELSE 1 END;
+    profitable INTEGER := CASE WHEN NEW.is_profitable THEN 1 ELSE 0 END;
+    best_id BIGINT := CASE WHEN NEW.is_profitable THEN NEW.id END;
+    best_apy DECIMAL := CASE WHEN NEW.is_profitable THEN NEW.annualized_return END;
+BEGIN
+    INSERT INTO arbitrage_checks_hourly AS r
+    VALUES (date_trunc('hour', NEW.timestamp), 1, profitable, apy_known, COALESCE(NEW.annualized_return, 0),
+            NEW.annualized_return, NEW.annualized_return, best_id, best_apy)
+    ON CONFLICT (bucket_start) DO UPDATE SET
+        check_count = r.check_count + 1,
+        profitable_count = r.profitable_count + EXCLUDED.profitable_count,
+        apy_count = r.apy_count + EXCLUDED.apy_count,
+        apy_sum = r.apy_sum + EXCLUDED.apy_sum,
+        apy_min = LEAST(r.apy_min, EXCLUDED.apy_min),
+        apy_max = GREATEST(r.apy_max, EXCLUDED.apy_max),
+        best_opportunity_id = CASE WHEN EXCLUDED.best_opportunity_apy IS NOT NULL
+                                        AND (r.best_opportunity_apy IS NULL OR EXCLUDED.best_opportunity_apy > r.best_opportunity_apy)
+                                   THEN EXCLUDED.best_opportunity_id ELSE r.best_opportunity_id END,
+        best_opportunity_apy = GREATEST(r.best_opportunity_apy, EXCLUDED.best_opportunity_apy);
+
+    INSERT INTO arbitrage_checks_daily AS r
+    VALUES (date_trunc('day', NEW.timestamp), 1, profitable, apy_known, COALESCE(NEW.annualized_return, 0),
+            NEW.annualized_return, NEW.annualized_return, best_id, best_apy)
+    ON CONFLICT (bucket_start) DO UPDATE SET
+        check_count = r.check_count + 1,
+        profitable_count = r.profitable_count + EXCLUDED.profitable_count,
+        apy_count = r.apy_count + EXCLUDED.apy_count,
+        apy_sum = r.apy_sum + EXCLUDED.apy_sum,
+        apy_min = LEAST(r.apy_min, EXCLUDED.apy_min),
+        apy_max = GREATEST(r.apy_max, EXCLUDED.apy_max),
+        best_opportunity_id = CASE WHEN EXCLUDED.best_opportunity_apy IS NOT NULL
+                                        AND (r.best_opportunity_apy IS NULL OR EXCLUDED.best_opportunity_apy > r.best_opportunity_apy)
+                                   THEN EXCLUDED.best_opportunity_id ELSE r.best_opportunity_id END,
+        best_opportunity_apy = GREATEST(r.best_opportunity_apy, EXCLUDED.best_opportunity_apy);
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_arbitrage_checks_rollup ON arbitrage_checks;
+CREATE TRIGGER trg_arbitrage_checks_rollup
+    AFTER INSERT ON arbitrage_checks
+    FOR EACH ROW EXECUTE FUNCTION rollup_arbitrage_check();
+
+CREATE OR REPLACE FUNCTION rollup_forget_deleted_checks()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE arbitrage_checks_hourly r SET (best_opportunity_id, best_opportunity_apy) = (
+        SELECT c.id, c.annualized_return FROM arbitrage_checks c
+        WHERE c.timestamp >= r.bucket_start AND c.timestamp < r.bucket_start + INTERVAL '1 hour' AND c.is_profitable
+        ORDER BY c.annualized_return DESC NULLS LAST LIMIT 1
+    )
+    WHERE r.best_opportunity_id IN (SELECT id FROM deleted_checks);
+
+    UPDATE arbitrage_checks_daily r SET (best_opportunity_id, best_opportunity_apy) = (
+        SELECT c.id, c.annualized_return FROM arbitrage_checks c
+        WHERE c.timestamp >= r.bucket_start AND c.timestamp < r.bucket_start + INTERVAL '1 day' AND c.is_profitable
+        ORDER BY c.annualized_return DESC NULLS LAST LIMIT 1
+    )
+    WHERE r.best_opportunity_id IN (SELECT id FROM deleted_checks);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 语句级触发器：cleanup_old_data 和客户端批量删除都只触发一次
+DROP TRIGGER IF EXISTS trg_arbitrage_checks_rollup_delete ON arbitrage_checks;
+CREATE TRIGGER trg_arbitrage_checks_rollup_delete
+    AFTER DELETE ON arbitrage_checks
+    REFERENCING OLD TABLE AS deleted_checks
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_forget_deleted_checks();
+
+-- 创建删除触发器之前已清理过的数据库，修正已指向不存在记录的汇总行（执行一次）
+-- UPDATE arbitrage_checks_hourly r SET best_opportunity_id = NULL, best_opportunity_apy = NULL
+-- WHERE r.best_opportunity_id IS NOT NULL
+--   AND NOT EXISTS (SELECT 1 FROM arbitrage_checks c WHERE c.id = r.best_opportunity_id);
+-- （arbitrage_checks_daily 同上）
+
+-- 已有数据的汇总回填（仅在首次创建汇总表时执行一次）
+-- INSERT INTO arbitrage_checks_hourly
+-- SELECT date_trunc('hour', timestamp), COUNT(*), COUNT(*) FILTER (WHERE is_profitable), COUNT(annualized_return),
+--        COALESCE(SUM(annualized_return), 0), MIN(annualized_return), MAX(annualized_return),
+--        (ARRAY_AGG(id ORDER BY annualized_return DESC NULLS LAST) FILTER (WHERE is_profitable))[1],
+--        MAX(annualized_return) FILTER (WHERE is_profitable)
+-- FROM arbitrage_checks GROUP BY 1 ON CONFLICT DO NOTHING;
+-- （arbitrage_checks_daily 同上，把 'hour' 换成 'day'）
+
+CREATE OR REPLACE FUNCTION get_rollup_statistics(start_time TIMESTAMPTZ)
+RETURNS TABLE(
+    total_checks BIGINT,
+    profitable_count BIGINT,
+    max_apy DECIMAL,
+    avg_apy DECIMAL,
+    best_opportunity_id BIGINT
+) AS $$
+#variable_conflict use_column
+DECLARE
+    -- 窗口内完整小时 [hour_lo, hour_hi)，完整天 [day_lo, day_hi)
+    hour_lo TIMESTAMPTZ := date_trunc('hour', start_time + INTERVAL '1 hour' - INTERVAL '1 microsecond');
+    hour_hi TIMESTAMPTZ := date_trunc('hour', NOW());
+    day_lo TIMESTAMPTZ;
+    day_hi TIMESTAMPTZ;
+BEGIN
+    IF hour_lo >= hour_hi THEN
+        -- 窗口不足一个完整小时，全部读取原始记录
+        hour_lo := start_time;
+        hour_hi := start_time;
+    END IF;
+    day_lo := date_trunc('day', hour_lo + INTERVAL '1 day' - INTERVAL '1 microsecond');
+    day_hi := date_trunc('day', hour_hi);
+    IF day_lo >= day_hi THEN
+        day_lo := hour_lo;
+        day_hi := hour_lo;
+    END IF;
+
+    RETURN QUERY
+    WITH parts AS (
+        SELECT check_count, profitable_count, apy_count, apy_sum, apy_max, best_opportunity_id, best_opportunity_apy
+        FROM arbitrage_checks_daily
+        WHERE bucket_start >= day_lo AND bucket_start < day_hi
+        UNION ALL
+        SELECT check_count, profitable_count, apy_count, apy_sum, apy_max, best_opportunity_id, best_opportunity_apy
+        FROM arbitrage_checks_hourly
+        WHERE (bucket_start >= hour_lo AND bucket_start < day_lo) OR (bucket_start >= day_hi AND bucket_start < hour_hi)
+        UNION ALL
+        SELECT 1, CASE WHEN is_profitable THEN 1 ELSE 0 END, CASE WHEN annualized_return IS NULL THEN 0 ELSE 1 END,
+               COALESCE(annualized_return, 0), annualized_return,
+               CASE WHEN is_profitable THEN id END, CASE WHEN is_profitable THEN annualized_return END
+        FROM arbitrage_checks
+        WHERE timestamp >= start_time AND (timestamp < hour_lo OR timestamp >= hour_hi)
+    )
+    SELECT
+        COALESCE(SUM(parts.check_count), 0)::BIGINT,
+        COALESCE(SUM(parts.profitable_count), 0)::BIGINT,
+        COALESCE(MAX(parts.apy_max), 0),
+        CASE WHEN SUM(parts.apy_count) > 0 THEN SUM(parts.apy_sum) / SUM(parts.apy_count) ELSE 0 END,
+        (SELECT p.best_opportunity_id FROM parts p
+         WHERE p.best_opportunity_id IS NOT NULL
+         ORDER BY p.best_opportunity_apy DESC LIMIT 1)
+    FROM parts;
+END;
+$$ LANGUAGE plpgsql;
+
 COMMENT ON TABLE arbitrage_checks IS 'SusDE套利检查记录表';
 COMMENT ON TABLE alerts IS '告警记录表';
 COMMENT ON FUNCTION avg_annualized_return IS '计算指定时间范围内的平均年化收益率';
 COMMENT ON FUNCTION get_arbitrage_statistics IS '获取套利统计数据';
 COMMENT ON FUNCTION cleanup_old_data IS '清理指定天数之前的旧数据';
+COMMENT ON TABLE arbitrage_checks_hourly IS '套利检查按小时汇总表';
+COMMENT ON TABLE arbitrage_checks_daily IS '套利检查按天汇总表';
+COMMENT ON FUNCTION rollup_forget_deleted_checks IS '删除原始记录后修正汇总表的最佳机会';
+COMMENT ON FUNCTION get_rollup_statistics IS '基于汇总表获取统计数据';
@@ -1,124 +1,142 @@
 #!/usr/bin/env python3
 """
-Supabase数据库服务模块
+数据库服务模块
 
-处理套利数据的存储和查询
+处理套利数据的存储和查询，实际存储由 storage_backends 中的后端完成
+（Supabase / 内嵌SQLite / 本地缓冲后同步）
 """
 
-import os
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from typing import Dict, List, Optional, Any
-from dataclasses import asdict
-import json
 
-from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY
+from config import (DB_WRITE_QUEUE_SIZE, DB_WRITE_BATCH_SIZE, DB_WRITE_MAX_AGE, DB_WRITE_MAX_RETRIES,
+                    DB_WRITE_RETRY_BACKOFF, DB_SHUTDOWN_DRAIN_TIMEOUT, STORAGE_BACKEND,
+                    QUERY_CACHE_TTLS, QUERY_CACHE_MAX_ENTRIES)
+from metrics import DB_INSERT_SECONDS
 from models import ArbitrageResult
+from query_cache import QueryCache
+from storage_backends import StorageBackend, create_backend
+from write_queue import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
 class DatabaseService:
-    """Supabase数据库服务"""
+    """数据库服务"""
     
-    def __init__(self):
-        """初始化数据库连接"""
-        self.supabase: Optional[Client] = None
-        self.connected = False
-        self._connect()
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        """初始化数据库服务，默认按 STORAGE_BACKEND 首次使用时创建后端"""
+        self._backend = backend
+        self.backend_kind = backend.name if backend else STORAGE_BACKEND
+        
+        # 写入先进入队列，由后台线程批量插入，检查路径不等待数据库
+        self.write_queue = WriteBehindQueue(
+            self._insert_rows,
+            max_size=DB_WRITE_QUEUE_SIZE,
+            batch_size=DB_WRITE_BATCH_SIZE,
+            max_age=DB_WRITE_MAX_AGE,
+            max_retries=DB_WRITE_MAX_RETRIES,
+            retry_backoff=DB_WRITE_RETRY_BACKOFF
+        )
+        
+        # 查询结果缓存，写入队列成功写入某表后失效该表相关的缓存
+        self.query_cache = QueryCache(QUERY_CACHE_TTLS, QUERY_CACHE_MAX_ENTRIES)
+        self.write_queue.add_flush_listener(lambda table, count: self.query_cache.invalidate(table))
     
-    def _connect(self):
-        """连接到Supabase"""
+    @property
+    def backend(self) -> StorageBackend:
+        if self._backend is None:
+            self._backend = create_backend(self.backend_kind)
+        return self._backend
+    
+    @property
+    def connected(self) -> bool:
+        """数据库是否可用（首次访问时建立连接）"""
         try:
-            if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-                logger.warning("Supabase配置不完整，数据库功能将被禁用")
-                return
-            
-            # 优先使用服务角色密钥，否则使用匿名密钥
-            key = SUPABASE_SERVICE_ROLE_KEY if SUPABASE_SERVICE_ROLE_KEY else SUPABASE_ANON_KEY
-            
-            self.supabase = create_client(SUPABASE_URL, key)
-            self.connected = True
-            logger.info("成功连接到Supabase数据库")
-            
-            # 测试连接
-            self._test_connection()
-            
+            return self.backend.connected
         except Exception as e:
-            logger.error(f"连接Supabase失败: {e}")
-            self.connected = False
+            logger.error(f"初始化存储后端失败: {e}")
+            return False
+    
+    @property
+    def supabase(self):
+        """Supabase客户端（仅supabase/spool后端）"""
+        backend = self._backend
+        remote = getattr(backend, 'remote', backend)
+        return getattr(remote, 'client', None)
+    
+    def _build_check_row(self, result: ArbitrageResult, check_type: str) -> Dict[str, Any]:
+        """将套利结果转换为 arbitrage_checks 表的一行"""
+        # 从steps中提取价格信息
+        rates = result.leg_rates()
+        usdt_to_susde_price = rates['usdt_to_susde']
+        susde_to_usde_rate = rates['susde_to_usde']
+        usde_to_usdt_price = rates['usde_to_usdt']
+        execution_steps = [f"{step.from_token} -> {step.to_token}" for step in result.steps]
+        
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'check_type': check_type,  # 'scheduled', 'manual', 'alert'
+            'amount': result.initial_amount,
+            'usdt_to_susde_price': usdt_to_susde_price,
+            'susde_to_usde_rate': susde_to_usde_rate,
+            'usde_to_usdt_price': usde_to_usdt_price,
+            'profit_loss': result.profit_loss,
+            'profit_percentage': result.profit_percentage,
+            'annualized_return': result.annualized_return,
+            'is_profitable': result.is_profitable,
+            'execution_steps': execution_steps,
+            'market_data': {
+                'usdt_to_susde_price': usdt_to_susde_price,
+                'susde_to_usde_rate': susde_to_usde_rate,
+                'usde_to_usdt_price': usde_to_usdt_price,
+                'steps': [step.to_dict() for step in result.steps]
+            }
+        }
     
-    def _test_connection(self):
-        """测试数据库连接"""
+    def _insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """多行插入（由写入队列的后台线程调用），失败时抛出异常以便重试"""
+        started = time.perf_counter()
         try:
-            if self.supabase:
-                # 尝试查询arbitrage_checks表
-                result = self.supabase.table('arbitrage_checks').select('*').limit(1).execute()
-                logger.info("数据库连接测试成功")
-        except Exception as e:
-            logger.warning(f"数据库连接测试失败: {e}")
+            self.backend.insert_rows(table, rows)
+        except Exception:
+            DB_INSERT_SECONDS.observe(time.perf_counter() - started, table=table, outcome='failure')
+            raise
+        DB_INSERT_SECONDS.observe(time.perf_counter() - started, table=table, outcome='success')
+        logger.info(f"成功写入 {len(rows)} 条记录到 {table}")
     
     def save_arbitrage_result(self, result: ArbitrageResult, check_type: str = "scheduled") -> bool:
-        """保存套利检查结果"""
-        if not self.connected or not self.supabase:
+        """保存套利检查结果（放入写入队列）"""
+        if not self.connected:
             logger.warning("数据库未连接，跳过保存")
             return False
         
         try:
-            # 从steps中提取价格信息
-            usdt_to_susde_price = None
-            susde_to_usde_rate = None
-            usde_to_usdt_price = None
-            execution_steps = []
-            
-            for step in result.steps:
-                execution_steps.append(f"{step.from_token} -> {step.to_token}")
-                
-                if step.from_token == "USDT" and step.to_token == "SUSDE":
-                    usdt_to_susde_price = step.output_amount / step.input_amount if step.input_amount > 0 else None
-                elif step.from_token == "SUSDE" and step.to_token == "USDE":
-                    susde_to_usde_rate = step.output_amount / step.input_amount if step.input_amount > 0 else None
-                elif step.from_token == "USDE" and step.to_token == "USDT":
-                    usde_to_usdt_price = step.output_amount / step.input_amount if step.input_amount > 0 else None
-            
-            # 准备数据
-            data = {
-                'timestamp': datetime.now().isoformat(),
-                'check_type': check_type,  # 'scheduled', 'manual', 'alert'
-                'amount': result.initial_amount,
-                'usdt_to_susde_price': usdt_to_susde_price,
-                'susde_to_usde_rate': susde_to_usde_rate,
-                'usde_to_usdt_price': usde_to_usdt_price,
-                'profit_loss': result.profit_loss,
-                'profit_percentage': result.profit_percentage,
-                'annualized_return': result.annualized_return,
-                'is_profitable': result.is_profitable,
-                'execution_steps': execution_steps,
-                'market_data': {
-                    'usdt_to_susde_price': usdt_to_susde_price,
-                    'susde_to_usde_rate': susde_to_usde_rate,
-                    'usde_to_usdt_price': usde_to_usdt_price,
-                    'steps': [step.to_dict() for step in result.steps]
-                }
-            }
-            
-            # 插入数据
-            response = self.supabase.table('arbitrage_checks').insert(data).execute()
-            
-            if response.data:
-                logger.info(f"成功保存套利结果 - 年化收益率: {result.annualized_return:.2f}%")
-                return True
-            else:
-                logger.error("保存套利结果失败：无返回数据")
-                return False
-                
+            return self.write_queue.put('arbitrage_checks', self._build_check_row(result, check_type))
         except Exception as e:
             logger.error(f"保存套利结果时出错: {e}")
             return False
     
+    def save_arbitrage_results(self, results: List[ArbitrageResult], check_type: str = "scheduled") -> bool:
+        """批量保存套利检查结果（放入写入队列，与其他行合并为多行插入）"""
+        if not results:
+            return True
+        
+        if not self.connected:
+            logger.warning("数据库未连接，跳过保存")
+            return False
+        
+        try:
+            rows = [self._build_check_row(result, check_type) for result in results]
+            return all([self.write_queue.put('arbitrage_checks', row) for row in rows])
+        except Exception as e:
+            logger.error(f"批量保存套利结果时出错: {e}")
+            return False
+    
     def save_alert(self, alert_data: Dict[str, Any]) -> bool:
-        """保存告警记录"""
-        if not self.connected or not self.supabase:
+        """保存告警记录（放入写入队列）"""
+        if not self.connected:
             logger.warning("数据库未连接，跳过保存告警")
             return False
         
@@ -132,162 +150,98 @@ class DatabaseService:
                 'is_opportunity': alert_data.get('alert_type') == 'opportunity'
             }
             
-            # 插入告警数据
-            response = self.supabase.table('alerts').insert(data).execute()
-            
-            if response.data:
-                logger.info(f"成功保存告警记录: {alert_data.get('alert_type')}")
-                return True
-            else:
-                logger.error("保存告警记录失败：无返回数据")
-                return False
-                
+            return self.write_queue.put('alerts', data)
         except Exception as e:
             logger.error(f"保存告警记录时出错: {e}")
             return False
     
-    def get_recent_checks(self, hours: int = 24, limit: int = 100) -> List[Dict]:
-        """获取最近的检查记录"""
-        if not self.connected or not self.supabase:
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即写入队列中的全部数据"""
+        return self.write_queue.flush(timeout)
+    
+    def close(self, timeout: float = DB_SHUTDOWN_DRAIN_TIMEOUT) -> bool:
+        """停止写入队列、写完剩余数据并关闭存储后端"""
+        drained = self.write_queue.close(timeout)
+        if self._backend is not None:
+            self._backend.close()
+        return drained
+    
+    def get_recent_checks(self, hours: int = 24, limit: int = 100, after: Optional[tuple] = None,
+                          include_data: bool = True) -> List[Dict]:
+        """获取最近的检查记录（按时间倒序，after 为上一页最后一条的 (timestamp, id)）"""
+        if not self.connected:
             return []
         
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
-            
-            response = (self.supabase.table('arbitrage_checks')
-                       .select('*')
-                       .gte('timestamp', cutoff_time)
-                       .order('timestamp', desc=True)
-                       .limit(limit)
-                       .execute())
-            
-            return response.data or []
-            
+            return self.query_cache.get_or_load(
+                'get_recent_checks', (hours, limit, after, include_data), ('arbitrage_checks',),
+                lambda: self.backend.get_recent_checks(hours, limit, after, include_data))
         except Exception as e:
             logger.error(f"查询最近检查记录时出错: {e}")
             return []
     
-    def get_recent_alerts(self, hours: int = 24, limit: int = 100) -> List[Dict]:
-        """获取最近的告警记录"""
-        if not self.connected or not self.supabase:
+    def get_recent_alerts(self, hours: int = 24, limit: int = 100, after: Optional[tuple] = None,
+                          include_data: bool = True) -> List[Dict]:
+        """获取最近的告警记录（按时间倒序，after 为上一页最后一条的 (timestamp, id)）"""
+        if not self.connected:
             return []
         
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
-            
-            response = (self.supabase.table('alerts')
-                       .select('*')
-                       .gte('timestamp', cutoff_time)
-                       .order('timestamp', desc=True)
-                       .limit(limit)
-                       .execute())
-            
-            return response.data or []
-            
+            return self.query_cache.get_or_load(
+                'get_recent_alerts', (hours, limit, after, include_data), ('alerts',),
+                lambda: self.backend.get_recent_alerts(hours, limit, after, include_data))
         except Exception as e:
             logger.error(f"查询最近告警记录时出错: {e}")
             return []
     
-    def get_profitable_opportunities(self, days: int = 7, min_apy: float = 20.0) -> List[Dict]:
-        """获取盈利机会记录"""
-        if not self.connected or not self.supabase:
+    def get_profitable_opportunities(self, days: int = 7, min_apy: float = 20.0, limit: Optional[int] = None,
+                                     after: Optional[tuple] = None, include_data: bool = True) -> List[Dict]:
+        """获取盈利机会记录（按年化收益率倒序，after 为上一页最后一条的 (annualized_return, id)）"""
+        if not self.connected:
             return []
         
         try:
-            cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
-            
-            response = (self.supabase.table('arbitrage_checks')
-                       .select('*')
-                       .gte('timestamp', cutoff_time)
-                       .eq('is_profitable', True)
-                       .gte('annualized_return', min_apy)
-                       .order('annualized_return', desc=True)
-                       .execute())
-            
-            return response.data or []
-            
+            return self.query_cache.get_or_load(
+                'get_profitable_opportunities', (days, min_apy, limit, after, include_data), ('arbitrage_checks',),
+                lambda: self.backend.get_profitable_opportunities(days, min_apy, limit, after, include_data))
         except Exception as e:
             logger.error(f"查询盈利机会时出错: {e}")
             return []
     
     def get_statistics(self, days: int = 7) -> Dict[str, Any]:
         """获取统计数据"""
-        if not self.connected or not self.supabase:
+        if not self.connected:
             return {}
         
         try:
-            cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
-            
-            # 获取总检查次数
-            total_checks_response = (self.supabase.table('arbitrage_checks')
-                                   .select('id', count='exact')
-                                   .gte('timestamp', cutoff_time)
-                                   .execute())
-            
-            # 获取盈利机会次数
-            profitable_response = (self.supabase.table('arbitrage_checks')
-                                 .select('id', count='exact')
-                                 .gte('timestamp', cutoff_time)
-                                 .eq('is_profitable', True)
-                                 .execute())
-            
-            # 获取最高年化收益率
-            max_apy_response = (self.supabase.table('arbitrage_checks')
-                              .select('annualized_return')
-                              .gte('timestamp', cutoff_time)
-                              .order('annualized_return', desc=True)
-                              .limit(1)
-                              .execute())
-            
-            # 获取平均年化收益率
-            avg_apy_response = (self.supabase.rpc('avg_annualized_return', {
-                'start_time': cutoff_time
-            }).execute())
-            
-            total_checks = total_checks_response.count or 0
-            profitable_count = profitable_response.count or 0
-            max_apy = max_apy_response.data[0]['annualized_return'] if max_apy_response.data else 0
-            avg_apy = avg_apy_response.data if avg_apy_response.data else 0
-            
-            return {
-                'period_days': days,
-                'total_checks': total_checks,
-                'profitable_opportunities': profitable_count,
-                'success_rate': (profitable_count / total_checks * 100) if total_checks > 0 else 0,
-                'max_apy': max_apy,
-                'avg_apy': avg_apy
-            }
-            
+            return self.query_cache.get_or_load(
+                'get_statistics', (days,), ('arbitrage_checks',),
+                lambda: self.backend.get_statistics(days))
         except Exception as e:
             logger.error(f"获取统计数据时出错: {e}")
             return {}
     
     def cleanup_old_data(self, days: int = 30) -> bool:
         """清理旧数据"""
-        if not self.connected or not self.supabase:
+        if not self.connected:
             return False
         
         try:
-            cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
-            
-            # 删除旧的检查记录
-            checks_response = (self.supabase.table('arbitrage_checks')
-                             .delete()
-                             .lt('timestamp', cutoff_time)
-                             .execute())
-            
-            # 删除旧的告警记录
-            alerts_response = (self.supabase.table('alerts')
-                             .delete()
-                             .lt('timestamp', cutoff_time)
-                             .execute())
-            
+            self.backend.cleanup_old_data(days)
+            self.query_cache.invalidate()
             logger.info(f"成功清理{days}天前的旧数据")
             return True
-            
         except Exception as e:
             logger.error(f"清理旧数据时出错: {e}")
             return False
+    
+    def stats(self) -> Dict[str, Any]:
+        """存储后端、写入队列与查询缓存状态"""
+        return {
+            'backend': self._backend.stats() if self._backend else {'backend': self.backend_kind},
+            'write_queue': self.write_queue.stats(),
+            'query_cache': self.query_cache.stats()
+        }
 
 # 全局数据库服务实例
 db_service = DatabaseService()
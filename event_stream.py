@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events 推送
+
+EventHub 在发布时把事件序列化一次，放入有界的重放缓冲区，所有订阅者共享同一份数据；
+断线重连时按 Last-Event-ID 从缓冲区补发错过的事件。
+
+订阅方式：
+- add_sse_route：注册在主端口的 aiohttp 服务上（HTTP_SERVER=aiohttp，默认），
+  所有连接由一个事件循环服务，不占用线程
+- Flask 路由 /arbitrage/stream（HTTP_SERVER=flask 时使用，每个连接占用一个服务线程，
+  同时连接数受 SSE_MAX_THREAD_SUBSCRIBERS 限制）
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE = ": keepalive\n\n"
+
+
+class EventHub:
+    """事件发布中心（线程安全）"""
+
+    def __init__(self, replay_size: int = 1000):
+        self._buffer: Deque[Tuple[int, str]] = deque(maxlen=max(1, replay_size))
+        self._cond = threading.Condition()
+        self._last_id = 0
+        self._listeners: List[Callable[[], None]] = []
+        self._stats = {'published': 0, 'subscribers': 0, 'thread_subscribers': 0, 'rejected': 0,
+                       'resumed': 0, 'gaps': 0}
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: str, data: Any) -> int:
+        """发布事件，返回事件id"""
+        body = json.dumps(data, ensure_ascii=False, default=str)
+        with self._cond:
+            self._last_id += 1
+            event_id = self._last_id
+            self._buffer.append((event_id, f"id: {event_id}\nevent: {event}\ndata: {body}\n\n"))
+            self._stats['published'] += 1
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"事件通知失败: {e}")
+        return event_id
+
+    def add_listener(self, listener: Callable[[], None]):
+        """注册发布回调（aiohttp SSE路由用来唤醒事件循环）"""
+        with self._cond:
+            self._listeners.append(listener)
+
+    def events_after(self, last_id: int) -> Tuple[List[str], int]:
+        """返回 last_id 之后缓冲区中的事件及新的游标；错过的事件已被淘汰时先发送 gap 事件"""
+        with self._cond:
+            if last_id >= self._last_id or not self._buffer:
+                # 服务重启后客户端的id可能大于当前id，从当前位置继续
+                return [], min(max(last_id, 0), self._last_id)
+
+            first_id = self._buffer[0][0]
+            payloads = []
+            if last_id < first_id - 1:
+                self._stats['gaps'] += 1
+                gap = json.dumps({'missed_from': last_id + 1, 'resumed_at': first_id})
+                payloads.append(f"event: gap\ndata: {gap}\n\n")
+            start = max(0, last_id - first_id + 1)
+            payloads.extend(payload for _, payload in islice(self._buffer, start, None))
+            return payloads, self._last_id
+
+    def wait(self, last_id: int, timeout: float) -> Tuple[List[str], int]:
+        """阻塞直到有新事件或超时"""
+        with self._cond:
+            if last_id >= self._last_id:
+                self._cond.wait(timeout)
+        return self.events_after(last_id)
+
+    def resolve_cursor(self, last_event_id: Optional[str]) -> int:
+        """Last-Event-ID 转为游标；没有时只接收之后的新事件"""
+        if last_event_id:
+            try:
+                self._stats['resumed'] += 1
+                return max(0, int(last_event_id))
+            except ValueError:
+                pass
+        return self._last_id
+
+    def subscribe(self, last_event_id: Optional[str], heartbeat: float) -> Iterator[str]:
+        """同步订阅：生成SSE文本块，空闲时发送心跳注释"""
+        cursor = self.resolve_cursor(last_event_id)
+        self.track_subscriber(1)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                payloads, cursor = self.wait(cursor, heartbeat)
+                yield ''.join(payloads) if payloads else KEEPALIVE
+        finally:
+            self.track_subscriber(-1)
+
+    def open_subscription(self, last_event_id: Optional[str], heartbeat: float,
+                          limit: int = 0) -> Optional['Subscription']:
+        """占用一个服务线程的同步订阅；已有 limit 个时返回None（limit 为0不限制）"""
+        with self._cond:
+            if limit and self._stats['thread_subscribers'] >= limit:
+                self._stats['rejected'] += 1
+                return None
+            self._stats['thread_subscribers'] += 1
+        return Subscription(self, self.subscribe(last_event_id, heartbeat))
+
+    def track_subscriber(self, delta: int):
+        with self._cond:
+            self._stats['subscribers'] += delta
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'last_event_id': self._last_id,
+                'buffered': len(self._buffer),
+                'replay_size': self._buffer.maxlen,
+                **self._stats
+            }
+
+
+class Subscription:
+    """同步订阅的响应体：WSGI服务器在连接结束时调用 close()，即使生成器从未开始也会释放名额"""
+
+    def __init__(self, hub: EventHub, chunks: Iterator[str]):
+        self._hub = hub
+        self._chunks = chunks
+        self._closed = False
+
+    def __iter__(self) -> 'Subscription':
+        return self
+
+    def __next__(self) -> str:
+        return next(self._chunks)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._chunks.close()
+        with self._hub._cond:
+            self._hub._stats['thread_subscribers'] -= 1
+
+
+def add_sse_route(app: 'web.Application', hub: EventHub, heartbeat: float = 15.0,
+                  path: str = '/arbitrage/stream'):
+    """在 aiohttp 应用上注册SSE路由，所有订阅连接由应用所在的事件循环服务，不占用线程"""
+    import asyncio
+    from aiohttp import web
+
+    state = {'loop': None, 'event': None}
+
+    def wake():
+        # 发布线程中调用：替换事件对象，唤醒所有等待中的连接
+        def _set():
+            state['event'].set()
+            state['event'] = asyncio.Event()
+        state['loop'].call_soon_threadsafe(_set)
+
+    async def on_startup(app: 'web.Application'):
+        state['loop'] = asyncio.get_running_loop()
+        state['event'] = asyncio.Event()
+        hub.add_listener(wake)
+
+    async def handle(request: 'web.Request') -> 'web.StreamResponse':
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Access-Control-Allow-Origin': '*'
+        })
+        await response.prepare(request)
+        cursor = hub.resolve_cursor(request.headers.get('Last-Event-ID') or request.query.get('last_event_id'))
+        hub.track_subscriber(1)
+        try:
+            await response.write(b"retry: 3000\n\n")
+            while True:
+                payloads, cursor = hub.events_after(cursor)
+                if not payloads:
+                    event = state['event']
+                    try:
+                        await asyncio.wait_for(event.wait(), heartbeat)
+                        continue
+                    except asyncio.TimeoutError:
+                        payloads = [KEEPALIVE]
+                await response.write(''.join(payloads).encode())
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            hub.track_subscriber(-1)
+        return response
+
+    app.on_startup.append(on_startup)
+    app.router.add_get(path, handle)
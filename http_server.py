@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+主端口HTTP服务（aiohttp）
+
+所有接口共用 PORT 一个端口（Railway 只转发这一个端口）：
+- /arbitrage/stream 由事件循环直接推送（event_stream.add_sse_route），订阅连接不占用线程
+- 其他路径转交给 Flask 应用（WSGI），在固定大小的线程池中执行，响应体读完后一次返回
+
+Flask 的接口都是普通的请求-响应，不需要流式输出；线程池大小即同时处理的普通请求数。
+"""
+
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import unquote_to_bytes
+
+from aiohttp import web
+
+from event_stream import EventHub, add_sse_route
+
+logger = logging.getLogger(__name__)
+
+# 由 aiohttp 根据响应体重新计算的头
+_HOP_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+
+
+def wsgi_environ(request: web.Request, body: bytes) -> Dict[str, Any]:
+    """按 PEP 3333 由 aiohttp 请求构造 WSGI environ"""
+    path = request.raw_path.split('?', 1)[0]
+    host, _, port = (request.host or '').partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host or 'localhost',
+        'SERVER_PORT': port or ('443' if request.scheme == 'https' else '80'),
+        'SERVER_PROTOCOL': f'HTTP/{request.version.major}.{request.version.minor}',
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        key = name.upper().replace('-', '_')
+        if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            continue
+        key = f'HTTP_{key}'
+        # 同名头按 RFC 7230 用逗号合并
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app: Callable, environ: Dict[str, Any]) -> Tuple[str, List[Tuple[str, str]], bytes]:
+    """在工作线程中调用WSGI应用，返回 (状态行, 响应头, 响应体)"""
+    response: Dict[str, Any] = {}
+    chunks: List[bytes] = []
+
+    def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+        # 响应头在应用返回后才发送，出错时直接替换为错误响应
+        response['status'] = status
+        response['headers'] = headers
+        return chunks.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        chunks.extend(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+def create_app(wsgi_app: Callable, hub: EventHub, heartbeat: float = 15.0,
+               threads: int = 16, sse_path: str = '/arbitrage/stream') -> web.Application:
+    """SSE路由由事件循环处理，其余请求转交 wsgi_app"""
+    executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='http-worker')
+
+    async def forward(request: web.Request) -> web.Response:
+        body = await request.read()
+        environ = wsgi_environ(request, body)
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(executor, call_wsgi, wsgi_app, environ)
+        code, _, reason = status.partition(' ')
+        response = web.Response(status=int(code), reason=reason or None, body=content)
+        for name, value in headers:
+            if name.lower() not in _HOP_HEADERS:
+                response.headers.add(name, value)
+        return response
+
+    async def on_cleanup(app: web.Application):
+        executor.shutdown(wait=False)
+
+    app = web.Application()
+    add_sse_route(app, hub, heartbeat, sse_path)
+    app.router.add_route('*', '/{tail:.*}', forward)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def serve(wsgi_app: Callable, hub: EventHub, host: str, port: int, heartbeat: float = 15.0,
+          threads: int = 16):
+    """在当前线程运行服务直到进程退出"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    # 退出时不等待长连接的SSE订阅自行结束
+    runner = web.AppRunner(create_app(wsgi_app, hub, heartbeat, threads), access_log=None, shutdown_timeout=1.0)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, host, port).start())
+    logger.info(f"🌐 HTTP服务已启动（aiohttp，{threads} 个请求线程） - 端口: {port}")
+    try:
+        loop.run_forever()
+    finally:
+        loop.run_until_complete(runner.cleanup())
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
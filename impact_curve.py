@@ -0,0 +1,286 @@
+"""
+交易对价格影响曲线
+
+采样点来自本来就要获取的实时报价（阶梯、最优金额搜索、路径求值的各段报价），对
+(log 金额, 平均成交价) 做 Fritsch-Carlson 单调三次插值：曲线经过每个采样点，相邻采样点之间
+不会出现样本中没有的起伏。最小采样金额的成交价作为参考价，价格影响 = (成交价 / 参考价 - 1) × 100%。
+
+- 估算：采样范围内任意金额的输出与价格影响直接由曲线计算，不需要浏览器；
+  低于最小采样金额时按参考价，高于最大采样金额时不外推
+- 有效期：超过 IMPACT_CURVE_MAX_AGE 的采样点被丢弃，剩余采样点不足时曲线不可用
+- 主动采样：只对报价来源为 http 的交易对按 IMPACT_SAMPLE_AMOUNTS 在后台采样，从不占用浏览器池
+- 误差跟踪：每次实时报价都与曲线估算对比并记录误差，超过 IMPACT_MAX_ERROR_BPS 时曲线及旧采样点作废
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import IMPACT_SAMPLE_AMOUNTS, IMPACT_CURVE_MAX_AGE, IMPACT_MAX_ERROR_BPS
+from metrics import STAGE_SECONDS, IMPACT_CURVE_REFRESHES, IMPACT_CURVE_ERROR_BPS, IMPACT_CURVE_ESTIMATES
+
+
+def _end_slope(h0: float, h1: float, d0: float, d1: float) -> float:
+    """端点斜率（三点公式，保持单调）"""
+    slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+    if slope * d0 <= 0:
+        return 0.0
+    if d0 * d1 <= 0 and abs(slope) > abs(3 * d0):
+        return 3 * d0
+    return slope
+
+
+def monotone_slopes(xs: Sequence[float], ys: Sequence[float]) -> List[float]:
+    """Fritsch-Carlson 单调三次插值在各节点的斜率"""
+    h = [x1 - x0 for x0, x1 in zip(xs, xs[1:])]
+    delta = [(y1 - y0) / step for y0, y1, step in zip(ys, ys[1:], h)]
+    if len(xs) == 2:
+        return [delta[0], delta[0]]
+
+    slopes = [0.0] * len(xs)
+    for i in range(1, len(xs) - 1):
+        if delta[i - 1] * delta[i] > 0:
+            w1, w2 = 2 * h[i] + h[i - 1], h[i] + 2 * h[i - 1]
+            slopes[i] = (w1 + w2) / (w1 / delta[i - 1] + w2 / delta[i])
+    slopes[0] = _end_slope(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = _end_slope(h[-1], h[-2], delta[-1], delta[-2])
+    return slopes
+
+
+class ImpactCurve:
+    """单个交易对的成交价曲线"""
+
+    def __init__(self, pair: str, samples: Sequence[Tuple[float, float]], fitted_at: Optional[float] = None):
+        points = sorted({amount: output for amount, output in samples if amount > 0 and output and output > 0}.items())
+        if len(points) < 2:
+            raise ValueError(f"交易对 {pair} 的有效采样点不足两个")
+        self.pair = pair
+        self.samples = points
+        self.fitted_at = time.time() if fitted_at is None else fitted_at
+        self._xs = [math.log(amount) for amount, _ in points]
+        self._rates = [output / amount for amount, output in points]
+        self._slopes = monotone_slopes(self._xs, self._rates)
+
+    @property
+    def spot_rate(self) -> float:
+        """参考价：最小采样金额的成交价"""
+        return self._rates[0]
+
+    @property
+    def min_amount(self) -> float:
+        return self.samples[0][0]
+
+    @property
+    def max_amount(self) -> float:
+        return self.samples[-1][0]
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fitted_at
+
+    def rate(self, amount: float) -> Optional[float]:
+        """金额对应的平均成交价，超出最大采样金额返回None"""
+        if amount <= 0 or amount > self.max_amount * (1 + 1e-9):
+            return None
+        x = math.log(amount)
+        if x <= self._xs[0]:
+            return self._rates[0]
+
+        i = next((i for i in range(1, len(self._xs)) if x <= self._xs[i]), len(self._xs) - 1) - 1
+        step = self._xs[i + 1] - self._xs[i]
+        t = (x - self._xs[i]) / step
+        return ((2 * t ** 3 - 3 * t ** 2 + 1) * self._rates[i]
+                + (t ** 3 - 2 * t ** 2 + t) * step * self._slopes[i]
+                + (-2 * t ** 3 + 3 * t ** 2) * self._rates[i + 1]
+                + (t ** 3 - t ** 2) * step * self._slopes[i + 1])
+
+    def output(self, amount: float) -> Optional[float]:
+        rate = self.rate(amount)
+        return amount * rate if rate is not None else None
+
+    def price_impact(self, amount: float, output: Optional[float] = None) -> Optional[float]:
+        """价格影响（%），给出 output 时按该实际输出计算，否则按曲线估算"""
+        if output is None:
+            output = self.output(amount)
+        if not output or amount <= 0:
+            return None
+        return (output / amount / self.spot_rate - 1) * 100
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pair': self.pair,
+            'age_seconds': round(self.age, 1),
+            'spot_rate': self.spot_rate,
+            'samples': [{'amount': amount, 'output_amount': output,
+                         'price_impact': self.price_impact(amount, output)}
+                        for amount, output in self.samples]
+        }
+
+
+# 拟合曲线至少需要两个金额，且最大与最小金额相差 MIN_SPAN 倍以上
+MIN_SPAN = 2.0
+
+
+def _sample_key(amount: float) -> float:
+    """采样点按三位有效数字合并，相近金额的报价只保留最新一次"""
+    return float(f'{amount:.3g}')
+
+
+class ImpactModel:
+    """各交易对的价格影响曲线：由实时报价累积采样点，跟踪曲线与实时报价的误差
+
+    sample(pair, amount) 为可选的主动采样报价函数，can_sample(pair) 为 True 的交易对才会调用
+    （ExchangeService 只允许 http 报价来源），用于补齐曲线或在曲线过期后后台刷新
+    """
+
+    def __init__(self, sample: Optional[Callable[[str, float], Optional[Dict[str, Any]]]] = None,
+                 can_sample: Callable[[str], bool] = lambda pair: False,
+                 sample_amounts: Sequence[float] = IMPACT_SAMPLE_AMOUNTS,
+                 max_age: float = IMPACT_CURVE_MAX_AGE, max_error_bps: float = IMPACT_MAX_ERROR_BPS):
+        self.sample = sample
+        self.can_sample = can_sample
+        self.sample_amounts = sorted(set(sample_amounts))
+        self.max_age = max_age
+        self.max_error_bps = max_error_bps
+        # 交易对 -> {金额键: (金额, 输出, 报价时间)}
+        self._points: Dict[str, Dict[float, Tuple[float, float, float]]] = {}
+        self._curves: Dict[str, ImpactCurve] = {}
+        self._errors: Dict[str, Dict[str, float]] = {}
+        self._refreshing: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def curve(self, pair: str) -> Optional[ImpactCurve]:
+        """未过期的曲线，没有则返回None"""
+        with self._lock:
+            curve = self._curves.get(pair)
+        return curve if curve and curve.age <= self.max_age else None
+
+    def _refit(self, pair: str):
+        """丢弃过期采样点并用剩余采样点重新拟合，调用方持有锁"""
+        cutoff = time.time() - self.max_age
+        points = self._points.setdefault(pair, {})
+        for key in [key for key, (_, _, quoted_at) in points.items() if quoted_at < cutoff]:
+            del points[key]
+
+        amounts = [amount for amount, _, _ in points.values()]
+        if len(amounts) < 2 or max(amounts) < min(amounts) * MIN_SPAN:
+            self._curves.pop(pair, None)
+            return
+        # 曲线的时间取最早的采样点，最早的点过期时曲线同时过期
+        self._curves[pair] = ImpactCurve(pair, [(amount, output) for amount, output, _ in points.values()],
+                                         fitted_at=min(quoted_at for _, _, quoted_at in points.values()))
+
+    def add_samples(self, pair: str, samples: Sequence[Tuple[float, float]]):
+        """加入实时报价 (金额, 输出) 并重新拟合"""
+        now = time.time()
+        with self._lock:
+            points = self._points.setdefault(pair, {})
+            for amount, output in samples:
+                if amount > 0 and output and output > 0:
+                    points[_sample_key(amount)] = (amount, output, now)
+            self._refit(pair)
+
+    def refresh(self, pair: str) -> Optional[ImpactCurve]:
+        """按 IMPACT_SAMPLE_AMOUNTS 主动采样并重新拟合；不允许采样的交易对直接返回当前曲线"""
+        if self.sample is None or not self.can_sample(pair):
+            return self.curve(pair)
+
+        with self._lock:
+            pending = self._refreshing.get(pair)
+            if pending is None:
+                self._refreshing[pair] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            return self.curve(pair)
+
+        try:
+            with STAGE_SECONDS.time(stage='impact_curve_refresh'):
+                with ThreadPoolExecutor(max_workers=len(self.sample_amounts),
+                                        thread_name_prefix='impact-sample') as executor:
+                    outputs = list(executor.map(lambda amount: self._sample(pair, amount), self.sample_amounts))
+            self.add_samples(pair, list(zip(self.sample_amounts, outputs)))
+        except Exception as e:
+            print(f"价格影响曲线采样失败 ({pair}): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(pair).set()
+
+        curve = self.curve(pair)
+        IMPACT_CURVE_REFRESHES.inc(pair=pair, outcome='success' if curve else 'failure')
+        if curve:
+            print(f"价格影响曲线已刷新 ({pair}): {len(curve.samples)} 个采样点, "
+                  f"最大金额 {curve.max_amount:,.0f} 价格影响 {curve.price_impact(curve.max_amount):.3f}%")
+        return curve
+
+    def _sample(self, pair: str, amount: float) -> Optional[float]:
+        quote = self.sample(pair, amount)
+        return quote['output_amount'] if quote else None
+
+    def refresh_in_background(self, pair: str):
+        """允许主动采样的交易对在后台刷新，其他交易对只等待实时报价累积采样点"""
+        if self.sample is None or not self.can_sample(pair):
+            return
+        with self._lock:
+            if pair in self._refreshing:
+                return
+        threading.Thread(target=self.refresh, args=(pair,), name=f'impact-refresh-{pair}', daemon=True).start()
+
+    def estimate(self, pair: str, amount: float) -> Optional[Dict[str, Any]]:
+        """按曲线估算报价，格式与实时报价相同；曲线不可用时在后台刷新（如允许）并返回None，从不阻塞"""
+        curve = self.curve(pair)
+        if curve is None:
+            self.refresh_in_background(pair)
+        output = curve.output(amount) if curve else None
+        IMPACT_CURVE_ESTIMATES.inc(pair=pair, outcome='curve' if output else 'miss')
+        if not output:
+            return None
+        return {
+            'input_amount': float(amount),
+            'output_amount': output,
+            'exchange_rate': output / amount,
+            'source': 'curve',
+            'price_impact': curve.price_impact(amount, output),
+            'curve_age_seconds': curve.age
+        }
+
+    def observe(self, pair: str, amount: float, output: float) -> Optional[float]:
+        """记录一次实时报价：与曲线估算对比误差，加入采样点，返回该报价的价格影响（%）
+
+        没有可用曲线或曲线误差超过阈值（曲线及旧采样点作废）时价格影响未知，返回None
+        """
+        curve = self.curve(pair)
+        estimated = curve.output(amount) if curve else None
+        impact = curve.price_impact(amount, output) if curve else None
+
+        if estimated:
+            error_bps = abs(estimated / output - 1) * 10_000
+            IMPACT_CURVE_ERROR_BPS.observe(error_bps, pair=pair)
+            with self._lock:
+                errors = self._errors.setdefault(pair, {'count': 0, 'mean_bps': 0.0, 'max_bps': 0.0})
+                errors['count'] += 1
+                errors['mean_bps'] += (error_bps - errors['mean_bps']) / errors['count']
+                errors['max_bps'] = max(errors['max_bps'], error_bps)
+                errors['last_bps'] = error_bps
+                if error_bps > self.max_error_bps:
+                    print(f"价格影响曲线误差 {error_bps:.1f}bp 超过阈值 ({pair} {amount:,.0f})，曲线作废")
+                    self._points.pop(pair, None)
+                    self._curves.pop(pair, None)
+                    impact = None
+
+        self.add_samples(pair, [(amount, output)])
+        if self.curve(pair) is None:
+            self.refresh_in_background(pair)
+        return impact
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            curves, errors = dict(self._curves), {pair: dict(e) for pair, e in self._errors.items()}
+        return {
+            'max_age_seconds': self.max_age,
+            'max_error_bps': self.max_error_bps,
+            'pairs': {pair: {**curve.to_dict(), 'fresh': curve.age <= self.max_age,
+                             'errors': errors.get(pair)}
+                      for pair, curve in curves.items()}
+        }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+手动检查的异步任务队列
+
+提交后立即返回任务id，由固定数量的工作线程从有界队列中取任务执行；
+队列已满时拒绝提交并给出预计可重试的秒数。排队中的任务可以取消，
+每个任务记录排队等待与执行耗时，完成的任务保留最近的若干条供查询。
+"""
+
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"任务队列已满，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class Job:
+    """一个异步任务"""
+
+    def __init__(self, kind: str, params: Dict[str, Any], fn: Callable[[], Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.fn = fn
+        self.status = PENDING
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def queue_seconds(self) -> Optional[float]:
+        end = self.started_at or self.finished_at
+        return end - self.submitted_at if end else None
+
+    @property
+    def run_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        def iso(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'submitted_at': iso(self.submitted_at),
+            'started_at': iso(self.started_at),
+            'finished_at': iso(self.finished_at),
+            'queue_seconds': round(self.queue_seconds, 3) if self.queue_seconds is not None else None,
+            'run_seconds': round(self.run_seconds, 3) if self.run_seconds is not None else None
+        }
+
+
+class JobQueue:
+    """有界任务队列 + 固定大小的工作线程池（线程安全）"""
+
+    def __init__(self, workers: int = 2, max_queue: int = 20, retention: int = 500,
+                 name: str = 'check-job'):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.retention = max(1, retention)
+        self.name = name
+
+        self._pending: Deque[Job] = deque()
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._closing = False
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'total_queue_seconds': 0.0,
+            'total_run_seconds': 0.0
+        }
+
+    def submit(self, kind: str, params: Dict[str, Any], fn: Callable[[], Any]) -> Job:
+        """提交任务；队列已满时抛出 QueueFullError，已关闭时抛出 RuntimeError"""
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("任务队列已关闭")
+            if len(self._pending) >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise QueueFullError(self._retry_after())
+
+            job = Job(kind, params, fn)
+            self._pending.append(job)
+            self._jobs[job.id] = job
+            self._stats['submitted'] += 1
+            self._evict()
+            self._ensure_threads()
+            self._cond.notify()
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """取消排队中的任务；执行中的任务无法中断，状态不变"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == PENDING:
+                self._pending.remove(job)
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._stats['cancelled'] += 1
+            return job
+
+    def _retry_after(self) -> int:
+        # 调用方已持有锁：按平均执行耗时估算排队任务全部开始所需的时间
+        finished = self._stats['succeeded'] + self._stats['failed']
+        average = self._stats['total_run_seconds'] / finished if finished else 30.0
+        return max(1, math.ceil(average * (len(self._pending) + self._running) / self.workers))
+
+    def _evict(self):
+        # 调用方已持有锁：只淘汰已结束的旧任务
+        excess = len(self._jobs) - self.retention
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED][:excess]:
+            del self._jobs[job_id]
+
+    def _ensure_threads(self):
+        # 调用方已持有锁：按需启动工作线程
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+
+            try:
+                result = job.fn()
+                status, error = SUCCEEDED, None
+            except Exception as e:
+                logger.error(f"任务 {job.id} 执行失败: {e}")
+                result, status, error = None, FAILED, str(e)
+
+            with self._cond:
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = time.time()
+                job.fn = None
+                self._running -= 1
+                self._stats[status] += 1
+                self._stats['total_queue_seconds'] += job.queue_seconds
+                self._stats['total_run_seconds'] += job.run_seconds
+                self._cond.notify_all()
+
+    def close(self, timeout: float = 0):
+        """停止接收任务，取消排队中的任务，最多等待 timeout 秒让执行中的任务结束"""
+        with self._cond:
+            self._closing = True
+            while self._pending:
+                job = self._pending.popleft()
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._stats['cancelled'] += 1
+            self._cond.notify_all()
+            deadline = time.monotonic() + timeout
+            while self._running and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            finished = self._stats['succeeded'] + self._stats['failed']
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': len(self._pending),
+                'running': self._running,
+                'retained': len(self._jobs),
+                'submitted': self._stats['submitted'],
+                'rejected': self._stats['rejected'],
+                'succeeded': self._stats['succeeded'],
+                'failed': self._stats['failed'],
+                'cancelled': self._stats['cancelled'],
+                'avg_queue_seconds': self._stats['total_queue_seconds'] / finished if finished else None,
+                'avg_run_seconds': self._stats['total_run_seconds'] / finished if finished else None
+            }
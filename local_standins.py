@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+本地替身服务
+
+用于离线测试和计时：
+- /swap   1inch兑换页面的本地替身（保留 .token-amount-input input 结构）
+- /quote  聚合器风格的JSON报价接口（src/dst 可为代币符号或合约地址），可配置响应延迟
+- /rpc    以太坊JSON-RPC替身，模拟sUSDe金库和Multicall3（支持批量请求）
+- /rest/v1/  Supabase(PostgREST)替身，内存表，支持本项目用到的过滤、排序、计数和统计RPC
+
+用法:
+    python local_standins.py --port 8090 --quote-delay 0.3
+    ONEINCH_APP_URL=http://127.0.0.1:8090 python main_backend.py
+    QUOTE_PROVIDER=http AGGREGATOR_API_URL=http://127.0.0.1:8090 python main_backend.py
+    INFURA_URL=http://127.0.0.1:8090/rpc python main_backend.py
+    STORAGE_BACKEND=supabase SUPABASE_URL=http://127.0.0.1:8090 SUPABASE_SERVICE_ROLE_KEY=standin python main_backend.py
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, parse_qsl
+
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_utils import function_signature_to_4byte_selector
+
+from config import TokenConfig, MULTICALL3_ADDRESS
+
+STANDIN_TOKENS = ('USDT', 'USDE', 'SUSDE', 'USDC', 'DAI')
+
+# 替身报价使用的基础汇率（输出/输入）
+DEFAULT_RATES = {
+    ('USDT', 'SUSDE'): 0.855,
+    ('USDE', 'USDT'): 0.9995,
+    ('USDC', 'SUSDE'): 0.8548,
+    ('USDE', 'USDC'): 0.9993,
+    ('USDT', 'USDE'): 1.0004,
+    ('SUSDE', 'USDT'): 1.1685,
+    ('USDT', 'USDC'): 0.9999,
+    ('USDC', 'USDT'): 0.9999,
+    ('DAI', 'SUSDE'): 0.8546,
+    ('USDE', 'DAI'): 0.9991,
+}
+
+SWAP_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>1inch swap fixture</title></head>
+<body>
+<div class="swap-form">
+  <div class="token-amount-input"><input id="src-amount" inputmode="decimal" value=""></div>
+  <div class="token-amount-input"><input id="dst-amount" inputmode="decimal" value="" readonly></div>
+</div>
+<script>
+  const params = new URLSearchParams(location.search);
+  const src = (params.get('src') || '').split(':').pop();
+  const dst = (params.get('dst') || '').split(':').pop();
+  const decimals = __DECIMALS__;
+  const debounceMs = __DEBOUNCE_MS__;
+  const srcInput = document.getElementById('src-amount');
+  const dstInput = document.getElementById('dst-amount');
+  let timer = null;
+
+  function toRaw(text, dec) {
+    const [whole, frac = ''] = text.split('.');
+    return BigInt(whole || '0') * 10n ** BigInt(dec) + BigInt((frac + '0'.repeat(dec)).slice(0, dec) || '0');
+  }
+
+  function fromRaw(raw, dec) {
+    const base = 10n ** BigInt(dec);
+    const frac = (raw % base).toString().padStart(dec, '0').slice(0, 6);
+    return (raw / base).toString() + '.' + frac;
+  }
+
+  srcInput.addEventListener('input', () => {
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      const text = srcInput.value.trim();
+      if (!text || isNaN(Number(text))) { dstInput.value = ''; return; }
+      const raw = toRaw(text, decimals[src.toUpperCase()]);
+      const resp = await fetch(`/quote?src=${src}&dst=${dst}&amount=${raw}`);
+      const quote = await resp.json();
+      if (srcInput.value.trim() === text) {
+        dstInput.value = fromRaw(BigInt(quote.dstAmount), decimals[dst.toUpperCase()]);
+      }
+    }, debounceMs);
+  });
+</script>
+</body>
+</html>
+"""
+
+
+def token_symbol(token: str) -> str:
+    """代币符号或合约地址 -> TokenConfig 中的代币名"""
+    for name in STANDIN_TOKENS:
+        if getattr(TokenConfig, name)['address'].lower() == token.lower():
+            return name
+    return token.upper()
+
+
+def token_decimals(symbol: str) -> int:
+    return getattr(TokenConfig, token_symbol(symbol))['decimals']
+
+
+class StandinQuoteBook:
+    """替身报价计算：基础汇率加线性价格影响"""
+
+    def __init__(self, rates: Optional[Dict[Tuple[str, str], float]] = None,
+                 impact_per_million: float = 0.001, delay: float = 0.0):
+        self.rates = dict(rates or DEFAULT_RATES)
+        self.impact_per_million = impact_per_million
+        self.delay = delay
+        self.quotes_served = 0
+
+    def quote(self, src: str, dst: str, raw_amount: int) -> Dict[str, str]:
+        src, dst = token_symbol(src), token_symbol(dst)
+        rate = self.rates[(src, dst)]
+        amount = Decimal(raw_amount) / (Decimal(10) ** token_decimals(src))
+        impact = Decimal(str(self.impact_per_million)) * amount / Decimal(1_000_000)
+        output = amount * Decimal(str(rate)) * (1 - impact)
+        dst_raw = int(output * (Decimal(10) ** token_decimals(dst)))
+
+        if self.delay:
+            time.sleep(self.delay)
+        self.quotes_served += 1
+
+        return {'srcAmount': str(raw_amount), 'dstAmount': str(dst_raw)}
+
+
+class StandinServer:
+    """在后台线程中运行的本地HTTP替身服务，按路径注册处理函数"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.routes: Dict[Tuple[str, str], Callable] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_route(self, method: str, path: str, fn: Callable):
+        """注册处理函数: fn(query, body, headers) -> (status, content_type, payload[, response_headers])"""
+        self.routes[(method.upper(), path)] = fn
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method: str):
+                parsed = urlparse(self.path)
+                fn = server.routes.get((method, parsed.path))
+                if fn is None:
+                    # 支持前缀路由，如 /rest/v1/
+                    for (route_method, route_path), candidate in server.routes.items():
+                        if route_method == method and route_path.endswith('/') and parsed.path.startswith(route_path):
+                            fn = candidate
+                            break
+                if fn is None:
+                    self.send_error(404)
+                    return
+
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                query['__path__'] = parsed.path
+                # 保留原始查询串，供需要重复参数的处理函数使用
+                query['__query__'] = parsed.query
+
+                status, content_type, payload, *extra = fn(query, body, self.headers)
+                if not isinstance(payload, (bytes, str)):
+                    payload = json.dumps(payload)
+                if isinstance(payload, str):
+                    payload = payload.encode()
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (extra[0] if extra else {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PATCH(self):
+                self._dispatch('PATCH')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'StandinServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='standin-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def _selector(signature: str) -> str:
+    return function_signature_to_4byte_selector(signature).hex()
+
+
+class StandinVault:
+    """sUSDe金库与链状态替身，按ERC4626（向下取整）计算赎回"""
+
+    def __init__(self, total_assets: int = 1_180_000_000 * 10 ** 18,
+                 total_supply: int = 1_000_000_000 * 10 ** 18,
+                 block_number: int = 20_000_000, delay: float = 0.0):
+        self.total_assets = total_assets
+        self.total_supply = total_supply
+        self.block_number = block_number
+        self.delay = delay
+        self.rpc_requests = 0
+        self.eth_calls = 0
+
+    def advance_block(self, asset_growth: int = 0):
+        """出块，可同时增加金库资产（模拟收益归集）"""
+        self.block_number += 1
+        self.total_assets += asset_growth
+
+    def convert_to_assets(self, shares: int) -> int:
+        return shares * (self.total_assets + 1) // (self.total_supply + 1)
+
+    def convert_to_shares(self, assets: int) -> int:
+        return assets * (self.total_supply + 1) // (self.total_assets + 1)
+
+    def _vault_call(self, data: str) -> bytes:
+        selector, args = data[:8], bytes.fromhex(data[8:])
+        if selector in (_selector('previewRedeem(uint256)'), _selector('convertToAssets(uint256)')):
+            return abi_encode(['uint256'], [self.convert_to_assets(abi_decode(['uint256'], args)[0])])
+        if selector in (_selector('previewDeposit(uint256)'), _selector('convertToShares(uint256)')):
+            return abi_encode(['uint256'], [self.convert_to_shares(abi_decode(['uint256'], args)[0])])
+        if selector == _selector('totalAssets()'):
+            return abi_encode(['uint256'], [self.total_assets])
+        if selector == _selector('totalSupply()'):
+            return abi_encode(['uint256'], [self.total_supply])
+        raise ValueError(f'unsupported vault selector {selector}')
+
+    def eth_call(self, to: str, data: str) -> bytes:
+        self.eth_calls += 1
+        data = data[2:] if data.startswith('0x') else data
+        if to.lower() == TokenConfig.SUSDE['address'].lower():
+            return self._vault_call(data)
+
+        if to.lower() == MULTICALL3_ADDRESS.lower():
+            selector, args = data[:8], bytes.fromhex(data[8:])
+            if selector == _selector('aggregate3((address,bool,bytes)[])'):
+                calls = abi_decode(['(address,bool,bytes)[]'], args)[0]
+                results = []
+                for target, _, call_data in calls:
+                    if target.lower() == TokenConfig.SUSDE['address'].lower():
+                        results.append((True, self._vault_call(call_data.hex())))
+                    elif (target.lower() == MULTICALL3_ADDRESS.lower()
+                          and call_data.hex() == _selector('getBlockNumber()')):
+                        results.append((True, abi_encode(['uint256'], [self.block_number])))
+                    else:
+                        results.append((False, b''))
+                return abi_encode(['(bool,bytes)[]'], [results])
+            if selector == _selector('getBlockNumber()'):
+                return abi_encode(['uint256'], [self.block_number])
+
+        raise ValueError(f'unsupported call target {to}')
+
+    def handle(self, request: Dict) -> Dict:
+        """处理单个JSON-RPC请求"""
+        method, params = request.get('method'), request.get('params', [])
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            if method == 'eth_chainId':
+                response['result'] = '0x1'
+            elif method == 'net_version':
+                response['result'] = '1'
+            elif method == 'web3_clientVersion':
+                response['result'] = 'standin/1.0'
+            elif method == 'eth_blockNumber':
+                response['result'] = hex(self.block_number)
+            elif method == 'eth_getBlockByNumber':
+                response['result'] = {'number': hex(self.block_number), 'hash': '0x' + f'{self.block_number:064x}',
+                                      'timestamp': hex(int(time.time())), 'transactions': []}
+            elif method == 'eth_call':
+                response['result'] = '0x' + self.eth_call(params[0]['to'], params[0]['data']).hex()
+            else:
+                response['error'] = {'code': -32601, 'message': f'method not found: {method}'}
+        except Exception as e:
+            response['error'] = {'code': -32000, 'message': str(e)}
+        return response
+
+
+def add_jsonrpc_routes(server: StandinServer, vault: StandinVault, path: str = '/rpc'):
+    """注册以太坊JSON-RPC替身（支持批量请求）"""
+
+    def rpc(query, body, headers):
+        vault.rpc_requests += 1
+        if vault.delay:
+            time.sleep(vault.delay)
+        request = json.loads(body or b'{}')
+        if isinstance(request, list):
+            return 200, 'application/json', [vault.handle(item) for item in request]
+        return 200, 'application/json', vault.handle(request)
+
+    server.add_route('POST', path, rpc)
+
+
+def add_oneinch_routes(server: StandinServer, quote_book: StandinQuoteBook, debounce_ms: int = 150):
+    """注册1inch兑换页面替身和报价接口"""
+    decimals = {symbol: getattr(TokenConfig, symbol)['decimals'] for symbol in STANDIN_TOKENS}
+    page = (SWAP_PAGE.replace('__DECIMALS__', json.dumps(decimals))
+            .replace('__DEBOUNCE_MS__', str(debounce_ms)))
+
+    def swap_page(query, body, headers):
+        return 200, 'text/html; charset=utf-8', page
+
+    def quote(query, body, headers):
+        try:
+            return 200, 'application/json', quote_book.quote(query['src'], query['dst'], int(query['amount']))
+        except (KeyError, ValueError) as e:
+            return 400, 'application/json', {'error': f'invalid quote request: {e}'}
+
+    server.add_route('GET', '/swap', swap_page)
+    server.add_route('GET', '/quote', quote)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """按不在括号和引号内的逗号拆分"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    parts.append(current)
+    return [part for part in parts if part]
+
+
+class StandinPostgrest:
+    """Supabase(PostgREST)替身：内存表，只实现 storage_backends.SupabaseBackend 用到的语法
+
+    过滤: eq / neq / gt / gte / lt / lte，or=(...) 与嵌套 and(...)；order、limit、select；
+    Prefer: count=exact 时返回 Content-Range；RPC get_rollup_statistics 和 avg_annualized_return
+    """
+
+    OPERATORS = {
+        'eq': lambda a, b: a == b,
+        'neq': lambda a, b: a != b,
+        'gt': lambda a, b: a > b,
+        'gte': lambda a, b: a >= b,
+        'lt': lambda a, b: a < b,
+        'lte': lambda a, b: a <= b,
+    }
+
+    def __init__(self, delay: float = 0.0):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.delay = delay
+        self.requests = 0
+        self._next_id: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def insert(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            stored = self.tables.setdefault(table, [])
+            inserted = []
+            for row in rows:
+                row_id = self._next_id.get(table, 1)
+                self._next_id[table] = row_id + 1
+                # 与数据库列默认值一致
+                inserted.append({'id': row_id, 'created_at': datetime.now().isoformat(), **row})
+            stored.extend(inserted)
+        return inserted
+
+    @staticmethod
+    def _coerce(raw: str, current: Any) -> Any:
+        """把过滤值转换为与列值可比较的类型"""
+        raw = raw.strip('"')
+        if isinstance(current, bool):
+            return raw.lower() == 'true'
+        if isinstance(current, (int, float)):
+            return float(raw)
+        return raw
+
+    def _condition(self, column: str, expression: str) -> Callable[[Dict], bool]:
+        if column in ('or', 'and'):
+            parts = [self._parse(part) for part in _split_top_level(expression[1:-1])]
+            combine = any if column == 'or' else all
+            return lambda row: combine(part(row) for part in parts)
+
+        op, _, raw = expression.partition('.')
+        compare = self.OPERATORS.get(op)
+        if compare is None:
+            raise ValueError(f'unsupported operator {op}')
+
+        def matches(row):
+            value = row.get(column)
+            if value is None:
+                return False
+            return compare(value, self._coerce(raw, value))
+        return matches
+
+    def _parse(self, text: str) -> Callable[[Dict], bool]:
+        """解析 or(...) 内的单个条件: column.op.value 或 and(...)"""
+        match = re.match(r'^(and|or)(\(.*\))$', text)
+        if match:
+            return self._condition(match.group(1), match.group(2))
+        column, _, expression = text.partition('.')
+        return self._condition(column, expression)
+
+    def _filtered(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        conditions = [self._condition(key, value) for key, value in params
+                      if key not in ('select', 'order', 'limit', 'offset', 'columns')]
+        with self._lock:
+            rows = list(self.tables.get(table, []))
+        return [row for row in rows if all(condition(row) for condition in conditions)]
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], int]:
+        rows = self._filtered(table, params)
+        total = len(rows)
+
+        orders = [item for key, value in params if key == 'order' for item in value.split(',')]
+        for item in reversed(orders):
+            column, _, direction = item.partition('.')
+            rows.sort(key=lambda row: (row.get(column) is not None, row.get(column)),
+                      reverse=direction.startswith('desc'))
+
+        values = dict(params)
+        offset = int(values.get('offset', 0))
+        limit = int(values['limit']) if 'limit' in values else None
+        rows = rows[offset:offset + limit if limit is not None else None]
+
+        columns = values.get('select', '*')
+        if columns != '*':
+            names = [name.strip() for name in columns.split(',')]
+            rows = [{name: row.get(name) for name in names} for row in rows]
+        return rows, total
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        doomed = {id(row) for row in self._filtered(table, params)}
+        with self._lock:
+            rows = self.tables.get(table, [])
+            removed = [row for row in rows if id(row) in doomed]
+            self.tables[table] = [row for row in rows if id(row) not in doomed]
+        return removed
+
+    def rpc(self, name: str, args: Dict[str, Any]) -> Any:
+        rows = self._filtered('arbitrage_checks', [('timestamp', f"gte.{args.get('start_time', '')}")])
+        apys = [row.get('annualized_return') or 0 for row in rows]
+        avg_apy = sum(apys) / len(apys) if apys else 0
+        if name == 'avg_annualized_return':
+            return avg_apy
+        if name == 'get_rollup_statistics':
+            best = max(rows, key=lambda row: row.get('annualized_return') or 0, default=None)
+            return [{
+                'total_checks': len(rows),
+                'profitable_count': sum(1 for row in rows if row.get('is_profitable')),
+                'max_apy': max(apys, default=0),
+                'avg_apy': avg_apy,
+                'best_opportunity_id': best['id'] if best else None
+            }]
+        raise ValueError(f'unknown function {name}')
+
+
+def add_postgrest_routes(server: StandinServer, store: StandinPostgrest, prefix: str = '/rest/v1/'):
+    """注册Supabase(PostgREST)替身"""
+
+    def handler(method: str):
+        def handle(query, body, headers):
+            store.requests += 1
+            if store.delay:
+                time.sleep(store.delay)
+            name = query['__path__'][len(prefix):]
+            params = parse_qsl(query['__query__'])
+            try:
+                if name.startswith('rpc/'):
+                    return 200, 'application/json', store.rpc(name[4:], json.loads(body or b'{}'))
+                if method == 'POST':
+                    rows = json.loads(body or b'[]')
+                    return 201, 'application/json', store.insert(name, rows if isinstance(rows, list) else [rows])
+                if method == 'DELETE':
+                    return 200, 'application/json', store.delete(name, params)
+
+                rows, total = store.select(name, params)
+                extra = {}
+                if 'count=exact' in (headers.get('Prefer') or ''):
+                    extra['Content-Range'] = f"0-{max(len(rows) - 1, 0)}/{total}"
+                return 200, 'application/json', rows, extra
+            except (ValueError, KeyError) as e:
+                return 400, 'application/json', {'message': str(e)}
+        return handle
+
+    for method in ('GET', 'POST', 'DELETE'):
+        server.add_route(method, prefix, handler(method))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动本地替身服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--quote-delay', type=float, default=0.3, help='报价接口响应延迟（秒）')
+    parser.add_argument('--rpc-delay', type=float, default=0.0, help='JSON-RPC响应延迟（秒）')
+    parser.add_argument('--db-delay', type=float, default=0.0, help='PostgREST响应延迟（秒）')
+    args = parser.parse_args()
+
+    standins = StandinServer(args.host, args.port)
+    add_oneinch_routes(standins, StandinQuoteBook(delay=args.quote_delay))
+    add_jsonrpc_routes(standins, StandinVault(delay=args.rpc_delay))
+    add_postgrest_routes(standins, StandinPostgrest(delay=args.db_delay))
+    standins.start()
+    print(f"本地替身服务已启动: {standins.url}/swap?src=1:USDT&dst=1:sUSDe")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standins.stop()
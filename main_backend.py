@@ -5,20 +5,41 @@ SusDE套利监控后端服务
 提供HTTP API接口和定期监控任务
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from datetime import datetime, timedelta
 import threading
 import logging
 import os
+import sys
+import atexit
+import signal
 import json
-from typing import Dict, List, Optional
+import socket
+import time
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
-from arbitrage_calculator import ArbitrageCalculator
 from models import ArbitrageResult
-from config import PORT, CHECK_INTERVAL_HOURS, ALERT_THRESHOLD
+from config import (PORT, CHECK_INTERVAL_HOURS, ALERT_THRESHOLD, MONITOR_MODE, LADDER_AMOUNTS,
+                    ALERT_HISTORY_CAPACITY, SERIES_RETENTION_HOURS, SERIES_MAX_POINTS, SSE_REPLAY_SIZE,
+                    SSE_HEARTBEAT_SECONDS, SSE_MAX_THREAD_SUBSCRIBERS, HTTP_SERVER, HTTP_THREADS, CHECK_FRESHNESS_SECONDS, CHECK_CACHE_MAX_ENTRIES,
+                    JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RETENTION, MONITOR_RUN_POLICY, MONITOR_RUN_DEADLINE,
+                    MONITOR_MAX_QUEUED, MONITOR_MISFIRE_GRACE)
 from database_service import db_service
+from pagination import clamp_limit, decode_cursor, build_page
+from alert_history import AlertHistory
+from time_series import ResultSeries, FIELDS as SERIES_FIELDS, summarize, downsample
+from event_stream import EventHub
+from single_flight import SingleFlight
+from job_queue import JobQueue, QueueFullError
+from monitor_runner import MonitorRunner, deadline_exceeded
+from route_graph import DEFAULT_ROUTE
+import metrics
+
+if TYPE_CHECKING:
+    from arbitrage_calculator import ArbitrageCalculator
 
 # 配置日志
 logging.basicConfig(
@@ -30,25 +51,47 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 
 # 全局变量
-calculator = ArbitrageCalculator()
+_calculator: Optional['ArbitrageCalculator'] = None
+_calculator_lock = threading.Lock()
 scheduler = BackgroundScheduler()
 monitoring_enabled = False
+# 调度线程写入、接口线程读取的检查状态，由 state_lock 保护
+state_lock = threading.Lock()
 last_check_time = None
 last_result = None
+last_ladder_results = []
+last_route_results = []
+last_optimize_search = None
 alert_history = []
 monitoring_config = {
     'cron_expression': '*/2 * * * *',  # 默认每2分钟检查一次
     'alert_threshold': ALERT_THRESHOLD,  # 年化收益率阈值
-    'amount': 100000  # 默认检查金额
+    'amount': 100000,  # 默认检查金额
+    'mode': MONITOR_MODE,  # 'single' / 'ladder' / 'routes' / 'optimize'
+    'ladder_amounts': list(LADDER_AMOUNTS),  # 阶梯模式下每次检查的金额
+    'run_policy': MONITOR_RUN_POLICY  # 上一次检查未结束时的处理: skip / queue / coalesce
 }
 
+def get_calculator() -> 'ArbitrageCalculator':
+    """首次使用时才创建套利计算器（连接以太坊节点、导入web3/playwright）"""
+    global _calculator
+    
+    if _calculator is None:
+        with _calculator_lock:
+            if _calculator is None:
+                from arbitrage_calculator import ArbitrageCalculator
+                _calculator = ArbitrageCalculator()
+    return _calculator
+
+# 实时推送：检查结果和告警发布后由 /arbitrage/stream 推送给订阅者
+event_hub = EventHub(SSE_REPLAY_SIZE)
+
 class AlertManager:
     """告警管理器"""
     
     def __init__(self):
         self.alert_threshold = ALERT_THRESHOLD
-        self.alert_history = []
-        self.max_history = 100
+        self.alert_history = AlertHistory(ALERT_HISTORY_CAPACITY)
     
     def check_alert_condition(self, result: ArbitrageResult) -> bool:
         """检查是否满足告警条件"""
@@ -57,50 +100,92 @@ class AlertManager:
     
     def add_alert(self, result: ArbitrageResult, message: str):
         """添加告警记录"""
+        alert_type = 'opportunity' if result.is_profitable else 'check'
+        timestamp = time.time()
+        alert_id = self.alert_history.append(result, message, alert_type, timestamp)
         alert = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
             'result': result.to_dict(),
             'message': message,
-            'alert_type': 'opportunity' if result.is_profitable else 'check'
+            'alert_type': alert_type
         }
         
-        self.alert_history.append(alert)
-        
-        # 保持历史记录在合理大小
-        if len(self.alert_history) > self.max_history:
-            self.alert_history.pop(0)
-        
         # 保存到数据库
         db_service.save_alert(alert)
+        event_hub.publish('alert', {'id': alert_id, **alert})
         
         logger.info(f"告警: {message}")
     
     def get_recent_alerts(self, hours: int = 24) -> List[Dict]:
         """获取最近的告警记录"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        cutoff_str = cutoff_time.isoformat()
-        
-        return [alert for alert in self.alert_history 
-                if alert['timestamp'] >= cutoff_str]
+        return self.alert_history.since(time.time() - hours * 3600)
+    
+    def count_recent_alerts(self, hours: int = 24) -> int:
+        """最近的告警数量（不生成告警内容）"""
+        return self.alert_history.count_since(time.time() - hours * 3600)
+    
+    def get_page(self, after_id: Optional[int], limit: int) -> List[Dict]:
+        """按id升序返回 after_id 之后的告警"""
+        return self.alert_history.page(after_id, limit)
 
 alert_manager = AlertManager()
 
-def perform_arbitrage_check():
-    """执行套利检查"""
+# 进程内的套利结果时间序列，趋势查询不经过数据库
+result_series = ResultSeries(SERIES_RETENTION_HOURS * 3600, SERIES_MAX_POINTS)
+
+# 手动检查的请求合并与结果新鲜度窗口
+check_flight = SingleFlight(CHECK_FRESHNESS_SECONDS, CHECK_CACHE_MAX_ENTRIES)
+
+# 异步检查任务：固定数量的工作线程，有界队列
+check_jobs = JobQueue(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RETENTION)
+
+def record_results(results: List[ArbitrageResult], check_type: str):
+    """保存检查结果：写入数据库队列、记录时间序列、推送给SSE订阅者"""
+    if len(results) == 1:
+        db_service.save_arbitrage_result(results[0], check_type)
+    else:
+        db_service.save_arbitrage_results(results, check_type)
+    # 时间序列与手动检查缓存只记录默认路径的结果
+    default_route = [result for result in results if result.route_name in (None, DEFAULT_ROUTE)]
+    result_series.record_many(default_route)
+    for result in default_route:
+        check_flight.store(float(result.initial_amount), result)
+    for result in results:
+        event_hub.publish('result', {**result.to_dict(), 'check_type': check_type})
+
+def perform_arbitrage_check(deadline: Optional[float] = None):
+    """执行套利检查；deadline 为本次运行的截止时间（monotonic），超时的结果不保存"""
     global last_check_time, last_result
     
+    if monitoring_config.get('mode') == 'ladder':
+        perform_ladder_check(deadline)
+        return
+    if monitoring_config.get('mode') == 'routes':
+        perform_routes_check(deadline)
+        return
+    if monitoring_config.get('mode') == 'optimize':
+        perform_optimize_check(deadline)
+        return
+    
     try:
         logger.info("开始定期套利检查")
-        last_check_time = datetime.now()
+        with state_lock:
+            last_check_time = datetime.now()
         
-        # 计算套利机会
-        result = calculator.calculate_arbitrage(monitoring_config['amount'])
-        last_result = result
+        def save(result: ArbitrageResult):
+            # 异步流水线中在后台线程执行，与计算收尾重叠；超过截止时间的结果不保存
+            if not deadline_exceeded(deadline):
+                record_results([result], "scheduled")
+        
+        # 计算套利机会，得到结果后立即保存
+        result = get_calculator().calculate_arbitrage(monitoring_config['amount'], on_result=save)
+        if deadline_exceeded(deadline):
+            logger.warning("定期检查超过截止时间，丢弃本次结果")
+            return
+        with state_lock:
+            last_result = result
         
         if result:
-            # 保存检查结果到数据库
-            db_service.save_arbitrage_result(result, "scheduled")
-            
             # 检查是否需要告警
             if alert_manager.check_alert_condition(result):
                 message = (f"🚀 发现套利机会!\n"
@@ -121,6 +206,180 @@ def perform_arbitrage_check():
         import traceback
         logger.error(traceback.format_exc())
 
+def perform_ladder_check(deadline: Optional[float] = None):
+    """执行阶梯套利检查：并发计算所有金额，结果批量保存"""
+    global last_check_time, last_result, last_ladder_results
+    
+    try:
+        amounts = monitoring_config['ladder_amounts']
+        logger.info(f"开始阶梯套利检查 - 金额: {amounts}")
+        with state_lock:
+            last_check_time = datetime.now()
+        
+        results = get_calculator().calculate_ladder(amounts)
+        if deadline_exceeded(deadline):
+            logger.warning("阶梯检查超过截止时间，丢弃本次结果")
+            return
+        
+        # 状态接口展示与检查金额一致的阶梯，否则展示年化收益最高的阶梯
+        summary_result = next((r for r in results if r.initial_amount == monitoring_config['amount']),
+                              max(results, key=lambda r: r.annualized_return)) if results else None
+        with state_lock:
+            last_ladder_results = results
+            last_result = summary_result
+        
+        if not results:
+            logger.error("阶梯套利检查失败")
+            return
+        
+        # 一次批量保存所有阶梯结果
+        record_results(results, "scheduled")
+        
+        opportunities = [r for r in results if alert_manager.check_alert_condition(r)]
+        for result in opportunities:
+            message = (f"🚀 发现套利机会!\n"
+                      f"金额: {result.initial_amount:,.0f} USDT\n"
+                      f"年化收益率: {result.annualized_return:.2f}%\n"
+                      f"预期利润: {result.profit_loss:.2f} USDT")
+            alert_manager.add_alert(result, message)
+        
+        if not opportunities:
+            summary = ", ".join(f"{r.initial_amount:,.0f}: {r.annualized_return:.2f}%" for r in results)
+            alert_manager.add_alert(summary_result, f"阶梯检查完成，年化收益率 - {summary}")
+        
+        logger.info(f"阶梯套利检查完成 - {len(results)}/{len(amounts)} 个阶梯成功")
+    
+    except Exception as e:
+        logger.error(f"阶梯检查时出错: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+
+def perform_routes_check(deadline: Optional[float] = None):
+    """执行多路径套利检查：所有配置的路径共享兑换边报价，结果批量保存"""
+    global last_check_time, last_result, last_route_results
+    
+    try:
+        amount = monitoring_config['amount']
+        logger.info(f"开始多路径套利检查 - 金额: {amount}")
+        with state_lock:
+            last_check_time = datetime.now()
+        
+        results = get_calculator().calculate_routes(amount)
+        if deadline_exceeded(deadline):
+            logger.warning("多路径检查超过截止时间，丢弃本次结果")
+            return
+        
+        best = max(results, key=lambda r: r.annualized_return) if results else None
+        with state_lock:
+            last_route_results = results
+            last_result = best
+        
+        if not results:
+            logger.error("多路径套利检查失败")
+            return
+        
+        record_results(results, "scheduled")
+        
+        opportunities = [r for r in results if alert_manager.check_alert_condition(r)]
+        for result in opportunities:
+            message = (f"🚀 发现套利机会!\n"
+                      f"路径: {result.route_name}\n"
+                      f"年化收益率: {result.annualized_return:.2f}%\n"
+                      f"预期利润: {result.profit_loss:.2f}")
+            alert_manager.add_alert(result, message)
+        
+        if not opportunities:
+            summary = ", ".join(f"{r.route_name}: {r.annualized_return:.2f}%" for r in results)
+            alert_manager.add_alert(best, f"多路径检查完成，年化收益率 - {summary}")
+        
+        logger.info(f"多路径套利检查完成 - {len(results)}/{len(get_calculator().route_graph.cycles)} 条路径成功")
+    
+    except Exception as e:
+        logger.error(f"多路径检查时出错: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+
+def perform_optimize_check(deadline: Optional[float] = None):
+    """执行最优金额检查：在配置的金额范围内搜索最优交易金额，所有计算过的金额批量保存"""
+    global last_check_time, last_result, last_optimize_search
+    
+    try:
+        logger.info("开始最优金额检查")
+        with state_lock:
+            last_check_time = datetime.now()
+        
+        search = get_calculator().optimize_trade_size()
+        if deadline_exceeded(deadline):
+            logger.warning("最优金额检查超过截止时间，丢弃本次结果")
+            return
+        
+        with state_lock:
+            last_optimize_search = search
+            last_result = search.optimum
+        
+        if search.samples:
+            record_results(search.samples, "scheduled")
+        if not search.optimum:
+            logger.error("最优金额检查未找到满足条件的金额")
+            return
+        
+        result = search.optimum
+        if alert_manager.check_alert_condition(result):
+            message = (f"🚀 发现套利机会!\n"
+                      f"最优金额: {result.initial_amount:,.0f} USDT\n"
+                      f"年化收益率: {result.annualized_return:.2f}%\n"
+                      f"预期利润: {result.profit_loss:.2f} USDT")
+        else:
+            message = (f"最优金额检查完成，{result.initial_amount:,.0f} USDT - "
+                      f"利润 {result.profit_loss:.2f} USDT, 年化收益率 {result.annualized_return:.2f}%")
+        alert_manager.add_alert(result, message)
+        
+        logger.info(f"最优金额检查完成 - {result.initial_amount:,.0f} USDT, 计算 {search.evaluations} 个金额")
+    
+    except Exception as e:
+        logger.error(f"最优金额检查时出错: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+
+# 定期检查的重叠保护：调度器只负责触发，检查在独立线程中运行
+monitor_runner = MonitorRunner(perform_arbitrage_check, MONITOR_RUN_POLICY, MONITOR_RUN_DEADLINE or None,
+                               MONITOR_MAX_QUEUED)
+
+def schedule_monitor_job():
+    """按当前cron表达式注册（或替换）监控任务"""
+    scheduler.add_job(
+        func=monitor_runner.trigger,
+        trigger=CronTrigger.from_crontab(monitoring_config['cron_expression']),
+        id='arbitrage_monitor',
+        name='SusDE Arbitrage Monitor',
+        replace_existing=True,
+        max_instances=1,
+        # 进程暂停等原因错过的多次触发只补跑一次，超过宽限时间的直接放弃
+        coalesce=True,
+        misfire_grace_time=MONITOR_MISFIRE_GRACE
+    )
+
+def record_scheduler_lag(event):
+    """调度器提交任务时记录实际触发时间相对计划时间的延迟"""
+    if event.job_id != 'arbitrage_monitor':
+        return
+    now = time.time()
+    for run_time in event.scheduled_run_times:
+        metrics.SCHEDULER_LAG_SECONDS.observe(max(0.0, now - run_time.timestamp()))
+
+scheduler.add_listener(record_scheduler_lag, EVENT_JOB_SUBMITTED)
+
+def next_run_eta() -> Dict[str, Any]:
+    """下一次定期检查的时间"""
+    job = scheduler.get_job('arbitrage_monitor') if scheduler.running else None
+    next_run = job.next_run_time if job else None
+    if next_run is None:
+        return {"next_run_time": None, "next_run_in_seconds": None}
+    return {
+        "next_run_time": next_run.isoformat(),
+        "next_run_in_seconds": round(max(0.0, next_run.timestamp() - time.time()), 1)
+    }
+
 # API路由定义
 
 @app.route("/", methods=["GET"])
@@ -137,6 +396,11 @@ def health_check():
         "endpoints": {
             "/": "健康检查",
             "/arbitrage/check": "手动检查套利机会",
+            "/arbitrage/ladder": "手动计算金额阶梯",
+            "/arbitrage/routes": "手动计算所有配置的套利路径（共享兑换边报价）",
+            "/arbitrage/optimize": "在金额范围内搜索最优交易金额",
+            "/arbitrage/estimate": "按价格影响曲线估算任意金额的套利结果（不打开浏览器）",
+            "/arbitrage/jobs": "提交异步检查任务（POST），GET/DELETE /arbitrage/jobs/<id> 查询或取消",
             "/arbitrage/status": "获取监控状态",
             "/monitoring/start": "启动定期监控",
             "/monitoring/stop": "停止定期监控", 
@@ -149,48 +413,265 @@ def health_check():
             "/database/opportunities": "获取盈利机会记录",
             "/database/statistics": "获取统计信息",
             "/database/cleanup": "清理旧数据",
-            "/database/status": "数据库连接状态"
+            "/database/status": "数据库连接状态",
+            "/metrics": "Prometheus格式的各阶段耗时与成功/失败计数",
+            "/metrics/series": "内存中的汇率/收益率时间序列与滚动统计",
+            "/arbitrage/stream": "实时推送检查结果和告警（Server-Sent Events）"
         }
     })
 
+def run_manual_check(amount: float, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """执行手动检查并返回响应数据；同一金额的并发请求共享一次计算，新鲜度窗口内的结果直接返回"""
+    def compute():
+        logger.info(f"手动检查套利机会，金额: {amount}")
+        result = get_calculator().calculate_arbitrage(amount)
+        if result:
+            # 保存检查结果到数据库
+            record_results([result], "manual")
+            
+            # 添加到历史记录
+            message = f"手动检查 - 年化收益率: {result.annualized_return:.2f}%"
+            alert_manager.add_alert(result, message)
+        return result
+    
+    result, age, source = check_flight.get(amount, compute, max_age)
+    if not result:
+        return None
+    return {
+        "data": result.to_dict(),
+        "message": result.format_telegram_message(),
+        "is_opportunity": alert_manager.check_alert_condition(result),
+        "source": source,
+        "age_seconds": round(age, 3)
+    }
+
+def _check_params():
+    """解析手动检查参数 (amount, max_age)"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        max_age = data.get("max_age")
+        return float(data.get("amount", 100000)), float(max_age) if max_age is not None else None
+    return request.args.get("amount", 100000, type=float), request.args.get("max_age", type=float)
+
 @app.route("/arbitrage/check", methods=["GET", "POST"])
 def manual_check():
     """手动检查套利机会"""
     try:
-        # 获取参数
+        amount, max_age = _check_params()
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"参数无效: {e}"}), 400
+    
+    try:
+        payload = run_manual_check(amount, max_age)
+        
+        if payload:
+            return jsonify({"success": True, **payload})
+        else:
+            return jsonify({
+                "success": False,
+                "error": "无法计算套利机会"
+            }), 500
+    
+    except Exception as e:
+        logger.error(f"手动检查失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/arbitrage/jobs", methods=["POST"])
+def submit_check_job():
+    """提交异步检查任务，立即返回任务id；队列已满时返回429"""
+    try:
+        amount, max_age = _check_params()
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"参数无效: {e}"}), 400
+    
+    def run():
+        payload = run_manual_check(amount, max_age)
+        if payload is None:
+            raise RuntimeError("无法计算套利机会")
+        return payload
+    
+    try:
+        job = check_jobs.submit("check", {"amount": amount, "max_age": max_age}, run)
+    except QueueFullError as e:
+        response = jsonify({"success": False, "error": str(e), "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    except RuntimeError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    
+    response = jsonify({"success": True, "job": job.to_dict()})
+    response.headers["Location"] = f"/arbitrage/jobs/{job.id}"
+    return response, 202
+
+@app.route("/arbitrage/jobs/<job_id>", methods=["GET", "DELETE"])
+def check_job(job_id):
+    """查询任务状态与结果；DELETE 取消排队中的任务"""
+    job = check_jobs.cancel(job_id) if request.method == "DELETE" else check_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "任务不存在或已过期"}), 404
+    if request.method == "DELETE" and job.status != "cancelled":
+        return jsonify({"success": False, "error": f"任务状态为 {job.status}，无法取消", "job": job.to_dict()}), 409
+    return jsonify({"success": True, "job": job.to_dict()})
+
+@app.route("/arbitrage/stream", methods=["GET"])
+def stream_arbitrage_events():
+    """SSE推送检查结果（event: result）和告警（event: alert），断线重连按 Last-Event-ID 补发
+    
+    HTTP_SERVER=aiohttp（默认）时该路径由事件循环处理，不会进入这里；
+    HTTP_SERVER=flask 时每个连接占用一个服务线程，超过 SSE_MAX_THREAD_SUBSCRIBERS 个时返回503
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    subscription = event_hub.open_subscription(last_event_id, SSE_HEARTBEAT_SECONDS, SSE_MAX_THREAD_SUBSCRIBERS)
+    if subscription is None:
+        return jsonify({
+            "success": False,
+            "error": f"订阅连接数已达上限（{SSE_MAX_THREAD_SUBSCRIBERS}），请稍后重试或使用 HTTP_SERVER=aiohttp"
+        }), 503, {"Retry-After": "30"}
+    return Response(subscription,
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/arbitrage/ladder", methods=["GET", "POST"])
+def manual_ladder_check():
+    """手动计算金额阶梯"""
+    try:
         if request.method == "POST":
             data = request.get_json() or {}
-            amount = data.get("amount", 100000)
+            amounts = [float(a) for a in data.get("amounts", monitoring_config['ladder_amounts'])]
         else:
-            amount = request.args.get("amount", 100000, type=float)
+            raw = request.args.get("amounts")
+            amounts = [float(a) for a in raw.split(",")] if raw else monitoring_config['ladder_amounts']
         
-        logger.info(f"手动检查套利机会，金额: {amount}")
+        logger.info(f"手动计算金额阶梯: {amounts}")
         
-        # 计算套利
-        result = calculator.calculate_arbitrage(amount)
+        results = get_calculator().calculate_ladder(amounts)
         
-        if result:
-            # 保存检查结果到数据库
-            db_service.save_arbitrage_result(result, "manual")
+        if results:
+            record_results(results, "manual")
             
-            # 添加到历史记录
-            message = f"手动检查 - 年化收益率: {result.annualized_return:.2f}%"
-            alert_manager.add_alert(result, message)
+            return jsonify({
+                "success": True,
+                "data": [result.to_dict() for result in results],
+                "count": len(results),
+                "requested": len(amounts)
+            })
+        else:
+            return jsonify({
+                "success": False,
+                "error": "无法计算金额阶梯"
+            }), 500
+    
+    except Exception as e:
+        logger.error(f"手动计算金额阶梯失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/arbitrage/routes", methods=["GET", "POST"])
+def manual_routes_check():
+    """手动计算所有配置的套利路径"""
+    try:
+        amount, _ = _check_params()
+        logger.info(f"手动计算套利路径，金额: {amount}")
+        
+        calculator = get_calculator()
+        results = calculator.calculate_routes(amount)
+        
+        if results:
+            record_results(results, "manual")
             
             return jsonify({
                 "success": True,
-                "data": result.to_dict(),
-                "message": result.format_telegram_message(),
-                "is_opportunity": alert_manager.check_alert_condition(result)
+                "data": [result.to_dict() for result in results],
+                "count": len(results),
+                "requested": len(calculator.route_graph.cycles),
+                "quotes": calculator.route_graph.last_stats
             })
         else:
             return jsonify({
                 "success": False,
-                "error": "无法计算套利机会"
+                "error": "无法计算套利路径"
             }), 500
     
     except Exception as e:
-        logger.error(f"手动检查失败: {e}")
+        logger.error(f"手动计算套利路径失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/arbitrage/optimize", methods=["GET", "POST"])
+def manual_optimize_check():
+    """手动搜索最优交易金额，参数 min_amount / max_amount / objective / min_profit 均可省略"""
+    try:
+        params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+        bounds = {key: float(params[key]) for key in ('min_amount', 'max_amount', 'min_profit')
+                  if params.get(key) is not None}
+        logger.info(f"手动搜索最优金额: {bounds}")
+        
+        search = get_calculator().optimize_trade_size(objective=params.get('objective'), **bounds)
+        if search.samples:
+            record_results(search.samples, "manual")
+        
+        if search.optimum:
+            return jsonify({"success": True, "data": search.to_dict()})
+        else:
+            return jsonify({
+                "success": False,
+                "error": "未找到满足条件的金额",
+                "data": search.to_dict()
+            }), 500
+    
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"手动搜索最优金额失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/arbitrage/estimate", methods=["GET", "POST"])
+def estimate_check():
+    """按价格影响曲线估算套利结果，结果不保存"""
+    try:
+        amount, _ = _check_params()
+        calculator = get_calculator()
+        impact_model = calculator.exchange_service.impact_model
+        if impact_model is None:
+            return jsonify({
+                "success": False,
+                "error": "未启用价格影响曲线（IMPACT_MODEL=false）"
+            }), 503
+        
+        result = calculator.estimate_arbitrage(amount)
+        if result:
+            return jsonify({
+                "success": True,
+                "data": result.to_dict(),
+                "source": "curve",
+                "impact_model": impact_model.stats()
+            })
+        
+        if not all(impact_model.curve(pair) for pair in ('USDT_TO_SUSDE', 'USDE_TO_USDT')):
+            return jsonify({
+                "success": False,
+                "error": "价格影响曲线尚未就绪，请稍后重试或使用 /arbitrage/check"
+            }), 503
+        return jsonify({
+            "success": False,
+            "error": "金额超出曲线采样范围，请使用 /arbitrage/check"
+        }), 404
+    
+    except Exception as e:
+        logger.error(f"按曲线估算套利失败: {e}")
         return jsonify({
             "success": False,
             "error": str(e)
@@ -199,23 +680,78 @@ def manual_check():
 @app.route("/arbitrage/status", methods=["GET"])
 def get_status():
     """获取监控状态"""
-    global last_check_time, last_result
+    with state_lock:
+        check_time, result, ladder, routes = last_check_time, last_result, last_ladder_results, last_route_results
+        search = last_optimize_search
     
     status = {
         "monitoring_enabled": monitoring_enabled,
         "cron_expression": monitoring_config['cron_expression'],
         "alert_threshold": monitoring_config['alert_threshold'],
         "check_amount": monitoring_config['amount'],
-        "last_check_time": last_check_time.isoformat() if last_check_time else None,
-        "last_result": last_result.to_dict() if last_result else None,
-        "recent_alerts_count": len(alert_manager.get_recent_alerts(24)),
+        "mode": monitoring_config['mode'],
+        "ladder_amounts": monitoring_config['ladder_amounts'],
+        "last_check_time": check_time.isoformat() if check_time else None,
+        "last_result": result.to_dict() if result else None,
+        "last_ladder": [{
+            "amount": r.initial_amount,
+            "profit_loss": r.profit_loss,
+            "annualized_return": r.annualized_return
+        } for r in ladder] if monitoring_config['mode'] == 'ladder' else None,
+        "last_routes": [{
+            "route": r.route_name,
+            "profit_loss": r.profit_loss,
+            "annualized_return": r.annualized_return
+        } for r in routes] if monitoring_config['mode'] == 'routes' else None,
+        "last_optimize": search.to_dict() if search and monitoring_config['mode'] == 'optimize' else None,
+        "recent_alerts_count": alert_manager.count_recent_alerts(24),
         "scheduler_running": scheduler.running if hasattr(scheduler, 'running') else False,
+        **next_run_eta(),
+        "monitor_runs": monitor_runner.stats(),
         "database_connected": db_service.connected,
-        "database_url": "Connected" if db_service.connected else "Not configured"
+        "database_url": "Connected" if db_service.connected else "Not configured",
+        "write_queue": db_service.write_queue.stats(),
+        "event_stream": {**event_hub.stats(), "server": HTTP_SERVER},
+        "manual_check": check_flight.stats(),
+        "jobs": check_jobs.stats(),
+        "calculator_ready": _calculator is not None,
+        "browser_pool": _calculator.exchange_service.browser_pool.stats() if _calculator else None,
+        "vault_reader": _calculator.exchange_service.vault_reader.stats() if _calculator else None,
+        "impact_model": (_calculator.exchange_service.impact_model.stats()
+                         if _calculator and _calculator.exchange_service.impact_model else None)
     }
     
     return jsonify(status)
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Prometheus文本格式的进程内指标"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/metrics/series", methods=["GET"])
+def get_metrics_series():
+    """内存时间序列：窗口统计 + 降采样曲线"""
+    field = request.args.get("field", "annualized_return")
+    hours = request.args.get("hours", 24, type=float)
+    points = max(1, min(request.args.get("points", 200, type=int), 2000))
+    amount = request.args.get("amount", type=float)
+    rolling = request.args.get("rolling", 0, type=int)
+    
+    try:
+        data = result_series.window(field, hours * 3600, amount)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "fields": list(SERIES_FIELDS)}), 400
+    
+    return jsonify({
+        "success": True,
+        "field": field,
+        "hours": hours,
+        "amount": amount,
+        "summary": summarize(data['values']),
+        "series": downsample(data['timestamps'], data['values'], points, rolling),
+        "store": result_series.info()
+    })
+
 @app.route("/monitoring/start", methods=["POST"])
 def start_monitoring():
     """启动定期监控"""
@@ -231,19 +767,22 @@ def start_monitoring():
             monitoring_config['alert_threshold'] = float(data['alert_threshold'])
         if 'amount' in data:
             monitoring_config['amount'] = float(data['amount'])
+        if 'mode' in data:
+            if data['mode'] not in ('single', 'ladder', 'routes', 'optimize'):
+                raise ValueError(f"无效的监控模式: {data['mode']}")
+            monitoring_config['mode'] = data['mode']
+        if 'ladder_amounts' in data:
+            monitoring_config['ladder_amounts'] = [float(a) for a in data['ladder_amounts']]
+        if 'run_policy' in data:
+            monitor_runner.policy = data['run_policy']
+            monitoring_config['run_policy'] = data['run_policy']
         
         # 移除现有任务
         if scheduler.get_jobs():
             scheduler.remove_all_jobs()
         
         # 添加新任务
-        scheduler.add_job(
-            func=perform_arbitrage_check,
-            trigger=CronTrigger.from_crontab(monitoring_config['cron_expression']),
-            id='arbitrage_monitor',
-            name='SusDE Arbitrage Monitor',
-            replace_existing=True
-        )
+        schedule_monitor_job()
         
         if not scheduler.running:
             scheduler.start()
@@ -325,6 +864,18 @@ def monitoring_config_endpoint():
         if 'amount' in data:
             monitoring_config['amount'] = float(data['amount'])
         
+        if 'mode' in data:
+            if data['mode'] not in ('single', 'ladder', 'routes', 'optimize'):
+                raise ValueError(f"无效的监控模式: {data['mode']}")
+            monitoring_config['mode'] = data['mode']
+        
+        if 'ladder_amounts' in data:
+            monitoring_config['ladder_amounts'] = [float(a) for a in data['ladder_amounts']]
+        
+        if 'run_policy' in data:
+            monitor_runner.policy = data['run_policy']
+            monitoring_config['run_policy'] = data['run_policy']
+        
         # 更新告警管理器阈值
         alert_manager.alert_threshold = monitoring_config['alert_threshold']
         
@@ -356,23 +907,22 @@ def get_recent_alerts():
 
 @app.route("/alerts/history", methods=["GET"])
 def get_alert_history():
-    """获取告警历史"""
-    page = request.args.get("page", 1, type=int)
-    limit = request.args.get("limit", 50, type=int)
-    
-    start_idx = (page - 1) * limit
-    end_idx = start_idx + limit
+    """获取告警历史（按id游标分页，cursor 为上一页返回的 next_cursor）"""
+    try:
+        limit = clamp_limit(request.args.get("limit", 50, type=int))
+        cursor = decode_cursor(request.args.get("cursor"), size=1)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    alerts = alert_manager.alert_history[start_idx:end_idx]
+    alerts = alert_manager.get_page(cursor[0] if cursor else None, limit + 1)
+    page = build_page(alerts, limit, ('id',))
     
     return jsonify({
         "success": True,
-        "alerts": alerts,
+        "alerts": page['items'],
         "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": len(alert_manager.alert_history),
-            "has_more": end_idx < len(alert_manager.alert_history)
+            **page['pagination'],
+            "total": len(alert_manager.alert_history)
         }
     })
 
@@ -386,50 +936,73 @@ def clear_alerts():
         "message": "告警历史已清空"
     })
 
+def _history_args():
+    """解析历史接口的通用参数：limit（限制在上限内）、cursor、include_data"""
+    limit = clamp_limit(request.args.get("limit", type=int))
+    cursor = decode_cursor(request.args.get("cursor"))
+    include_data = request.args.get("include_data", "false").lower() in ("1", "true", "yes")
+    return limit, cursor, include_data
+
 @app.route("/database/checks", methods=["GET"])
 def get_database_checks():
-    """从数据库获取检查记录"""
+    """从数据库获取检查记录（按时间倒序游标分页）"""
     hours = request.args.get("hours", 24, type=int)
-    limit = request.args.get("limit", 100, type=int)
+    try:
+        limit, cursor, include_data = _history_args()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    checks = db_service.get_recent_checks(hours, limit)
+    page = build_page(db_service.get_recent_checks(hours, limit + 1, cursor, include_data),
+                      limit, ('timestamp', 'id'))
     
     return jsonify({
         "success": True,
-        "checks": checks,
-        "count": len(checks),
-        "hours": hours
+        "checks": page['items'],
+        "count": len(page['items']),
+        "hours": hours,
+        "pagination": page['pagination']
     })
 
 @app.route("/database/alerts", methods=["GET"])
 def get_database_alerts():
-    """从数据库获取告警记录"""
+    """从数据库获取告警记录（按时间倒序游标分页）"""
     hours = request.args.get("hours", 24, type=int)
-    limit = request.args.get("limit", 100, type=int)
+    try:
+        limit, cursor, include_data = _history_args()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    alerts = db_service.get_recent_alerts(hours, limit)
+    page = build_page(db_service.get_recent_alerts(hours, limit + 1, cursor, include_data),
+                      limit, ('timestamp', 'id'))
     
     return jsonify({
         "success": True,
-        "alerts": alerts,
-        "count": len(alerts),
-        "hours": hours
+        "alerts": page['items'],
+        "count": len(page['items']),
+        "hours": hours,
+        "pagination": page['pagination']
     })
 
 @app.route("/database/opportunities", methods=["GET"])
 def get_profitable_opportunities():
-    """获取盈利机会记录"""
+    """获取盈利机会记录（按年化收益率倒序游标分页）"""
     days = request.args.get("days", 7, type=int)
     min_apy = request.args.get("min_apy", 20.0, type=float)
+    try:
+        limit, cursor, include_data = _history_args()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    opportunities = db_service.get_profitable_opportunities(days, min_apy)
+    page = build_page(db_service.get_profitable_opportunities(days, min_apy, limit + 1, cursor, include_data),
+                      limit, ('annualized_return', 'id'))
     
     return jsonify({
         "success": True,
-        "opportunities": opportunities,
-        "count": len(opportunities),
+        "opportunities": page['items'],
+        "count": len(page['items']),
         "days": days,
-        "min_apy": min_apy
+        "min_apy": min_apy,
+        "pagination": page['pagination']
     })
 
 @app.route("/database/statistics", methods=["GET"])
@@ -464,7 +1037,8 @@ def get_database_status():
         "success": True,
         "connected": db_service.connected,
         "supabase_configured": bool(db_service.supabase),
-        "status": "Connected" if db_service.connected else "Disconnected"
+        "status": "Connected" if db_service.connected else "Disconnected",
+        **db_service.stats()
     })
 
 def auto_start_monitoring():
@@ -473,13 +1047,7 @@ def auto_start_monitoring():
     
     try:
         # 添加监控任务
-        scheduler.add_job(
-            func=perform_arbitrage_check,
-            trigger=CronTrigger.from_crontab(monitoring_config['cron_expression']),
-            id='arbitrage_monitor',
-            name='SusDE Arbitrage Monitor',
-            replace_existing=True
-        )
+        schedule_monitor_job()
         
         monitoring_enabled = True
         
@@ -492,9 +1060,57 @@ def auto_start_monitoring():
         logger.error(f"❌ 自动启动监控失败: {e}")
         return False
 
+def warm_up(port: int, timeout: float = 60.0):
+    """HTTP端口就绪后在后台预热：连接数据库、创建计算器、启动浏览器"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                break
+        except OSError:
+            time.sleep(0.2)
+    
+    started = time.monotonic()
+    try:
+        db_service.connected
+        get_calculator().exchange_service.browser_pool.warm_up()
+        logger.info(f"🔥 后台预热完成 - 耗时 {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        # 预热失败不影响服务，首次使用时会再次尝试
+        logger.error(f"后台预热失败: {e}")
+
+def shutdown():
+    """进程退出时停止调度器、关闭浏览器池并写完数据库队列"""
+    try:
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+    except Exception as e:
+        logger.error(f"停止调度器失败: {e}")
+    
+    # 取消排队中的检查任务，不再接收新任务
+    check_jobs.close()
+    
+    try:
+        if _calculator is not None:
+            _calculator.close()
+    except Exception as e:
+        logger.error(f"关闭浏览器池失败: {e}")
+    
+    try:
+        # 写完队列中剩余的检查结果和告警
+        db_service.close()
+    except Exception as e:
+        logger.error(f"关闭数据库写入队列失败: {e}")
+    
+    logger.info("服务已关闭")
+
 if __name__ == "__main__":
     logger.info("启动SusDE套利监控后端服务")
     
+    # Railway通过SIGTERM停止容器，转换为正常退出以触发atexit清理
+    atexit.register(shutdown)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     # 启动调度器
     scheduler.start()
     logger.info("任务调度器已启动")
@@ -502,7 +1118,13 @@ if __name__ == "__main__":
     # 默认启动监控
     auto_start_monitoring()
     
-    # 启动Flask应用
+    # 启动HTTP服务
     port = int(os.environ.get("PORT", PORT))
-    logger.info(f"🌐 启动HTTP服务 - 端口: {port}")
-    app.run(host="0.0.0.0", port=port, debug=False)
+    threading.Thread(target=warm_up, args=(port,), name='warm-up', daemon=True).start()
+    if HTTP_SERVER == "aiohttp":
+        # SSE订阅由事件循环推送，其他接口在线程池中转交Flask，全部在同一端口
+        from http_server import serve
+        serve(app, event_hub, "0.0.0.0", port, SSE_HEARTBEAT_SECONDS, HTTP_THREADS)
+    else:
+        logger.info(f"🌐 启动HTTP服务 - 端口: {port}")
+        app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+进程内指标注册表，以 Prometheus 文本格式输出（/metrics）
+
+只实现用到的计数器与直方图，不引入额外依赖。记录一次观测只是一次字典查找、
+一次二分查找和几次加法，在抓取报价的热路径上开销可以忽略。
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# 秒级延迟桶：覆盖本地计算（毫秒）到页面抓取（数十秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积桶直方图"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [每个桶的计数..., +Inf桶计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """计时代码块（抛出异常时同样记录）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return int(sum(counts[:-1])) if counts else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+
+        lines = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ---- 套利流水线指标 ----
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'arbitrage_stage_seconds',
+    '各阶段耗时：browser_launch / page_navigation / input_entry / output_extraction / '
+    'preview_redeem / preview_deposit / calculate_arbitrage / calculate_ladder / calculate_routes / '
+    'optimize_trade_size / impact_curve_refresh',
+    ['stage']))
+
+EXTRACTION_METHOD = REGISTRY.register(Counter(
+    'arbitrage_output_extraction_total',
+    '页面报价输出金额的获取方式：network / dom_inputs / javascript / retrigger / failed',
+    ['method']))
+
+LEG_RESULTS = REGISTRY.register(Counter(
+    'arbitrage_leg_results_total',
+    '每一段兑换的成功与失败次数',
+    ['leg', 'outcome']))
+
+PAGE_REQUESTS = REGISTRY.register(Counter(
+    'arbitrage_page_requests_total',
+    '报价页面发出的请求，按资源类型和是否被拦截（allowed / blocked）',
+    ['resource_type', 'outcome']))
+
+PAGE_BLOCKED_PER_QUOTE = REGISTRY.register(Histogram(
+    'arbitrage_page_blocked_requests_per_quote',
+    '每次页面报价被拦截的请求数',
+    buckets=(0, 5, 10, 25, 50, 100, 250, 500)))
+
+PAGE_BYTES_SAVED_PER_QUOTE = REGISTRY.register(Histogram(
+    'arbitrage_page_bytes_saved_per_quote',
+    '每次页面报价因拦截节省的流量（字节，按资源类型典型大小估算）',
+    buckets=(0, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000)))
+
+DB_INSERT_SECONDS = REGISTRY.register(Histogram(
+    'arbitrage_db_insert_seconds',
+    '每次批量写入数据库的耗时',
+    ['table', 'outcome']))
+
+SCHEDULER_LAG_SECONDS = REGISTRY.register(Histogram(
+    'arbitrage_scheduler_lag_seconds',
+    '定期检查实际触发时间与计划时间之差',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)))
+
+IMPACT_CURVE_REFRESHES = REGISTRY.register(Counter(
+    'arbitrage_impact_curve_refreshes_total',
+    '价格影响曲线的采样刷新次数，按交易对和结果（success / failure）',
+    ['pair', 'outcome']))
+
+IMPACT_CURVE_ERROR_BPS = REGISTRY.register(Histogram(
+    'arbitrage_impact_curve_error_bps',
+    '曲线估算的输出金额与实时报价的相对误差（基点）',
+    ['pair'],
+    buckets=(0.5, 1, 2, 5, 10, 25, 50, 100, 250)))
+
+IMPACT_CURVE_ESTIMATES = REGISTRY.register(Counter(
+    'arbitrage_impact_curve_estimates_total',
+    '按曲线估算报价的次数，按交易对和结果（curve 曲线命中 / miss 需要实时报价）',
+    ['pair', 'outcome']))
+
+
+def record_leg(leg: str, ok: bool):
+    LEG_RESULTS.inc(leg=leg, outcome='success' if ok else 'failure')
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -11,7 +11,7 @@ class ArbitrageStep:
     to_token: str
     input_amount: float
     output_amount: float
-    price_impact: float
+    price_impact: Optional[float]  # %，未知（没有可用的价格影响曲线）时为None
     route: str
     
     def to_dict(self) -> Dict:
@@ -35,6 +35,7 @@ class ArbitrageResult:
     annualized_return: float
     steps: list[ArbitrageStep]
     calculation_time: datetime
+    route_name: Optional[str] = None  # 路径模式下的套利路径，如 USDC>SUSDE>USDE>USDC
     
     @property
     def is_profitable(self) -> bool:
@@ -48,8 +49,17 @@ class ArbitrageResult:
         else:
             return f"🔴 {abs(self.profit_loss):.3f} USDT ({self.profit_percentage:.2f}%)"
     
+    def leg_rates(self) -> Dict[str, Optional[float]]:
+        """三段兑换的汇率（输出/输入），缺少的步骤为None"""
+        rates = {'usdt_to_susde': None, 'susde_to_usde': None, 'usde_to_usdt': None}
+        for step in self.steps:
+            key = f"{step.from_token.lower()}_to_{step.to_token.lower()}"
+            if key in rates:
+                rates[key] = step.output_amount / step.input_amount if step.input_amount > 0 else None
+        return rates
+    
     def to_dict(self) -> Dict:
-        return {
+        data = {
             'initial_amount': self.initial_amount,
             'final_amount': self.final_amount,
             'profit_loss': self.profit_loss,
@@ -59,6 +69,9 @@ class ArbitrageResult:
             'calculation_time': self.calculation_time.isoformat(),
             'is_profitable': self.is_profitable
         }
+        if self.route_name:
+            data['route_name'] = self.route_name
+        return data
     
     def to_json(self) -> str:
         return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
@@ -75,18 +88,18 @@ class ArbitrageResult:
 🔄 套利路径:"""
         
         for step in self.steps:
-            emoji = "1️⃣" if step.step_number == 1 else "2️⃣" if step.step_number == 2 else "3️⃣"
+            emoji = {1: "1️⃣", 2: "2️⃣", 3: "3️⃣", 4: "4️⃣", 5: "5️⃣"}.get(step.step_number, f"{step.step_number}.")
             
-            if step.step_number == 2:  # SUSDE -> USDE (解质押)
+            if step.route in ("解质押", "质押"):  # 金库操作，如 SUSDE -> USDE (解质押)
                 message += f"""
-{emoji} {step.from_token} → {step.to_token} (解质押)
+{emoji} {step.from_token} → {step.to_token} ({step.route})
    💱 {step.input_amount:,.0f} {step.from_token} → {step.output_amount:,.3f} {step.to_token}
-   📋 解质押比率: {step.output_amount/step.input_amount:.4f}"""
+   📋 {step.route}比率: {step.output_amount/step.input_amount:.4f}"""
             else:
                 message += f"""
 {emoji} {step.from_token} → {step.to_token}
    💱 {step.input_amount:,.0f} {step.from_token} → {step.output_amount:,.3f} {step.to_token}
-   📈 价格影响: {step.price_impact:.2f}%
+   📈 价格影响: {f'{step.price_impact:.2f}%' if step.price_impact is not None else '未知'}
    🛣️ 路由: {step.route}"""
         
         message += f"""
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+定期监控的运行策略
+
+调度器触发时只调用 trigger()，检查在单独的线程中执行，同一时间最多一个检查在运行。
+上一次检查尚未结束时按策略处理新的触发：
+- skip: 跳过本次触发
+- queue: 排队，依次执行，最多排队 max_queued 次，超出的跳过
+- coalesce: 所有重叠的触发合并为结束后的一次补跑
+
+每次运行有截止时间，被调用的检查函数在保存结果前检查是否已超时；
+超时的运行计入 overruns，运行期间的触发仍按策略处理，浏览器会话数因此有上限。
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('skip', 'queue', 'coalesce')
+
+
+class MonitorRunner:
+    """定期检查的重叠保护（线程安全）"""
+
+    def __init__(self, fn: Callable[[Optional[float]], None], policy: str = 'skip',
+                 deadline: Optional[float] = None, max_queued: int = 2, name: str = 'monitor-run'):
+        self.fn = fn
+        self.policy = policy
+        self.deadline = deadline
+        self.max_queued = max(1, max_queued)
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = 0
+        self._started_at: Optional[float] = None
+        self._stats = {
+            'triggered': 0,
+            'runs': 0,
+            'skipped': 0,
+            'queued': 0,
+            'coalesced': 0,
+            'overruns': 0,
+            'failures': 0,
+            'last_started': None,
+            'last_duration': None,
+            'max_duration': 0.0
+        }
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    @policy.setter
+    def policy(self, value: str):
+        if value not in POLICIES:
+            raise ValueError(f"无效的运行策略: {value}，可选: {', '.join(POLICIES)}")
+        self._policy = value
+
+    def trigger(self) -> str:
+        """调度器回调：立即返回本次触发的处理结果 started / queued / coalesced / skipped"""
+        with self._lock:
+            self._stats['triggered'] += 1
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._loop, name=self.name, daemon=True).start()
+                return 'started'
+
+            if self.policy == 'coalesce':
+                self._stats['coalesced'] += 1
+                self._pending = 1
+                return 'coalesced'
+            if self.policy == 'queue' and self._pending < self.max_queued:
+                self._stats['queued'] += 1
+                self._pending += 1
+                return 'queued'
+
+            self._stats['skipped'] += 1
+            running_for = time.monotonic() - self._started_at if self._started_at else 0
+        logger.warning(f"上一次检查仍在运行（已 {running_for:.0f}s），跳过本次触发")
+        return 'skipped'
+
+    def _loop(self):
+        while True:
+            started = time.monotonic()
+            with self._lock:
+                self._started_at = started
+                self._stats['runs'] += 1
+                self._stats['last_started'] = datetime.now().isoformat()
+
+            try:
+                self.fn(started + self.deadline if self.deadline else None)
+            except Exception as e:
+                logger.error(f"定期检查执行失败: {e}")
+                with self._lock:
+                    self._stats['failures'] += 1
+
+            duration = time.monotonic() - started
+            with self._lock:
+                self._stats['last_duration'] = duration
+                self._stats['max_duration'] = max(self._stats['max_duration'], duration)
+                if self.deadline and duration > self.deadline:
+                    self._stats['overruns'] += 1
+                    logger.warning(f"定期检查耗时 {duration:.1f}s，超过截止时间 {self.deadline:g}s")
+
+                self._started_at = None
+                if self._pending:
+                    self._pending -= 1
+                    continue
+                self._running = False
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'deadline_seconds': self.deadline,
+                'running': self._running,
+                'running_seconds': time.monotonic() - self._started_at if self._started_at else None,
+                'pending': self._pending,
+                **self._stats
+            }
+
+
+def deadline_exceeded(deadline: Optional[float]) -> bool:
+    """检查函数在保存结果前调用：超过截止时间的结果被丢弃"""
+    return deadline is not None and time.monotonic() > deadline
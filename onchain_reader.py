@@ -0,0 +1,212 @@
+"""
+sUSDe金库批量链上读取
+
+将多个 previewRedeem / convertToAssets 调用打包为一次 Multicall3 eth_call，
+或一次JSON-RPC批量请求，多金额计算只需一次RPC往返。
+
+local 模式下缓存金库的 totalAssets / totalSupply 一个出块时间，
+previewRedeem 在本地按合约相同的整数取整规则计算；缓存过期后由下一次计算按需刷新，
+没有后台轮询，空闲时不产生RPC请求。
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from eth_abi import decode as abi_decode
+from web3 import Web3
+
+from config import (SUSDE_ABI, MULTICALL3_ADDRESS, MULTICALL3_ABI, ONCHAIN_BATCH_MODE,
+                    MULTICALL_CHUNK_SIZE, VAULT_RATE_MODE, VAULT_STATE_MAX_AGE,
+                    VAULT_VERIFY_EVERY, TokenConfig)
+from metrics import STAGE_SECONDS
+
+
+@dataclass
+class VaultState:
+    """某个区块上的金库状态"""
+    block_number: int
+    total_assets: int
+    total_supply: int
+    fetched_at: float
+
+    def convert_to_assets(self, shares: int) -> int:
+        """与 OpenZeppelin ERC4626._convertToAssets(shares, Floor) 一致（_decimalsOffset = 0）"""
+        return shares * (self.total_assets + 1) // (self.total_supply + 1)
+
+    def convert_to_shares(self, assets: int) -> int:
+        """与 OpenZeppelin ERC4626._convertToShares(assets, Floor) 一致，即 previewDeposit"""
+        return assets * (self.total_supply + 1) // (self.total_assets + 1)
+
+
+class SusdeVaultReader:
+    """sUSDe金库读取器"""
+
+    def __init__(self, web3: Web3, mode: str = ONCHAIN_BATCH_MODE, chunk_size: int = MULTICALL_CHUNK_SIZE,
+                 rate_mode: str = VAULT_RATE_MODE, max_age: float = VAULT_STATE_MAX_AGE,
+                 verify_every: int = VAULT_VERIFY_EVERY):
+        self.web3 = web3
+        self.mode = mode
+        self.chunk_size = max(1, chunk_size)
+        self.rate_mode = rate_mode
+        self.max_age = max_age
+        self.verify_every = verify_every
+        self.decimals = TokenConfig.SUSDE['decimals']
+        self.vault = web3.eth.contract(
+            address=Web3.to_checksum_address(TokenConfig.SUSDE['address']),
+            abi=SUSDE_ABI
+        )
+        self.multicall = web3.eth.contract(
+            address=Web3.to_checksum_address(MULTICALL3_ADDRESS),
+            abi=MULTICALL3_ABI
+        )
+
+        # 区块缓存
+        self._state: Optional[VaultState] = None
+        self._state_lock = threading.Lock()
+        self._stats = {
+            'local_computations': 0,
+            'cache_hits': 0,
+            'state_refreshes': 0,
+            'verifications': 0,
+            'verification_mismatches': 0
+        }
+
+    def to_wei(self, amount: float) -> int:
+        return int(Decimal(str(amount)) * (Decimal(10) ** self.decimals))
+
+    def from_wei(self, amount: int) -> float:
+        return float(Decimal(amount) / (Decimal(10) ** self.decimals))
+
+    def preview_redeem_many(self, share_amounts: List[float]) -> List[float]:
+        """批量预览赎回：sUSDe份额 -> 可赎回的USDe数量"""
+        shares = [self.to_wei(amount) for amount in share_amounts]
+        with STAGE_SECONDS.time(stage='preview_redeem'):
+            if self.rate_mode == 'local':
+                assets = self._preview_redeem_local(shares)
+            else:
+                assets = self.call_many('previewRedeem', shares)
+        return [self.from_wei(value) for value in assets]
+
+    def preview_deposit_many(self, asset_amounts: List[float]) -> List[float]:
+        """批量预览质押：USDe数量 -> 可获得的sUSDe份额"""
+        assets = [self.to_wei(amount) for amount in asset_amounts]
+        with STAGE_SECONDS.time(stage='preview_deposit'):
+            if self.rate_mode == 'local':
+                state = self.get_state()
+                shares = [state.convert_to_shares(amount) for amount in assets]
+            else:
+                shares = self.call_many('previewDeposit', assets)
+        return [self.from_wei(value) for value in shares]
+
+    def convert_to_assets_many(self, share_amounts: List[float]) -> List[float]:
+        """批量换算：sUSDe份额 -> USDe资产（不含赎回规则）"""
+        assets = self.call_many('convertToAssets', [self.to_wei(amount) for amount in share_amounts])
+        return [self.from_wei(value) for value in assets]
+
+    def call_many(self, fn_name: str, args: List[int], block_identifier: Any = 'latest') -> List[int]:
+        """对金库的单参数uint256视图函数做批量调用，返回原始整数结果"""
+        if not args:
+            return []
+        if len(args) == 1:
+            return [getattr(self.vault.functions, fn_name)(args[0]).call(block_identifier=block_identifier)]
+
+        results: List[int] = []
+        for start in range(0, len(args), self.chunk_size):
+            chunk = args[start:start + self.chunk_size]
+            if self.mode == 'batch':
+                results.extend(self._call_batch(fn_name, chunk, block_identifier))
+            else:
+                results.extend(self._call_multicall(fn_name, chunk, block_identifier))
+        return results
+
+    def _call_multicall(self, fn_name: str, args: List[int], block_identifier: Any) -> List[int]:
+        """一次 Multicall3.aggregate3 eth_call"""
+        calls = [(self.vault.address, False, self.vault.encode_abi(fn_name, args=[arg])) for arg in args]
+        responses = self.multicall.functions.aggregate3(calls).call(block_identifier=block_identifier)
+
+        results = []
+        for success, return_data in responses:
+            if not success:
+                raise Exception(f"Multicall调用 {fn_name} 失败")
+            results.append(abi_decode(['uint256'], return_data)[0])
+        return results
+
+    def _call_batch(self, fn_name: str, args: List[int], block_identifier: Any) -> List[int]:
+        """一次JSON-RPC批量请求（批量请求只能在最新区块上调用）"""
+        if block_identifier != 'latest':
+            return self._call_multicall(fn_name, args, block_identifier)
+        with self.web3.batch_requests() as batch:
+            for arg in args:
+                batch.add(getattr(self.vault.functions, fn_name)(arg))
+            return list(batch.execute())
+
+    # ---- 区块缓存与本地计算 ----
+
+    def read_vault_state(self) -> VaultState:
+        """一次eth_call读取区块号、totalAssets、totalSupply"""
+        calls = [
+            (self.multicall.address, False, self.multicall.encode_abi('getBlockNumber')),
+            (self.vault.address, False, self.vault.encode_abi('totalAssets')),
+            (self.vault.address, False, self.vault.encode_abi('totalSupply')),
+        ]
+        responses = self.multicall.functions.aggregate3(calls).call()
+        if not all(success for success, _ in responses):
+            raise Exception("Multicall读取金库状态失败")
+        block_number, total_assets, total_supply = (abi_decode(['uint256'], data)[0] for _, data in responses)
+        return VaultState(block_number, total_assets, total_supply, time.time())
+
+    def get_state(self) -> VaultState:
+        """获取金库状态，读取后一个出块时间内直接使用缓存，过期时一次eth_call刷新"""
+        with self._state_lock:
+            state = self._state
+            if state is not None and time.time() - state.fetched_at < self.max_age:
+                self._stats['cache_hits'] += 1
+                return state
+
+        state = self.read_vault_state()
+        with self._state_lock:
+            if self._state is None or state.block_number >= self._state.block_number:
+                self._state = state
+            self._stats['state_refreshes'] += 1
+        return state
+
+    def invalidate(self):
+        """清除缓存的金库状态"""
+        with self._state_lock:
+            self._state = None
+
+    def _preview_redeem_local(self, shares: List[int]) -> List[int]:
+        state = self.get_state()
+        assets = [state.convert_to_assets(amount) for amount in shares]
+
+        self._stats['local_computations'] += 1
+        if self.verify_every and self._stats['local_computations'] % self.verify_every == 0:
+            threading.Thread(target=self._verify, args=(state, shares[0], assets[0]),
+                             name='vault-verify', daemon=True).start()
+        return assets
+
+    def _verify(self, state: VaultState, shares: int, local_assets: int):
+        """在同一区块上调用真实的previewRedeem核对本地计算结果"""
+        try:
+            onchain_assets = self.vault.functions.previewRedeem(shares).call(block_identifier=state.block_number)
+            self._stats['verifications'] += 1
+            if onchain_assets != local_assets:
+                self._stats['verification_mismatches'] += 1
+                print(f"⚠️ 本地赎回计算与链上不一致 (区块 {state.block_number}): "
+                      f"本地 {local_assets}, 链上 {onchain_assets}")
+                self.invalidate()
+        except Exception as e:
+            print(f"核对previewRedeem失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            'rate_mode': self.rate_mode,
+            'batch_mode': self.mode,
+            'cached_block': state.block_number if state else None,
+            'state_age_seconds': round(time.time() - state.fetched_at, 1) if state else None,
+            **self._stats
+        }
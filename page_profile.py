@@ -0,0 +1,167 @@
+"""
+报价页面的轻量化配置
+
+抓取报价只需要页面文档、脚本和报价请求。light 配置：
+- 按资源类型和URL规则拦截请求（图片、字体、媒体、统计与钱包连接等第三方脚本）
+- 关闭Chromium的图片解码与远程字体，静音媒体
+- 缩小视口、固定设备缩放、减少动画，并禁用Service Worker（其请求不经过路由拦截）
+
+每个页面使用一个 RequestStats 统计被拦截的请求数和估算节省的流量，报价结束时写入指标。
+"""
+
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from config import (PAGE_PROFILE, PAGE_BLOCK_RESOURCE_TYPES, PAGE_ALLOW_RESOURCE_TYPES,
+                    PAGE_BLOCK_URL_PATTERN, PAGE_ALLOW_URL_PATTERN, PAGE_VIEWPORT,
+                    QUOTE_RESPONSE_URL_PATTERN)
+from metrics import PAGE_REQUESTS, PAGE_BLOCKED_PER_QUOTE, PAGE_BYTES_SAVED_PER_QUOTE
+
+# 被拦截请求无法得知实际大小，按资源类型的典型大小估算（字节）
+TYPICAL_BYTES = {
+    'image': 30_000,
+    'media': 500_000,
+    'font': 40_000,
+    'stylesheet': 20_000,
+    'script': 80_000,
+    'xhr': 2_000,
+    'fetch': 2_000,
+    'manifest': 1_000,
+    'texttrack': 5_000,
+}
+DEFAULT_BYTES = 5_000
+
+LIGHT_LAUNCH_ARGS = [
+    '--blink-settings=imagesEnabled=false',
+    '--disable-remote-fonts',
+    '--mute-audio',
+    '--autoplay-policy=user-gesture-required',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-extensions',
+    '--no-first-run',
+]
+
+
+def _compile(pattern: str) -> Optional['re.Pattern']:
+    return re.compile(pattern, re.IGNORECASE) if pattern else None
+
+
+class ResourcePolicy:
+    """请求放行规则，优先级：放行URL > 拦截URL > 页面文档 > 资源类型白名单 > 资源类型黑名单"""
+
+    def __init__(self, block_types: Iterable[str] = (), allow_types: Iterable[str] = (),
+                 block_pattern: str = '', allow_pattern: str = ''):
+        self.block_types = frozenset(block_types)
+        self.allow_types = frozenset(allow_types)
+        self.block_pattern = _compile(block_pattern)
+        self.allow_pattern = _compile(allow_pattern)
+
+    def allows(self, url: str, resource_type: str) -> bool:
+        if self.allow_pattern and self.allow_pattern.search(url):
+            return True
+        if self.block_pattern and self.block_pattern.search(url):
+            return False
+        if resource_type == 'document':
+            return True
+        if self.allow_types and resource_type not in self.allow_types:
+            return False
+        return resource_type not in self.block_types
+
+
+class RequestStats:
+    """单个报价页面的请求统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.bytes_saved = 0
+
+    def record(self, resource_type: str, allowed: bool):
+        self.requests += 1
+        if not allowed:
+            self.blocked += 1
+            self.bytes_saved += TYPICAL_BYTES.get(resource_type, DEFAULT_BYTES)
+        PAGE_REQUESTS.inc(resource_type=resource_type, outcome='allowed' if allowed else 'blocked')
+
+
+class PageProfile:
+    """浏览器启动参数、上下文参数和请求拦截"""
+
+    def __init__(self, light: bool = True, policy: Optional[ResourcePolicy] = None,
+                 viewport: str = PAGE_VIEWPORT):
+        self.light = light
+        self.policy = policy if light else None
+        width, _, height = viewport.partition('x')
+        self.viewport = {'width': int(width), 'height': int(height or width)}
+
+    @classmethod
+    def from_config(cls) -> 'PageProfile':
+        # 报价请求必须放行，否则网络捕获模式拿不到报价
+        allow = '|'.join(f'(?:{pattern})' for pattern in (PAGE_ALLOW_URL_PATTERN, QUOTE_RESPONSE_URL_PATTERN)
+                         if pattern)
+        policy = ResourcePolicy(PAGE_BLOCK_RESOURCE_TYPES, PAGE_ALLOW_RESOURCE_TYPES,
+                                PAGE_BLOCK_URL_PATTERN, allow)
+        return cls(PAGE_PROFILE != 'full', policy)
+
+    def launch_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {'headless': True}
+        if self.light:
+            options['args'] = list(LIGHT_LAUNCH_ARGS)
+        return options
+
+    def context_options(self) -> Dict[str, Any]:
+        if not self.light:
+            return {}
+        return {
+            'viewport': self.viewport,
+            'device_scale_factor': 1,
+            'is_mobile': False,
+            'has_touch': False,
+            'reduced_motion': 'reduce',
+            'service_workers': 'block',
+        }
+
+    def route(self, context) -> RequestStats:
+        """在同步API的浏览器上下文上安装请求拦截"""
+        stats = RequestStats()
+        if self.policy is None:
+            return stats
+
+        def handle(route):
+            request = route.request
+            allowed = self.policy.allows(request.url, request.resource_type)
+            stats.record(request.resource_type, allowed)
+            if allowed:
+                route.continue_()
+            else:
+                route.abort('blockedbyclient')
+
+        context.route('**/*', handle)
+        return stats
+
+    async def route_async(self, context) -> RequestStats:
+        """在异步API的浏览器上下文上安装请求拦截"""
+        stats = RequestStats()
+        if self.policy is None:
+            return stats
+
+        async def handle(route):
+            request = route.request
+            allowed = self.policy.allows(request.url, request.resource_type)
+            stats.record(request.resource_type, allowed)
+            if allowed:
+                await route.continue_()
+            else:
+                await route.abort('blockedbyclient')
+
+        await context.route('**/*', handle)
+        return stats
+
+    def finish(self, stats: RequestStats):
+        """报价结束时记录本页面的拦截统计"""
+        if self.policy is None:
+            return
+        PAGE_BLOCKED_PER_QUOTE.observe(stats.blocked)
+        PAGE_BYTES_SAVED_PER_QUOTE.observe(stats.bytes_saved)
+        print(f"已拦截 {stats.blocked}/{stats.requests} 个请求，估计节省 {stats.bytes_saved / 1024:.0f}KB")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+历史记录接口的游标（keyset）分页
+
+游标是排序键与id的编码，例如 (timestamp, id)；下一页从上一页最后一条之后继续读取，
+查询沿复合索引定位，不再像 OFFSET 那样随页数增加而变慢，翻页期间有新数据写入也不会重复或遗漏。
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+
+
+def encode_cursor(*values: Any) -> str:
+    """把排序键编码为URL安全的游标字符串"""
+    raw = json.dumps(list(values), separators=(',', ':'), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], size: int = 2) -> Optional[Tuple[Any, ...]]:
+    """解析游标（最后一项为整数id），无效时抛出 ValueError"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if not isinstance(values, list) or len(values) != size or not isinstance(values[-1], int):
+        raise ValueError("无效的分页游标")
+    return tuple(values)
+
+
+def clamp_limit(limit: Optional[int], default: int = HISTORY_PAGE_SIZE,
+                maximum: int = HISTORY_MAX_PAGE_SIZE) -> int:
+    """限制每页条数在 [1, maximum] 之内"""
+    if limit is None:
+        return default
+    return max(1, min(limit, maximum))
+
+
+def build_page(rows: List[Dict[str, Any]], limit: int, key_fields: Sequence[str]) -> Dict[str, Any]:
+    """rows 按 limit + 1 条查询，多出的一条只用于判断是否还有下一页"""
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor(*(last.get(field) for field in key_fields))
+    return {
+        'items': items,
+        'pagination': {
+            'limit': limit,
+            'count': len(items),
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+    }
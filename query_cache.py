@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+数据库查询结果缓存
+
+按 方法名+参数 缓存查询结果，每个方法有独立的TTL，超出容量时按LRU淘汰。
+每条缓存标记所依赖的表，表有新数据写入时只失效相关的缓存。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+
+class QueryCache:
+    """TTL + LRU 查询结果缓存（线程安全）"""
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 256):
+        self.ttls = ttls
+        self.max_entries = max(1, max_entries)
+        # key -> (过期时间, 依赖的表, 结果)
+        self._entries: 'OrderedDict[Tuple[Hashable, ...], Tuple[float, Tuple[str, ...], Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._method_stats: Dict[str, Dict[str, int]] = {}
+        # 每个表的失效次数，加载期间表被写入时不缓存旧结果
+        self._generations: Dict[str, int] = {}
+        self._generation = 0
+
+    def _count(self, method: str, field: str):
+        self._stats[field] += 1
+        self._method_stats.setdefault(method, {'hits': 0, 'misses': 0})[field] += 1
+
+    def get_or_load(self, method: str, args: Tuple[Hashable, ...], tables: Iterable[str],
+                    loader: Callable[[], Any]) -> Any:
+        """命中则返回缓存结果，否则调用loader加载并缓存；loader抛出异常时不缓存"""
+        ttl = self.ttls.get(method, 0)
+        if ttl <= 0:
+            return loader()
+
+        key = (method,) + tuple(args)
+        tables = tuple(tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._count(method, 'hits')
+                return entry[2]
+            self._count(method, 'misses')
+            generation = self._snapshot(tables)
+
+        value = loader()
+
+        with self._lock:
+            if self._snapshot(tables) != generation:
+                return value
+            self._entries[key] = (time.monotonic() + ttl, tables, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return value
+
+    def _snapshot(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        # 调用方已持有锁
+        return (self._generation,) + tuple(self._generations.get(table, 0) for table in tables)
+
+    def invalidate(self, table: str = None):
+        """失效依赖某个表的缓存；不指定表时清空全部"""
+        with self._lock:
+            if table is None:
+                self._generation += 1
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                keys = [key for key, (_, tables, _) in self._entries.items() if table in tables]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            if removed:
+                self._stats['invalidations'] += removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self._stats['hits'] / lookups if lookups else None,
+                'ttls': dict(self.ttls),
+                'methods': {method: dict(counts) for method, counts in self._method_stats.items()},
+                **self._stats
+            }
@@ -0,0 +1,135 @@
+"""
+基于网络响应拦截的报价捕获
+
+监听页面自身发出的报价XHR/fetch响应，一旦收到与输入金额匹配的报价立即返回，
+不再依赖固定时长的等待。
+"""
+
+import re
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from config import QUOTE_RESPONSE_URL_PATTERN
+
+# 报价响应中常见的字段名；不含通用的 amount（gas、手续费、代币列表等响应中也有），
+# amount 只在报价请求URL的查询参数中使用
+SRC_AMOUNT_KEYS = ('srcAmount', 'fromAmount', 'fromTokenAmount')
+DST_AMOUNT_KEYS = ('dstAmount', 'toAmount', 'toTokenAmount', 'returnAmount')
+
+
+def to_raw_amount(amount: float, decimals: int) -> int:
+    """将金额转换为代币最小单位"""
+    return int(Decimal(str(amount)) * (Decimal(10) ** decimals))
+
+
+def from_raw_amount(raw: Any, decimals: int) -> Optional[float]:
+    """将代币最小单位转换为金额；已经是小数形式的值原样解析"""
+    try:
+        text = str(raw).strip()
+        if '.' in text:
+            return float(text)
+        return float(Decimal(int(text)) / (Decimal(10) ** decimals))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+
+def _find_key(payload: Any, keys: tuple) -> Optional[Any]:
+    """在嵌套的JSON中查找第一个出现的字段"""
+    if isinstance(payload, dict):
+        for key in keys:
+            if key in payload and payload[key] not in (None, ''):
+                return payload[key]
+        for value in payload.values():
+            found = _find_key(value, keys)
+            if found is not None:
+                return found
+    elif isinstance(payload, list):
+        for item in payload:
+            found = _find_key(item, keys)
+            if found is not None:
+                return found
+    return None
+
+
+def extract_quote(payload: Any, request_url: str, post_data: Optional[Dict],
+                  expected_raw: int, src_decimals: int, dst_decimals: int) -> Optional[float]:
+    """从报价响应中提取输出金额，输入金额与预期不符时返回None"""
+    src_amount = _find_key(payload, SRC_AMOUNT_KEYS)
+    if src_amount is None and post_data:
+        src_amount = _find_key(post_data, SRC_AMOUNT_KEYS)
+    if src_amount is None:
+        query = parse_qs(urlparse(request_url).query)
+        src_amount = query.get('amount', [None])[0]
+
+    if src_amount is None:
+        return None
+
+    src_text = str(src_amount).strip()
+    if '.' in src_text:
+        matched = abs(to_raw_amount(float(src_text), src_decimals) - expected_raw) <= 1
+    else:
+        matched = src_text.isdigit() and int(src_text) == expected_raw
+    if not matched:
+        return None
+
+    dst_amount = _find_key(payload, DST_AMOUNT_KEYS)
+    if dst_amount is None:
+        return None
+    return from_raw_amount(dst_amount, dst_decimals)
+
+
+class NetworkQuoteCapture:
+    """挂载在页面上的报价响应监听器"""
+
+    def __init__(self, page, input_amount: float, src_decimals: int, dst_decimals: int,
+                 url_pattern: str = QUOTE_RESPONSE_URL_PATTERN):
+        self.page = page
+        self.expected_raw = to_raw_amount(input_amount, src_decimals)
+        self.src_decimals = src_decimals
+        self.dst_decimals = dst_decimals
+        self.url_pattern = re.compile(url_pattern, re.IGNORECASE)
+        self._responses: List[Any] = []
+        self.responses_seen = 0
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        # 回调中只记录，响应体在等待循环中读取
+        if self.url_pattern.search(response.url) and response.request.resource_type in ('xhr', 'fetch'):
+            self._responses.append(response)
+
+    def _parse(self, response) -> Optional[float]:
+        try:
+            if not response.ok:
+                return None
+            payload = response.json()
+        except Exception:
+            return None
+
+        try:
+            post_data = response.request.post_data_json
+        except Exception:
+            post_data = None
+
+        return extract_quote(payload, response.url, post_data, self.expected_raw,
+                             self.src_decimals, self.dst_decimals)
+
+    def wait(self, timeout_ms: int, poll_ms: int = 50) -> Optional[float]:
+        """等待匹配的报价响应，超时返回None"""
+        deadline = time.monotonic() + timeout_ms / 1000
+        try:
+            while True:
+                while self._responses:
+                    response = self._responses.pop(0)
+                    self.responses_seen += 1
+                    output = self._parse(response)
+                    if output is not None:
+                        return output
+
+                if time.monotonic() >= deadline:
+                    return None
+                # wait_for_timeout 会继续分发页面事件
+                self.page.wait_for_timeout(poll_ms)
+        finally:
+            self.page.remove_listener("response", self._on_response)
@@ -0,0 +1,107 @@
+"""
+报价来源抽象
+
+- PlaywrightQuoteProvider: 通过浏览器抓取1inch页面（原有方式）
+- HttpAggregatorQuoteProvider: 直接请求聚合器JSON报价接口，无需浏览器
+"""
+
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (ONEINCH_URLS, QUOTE_PAIRS, AGGREGATOR_API_URL, AGGREGATOR_API_KEY,
+                    AGGREGATOR_TIMEOUT, TokenConfig)
+from quote_capture import to_raw_amount, from_raw_amount
+
+
+def pair_tokens(pair: str) -> tuple:
+    """返回交易对的 (源代币配置, 目标代币配置)"""
+    src, dst = QUOTE_PAIRS[pair]
+    return getattr(TokenConfig, src), getattr(TokenConfig, dst)
+
+
+class QuoteProvider:
+    """报价来源基类"""
+
+    name = 'base'
+
+    def get_quote(self, pair: str, input_amount: float) -> Optional[Dict[str, Any]]:
+        """获取报价，返回 {'input_amount', 'output_amount', 'exchange_rate', 'source'}，失败返回None"""
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源"""
+        pass
+
+
+class PlaywrightQuoteProvider(QuoteProvider):
+    """通过 ExchangeService 的浏览器池抓取1inch页面报价"""
+
+    name = 'playwright'
+
+    def __init__(self, exchange_service):
+        self.exchange_service = exchange_service
+
+    def get_quote(self, pair: str, input_amount: float) -> Optional[Dict[str, Any]]:
+        src, dst = pair_tokens(pair)
+        return self.exchange_service.get_1inch_exchange_rate(
+            ONEINCH_URLS[pair], input_amount, src['decimals'], dst['decimals']
+        )
+
+
+class HttpAggregatorQuoteProvider(QuoteProvider):
+    """聚合器JSON报价接口，复用连接池"""
+
+    name = 'http'
+
+    def __init__(self, base_url: str = AGGREGATOR_API_URL, api_key: Optional[str] = AGGREGATOR_API_KEY,
+                 timeout: float = AGGREGATOR_TIMEOUT, pool_size: int = 10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/json'
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    def get_quote(self, pair: str, input_amount: float) -> Optional[Dict[str, Any]]:
+        src, dst = pair_tokens(pair)
+        try:
+            response = self.session.get(f"{self.base_url}/quote", params={
+                'src': src['address'],
+                'dst': dst['address'],
+                'amount': str(to_raw_amount(input_amount, src['decimals']))
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+
+            output_amount = from_raw_amount(payload.get('dstAmount', payload.get('toAmount')), dst['decimals'])
+            if output_amount is None:
+                print(f"聚合器报价缺少输出金额: {payload}")
+                return None
+
+            rate = output_amount / float(input_amount)
+            if rate > 5 or rate < 0.1:  # 与页面抓取相同的合理性检查
+                print(f"汇率异常: {rate}, 输入: {input_amount}, 输出: {output_amount}")
+                return None
+
+            return {
+                'input_amount': float(input_amount),
+                'output_amount': output_amount,
+                'exchange_rate': rate,
+                'source': self.name
+            }
+
+        except Exception as e:
+            print(f"获取聚合器报价失败 ({pair}): {e}")
+            return None
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,164 @@
+"""
+套利路径图
+
+代币为节点，兑换为边：swap 边由交易对的报价来源（1inch页面或聚合器接口）报价，
+stake / unstake 边由sUSDe金库在链上计算。配置的每条套利路径是首尾代币相同的环。
+
+所有路径按步骤逐层求值：同一层中各路径用到的、本次检查尚未报价的边并发报价，
+每条边每次检查只报价一次；其他路径经过同一条边时按该报价的汇率换算。
+监控多条路径的报价次数接近不同边的数量，而不是 路径数 × 步数。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from config import TokenConfig, VAULT_EDGES
+from metrics import record_leg
+from models import ArbitrageStep
+
+# 原有的单一路径，结果与 calculate_arbitrage 可比
+DEFAULT_ROUTE = 'USDT>SUSDE>USDE>USDT'
+
+EDGE_ROUTES = {'swap': '1inch', 'stake': '质押', 'unstake': '解质押'}
+
+
+@dataclass(frozen=True)
+class RouteEdge:
+    """兑换边"""
+    src: str
+    dst: str
+    kind: str  # 'swap' / 'stake' / 'unstake'
+
+    @property
+    def pair(self) -> str:
+        return f'{self.src}_TO_{self.dst}'
+
+
+@dataclass
+class RouteCycle:
+    """一条套利路径"""
+    tokens: List[str]
+    edges: List[RouteEdge] = field(init=False)
+
+    def __post_init__(self):
+        self.edges = [RouteEdge(src, dst, VAULT_EDGES.get((src, dst), 'swap'))
+                      for src, dst in zip(self.tokens, self.tokens[1:])]
+
+    @property
+    def name(self) -> str:
+        return '>'.join(self.tokens)
+
+
+@dataclass
+class EdgeQuote:
+    """一条边在本次检查中的报价"""
+    edge: RouteEdge
+    input_amount: float
+    output_amount: float
+    price_impact: Optional[float] = None
+
+    @property
+    def rate(self) -> float:
+        return self.output_amount / self.input_amount
+
+
+def build_cycles(specs: Sequence[Sequence[str]]) -> List[RouteCycle]:
+    """校验并构造套利路径，specs 为代币名列表，如 ['USDT', 'SUSDE', 'USDE', 'USDT']"""
+    cycles = []
+    for tokens in specs:
+        tokens = [token.upper() for token in tokens]
+        if len(tokens) < 3 or tokens[0] != tokens[-1]:
+            raise ValueError(f"套利路径必须首尾相同且至少两步: {'>'.join(tokens)}")
+        unknown = [token for token in tokens if not isinstance(getattr(TokenConfig, token, None), dict)]
+        if unknown:
+            raise ValueError(f"未知代币: {', '.join(unknown)}")
+        cycles.append(RouteCycle(tokens))
+    return cycles
+
+
+class RouteGraph:
+    """多条套利路径的共享报价求值"""
+
+    def __init__(self, cycles: List[RouteCycle], max_workers: int = 8):
+        self.cycles = cycles
+        self.max_workers = max(1, max_workers)
+        self.last_stats: Dict[str, int] = {}
+
+    @property
+    def edges(self) -> List[RouteEdge]:
+        """所有路径中不同的兑换边"""
+        return list(dict.fromkeys(edge for cycle in self.cycles for edge in cycle.edges))
+
+    def quote_edge(self, service, edge: RouteEdge, amount: float) -> Optional[EdgeQuote]:
+        """对单条边报价，service 为 ExchangeService"""
+        try:
+            if edge.kind == 'unstake':
+                output = service.vault_reader.preview_redeem_many([amount])[0]
+            elif edge.kind == 'stake':
+                output = service.vault_reader.preview_deposit_many([amount])[0]
+            else:
+                quote = service.get_quote(edge.pair, amount)
+                output = quote['output_amount'] if quote else None
+        except Exception as e:
+            print(f"兑换边 {edge.pair} 报价失败: {e}")
+            output = None
+
+        record_leg(edge.pair, bool(output))
+        if not output:
+            return None
+        impact = service.price_impact(edge.pair, amount, output) if edge.kind == 'swap' else 0.0
+        return EdgeQuote(edge, amount, output, impact)
+
+    def evaluate(self, service, initial_amount: float) -> Dict[str, Optional[List[ArbitrageStep]]]:
+        """对所有路径求值，返回 路径名 -> 各步骤（失败为None）"""
+        quotes: Dict[RouteEdge, Optional[EdgeQuote]] = {}
+        amounts = {cycle.name: initial_amount for cycle in self.cycles}
+        steps: Dict[str, Optional[List[ArbitrageStep]]] = {cycle.name: [] for cycle in self.cycles}
+        depth_count = max(len(cycle.edges) for cycle in self.cycles) if self.cycles else 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='route-edge') as executor:
+            for depth in range(depth_count):
+                active = [cycle for cycle in self.cycles
+                          if steps[cycle.name] is not None and depth < len(cycle.edges)]
+
+                # 本层尚未报价的边，以第一条经过它的路径的金额报价
+                pending: Dict[RouteEdge, float] = {}
+                for cycle in active:
+                    edge = cycle.edges[depth]
+                    if edge not in quotes and edge not in pending:
+                        pending[edge] = amounts[cycle.name]
+                fetched = executor.map(lambda item: self.quote_edge(service, *item), pending.items())
+                quotes.update(zip(pending, fetched))
+
+                for cycle in active:
+                    edge = cycle.edges[depth]
+                    quote = quotes[edge]
+                    if quote is None:
+                        print(f"路径 {cycle.name} 第{depth + 1}步 {edge.src} → {edge.dst} 失败")
+                        steps[cycle.name] = None
+                        continue
+
+                    input_amount = amounts[cycle.name]
+                    output_amount = (quote.output_amount if input_amount == quote.input_amount
+                                     else input_amount * quote.rate)
+                    steps[cycle.name].append(ArbitrageStep(
+                        step_number=depth + 1,
+                        from_token=edge.src,
+                        to_token=edge.dst,
+                        input_amount=input_amount,
+                        output_amount=output_amount,
+                        price_impact=quote.price_impact,
+                        route=EDGE_ROUTES[edge.kind]
+                    ))
+                    amounts[cycle.name] = output_amount
+
+        self.last_stats = {
+            'cycles': len(self.cycles),
+            'legs': sum(len(cycle.edges) for cycle in self.cycles),
+            'distinct_edges': len(self.edges),
+            'quotes': len(quotes)
+        }
+        print(f"路径求值完成: {self.last_stats['cycles']} 条路径, {self.last_stats['legs']} 步, "
+              f"报价 {self.last_stats['quotes']} 次")
+        return steps
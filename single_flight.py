@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+手动检查的请求合并与新鲜度窗口
+
+同一金额的并发请求只触发一次计算（single-flight），其余请求等待并共享结果；
+计算完成后结果在新鲜度窗口内直接返回，并附带其已存在的时长。
+定时监控产生的结果也写入，手动检查可以直接复用。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from models import ArbitrageResult
+
+
+class _Flight:
+    """一次进行中的计算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[ArbitrageResult] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按金额合并的检查结果缓存（线程安全）"""
+
+    def __init__(self, max_age: float = 10.0, max_entries: int = 64):
+        self.max_age = max_age
+        self.max_entries = max(1, max_entries)
+        # key -> (完成时间, 结果)
+        self._results: 'OrderedDict[Hashable, Tuple[float, ArbitrageResult]]' = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {'computed': 0, 'cached': 0, 'shared': 0, 'errors': 0}
+
+    def store(self, key: Hashable, result: ArbitrageResult, completed_at: Optional[float] = None):
+        """写入一个已完成的结果"""
+        with self._lock:
+            self._store(key, result, time.time() if completed_at is None else completed_at)
+
+    def _store(self, key: Hashable, result: ArbitrageResult, completed_at: float):
+        # 调用方已持有锁；不用更旧的结果覆盖更新的结果
+        current = self._results.get(key)
+        if current is not None and current[0] > completed_at:
+            return
+        self._results[key] = (completed_at, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def get(self, key: Hashable, compute: Callable[[], Optional[ArbitrageResult]],
+            max_age: Optional[float] = None) -> Tuple[Optional[ArbitrageResult], float, str]:
+        """
+        返回 (结果, 结果时长秒数, 来源)，来源为 cached / shared / computed。
+        max_age 为 None 时使用默认新鲜度窗口，0 表示不使用缓存（仍会合并进行中的计算）。
+        """
+        max_age = self.max_age if max_age is None else max(0.0, max_age)
+        now = time.time()
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and now - entry[0] <= max_age:
+                self._results.move_to_end(key)
+                self._stats['cached'] += 1
+                return entry[1], now - entry[0], 'cached'
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self._stats['shared'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, self._age(key, flight.result), 'shared'
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is not None:
+                    self._stats['errors'] += 1
+                else:
+                    self._stats['computed'] += 1
+                    if flight.result is not None:
+                        self._store(key, flight.result, time.time())
+            flight.done.set()
+        return flight.result, 0.0, 'computed'
+
+    def _age(self, key: Hashable, result: Optional[ArbitrageResult]) -> float:
+        with self._lock:
+            entry = self._results.get(key)
+        if entry is None or entry[1] is not result:
+            return 0.0
+        return time.time() - entry[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_age': self.max_age,
+                'entries': len(self._results),
+                'in_flight': len(self._flights),
+                **self._stats
+            }
@@ -0,0 +1,136 @@
+"""
+最优交易金额搜索
+
+收益随金额变化的曲线由价格影响决定，通常先升后降（单峰）。搜索在对数金额上进行：
+1. 括区间：在上下限之间取少量等比金额一次并发计算，找到最优样本及其相邻样本
+2. 黄金分割：在该区间内每次只计算一个新金额，直到区间宽度小于容差或用完计算次数
+
+计算过的金额按三位有效数字取整并缓存，探测点落在已计算的金额上时不再报价。
+目标可为绝对收益（profit），或在收益不低于 min_profit 的前提下最大化年化收益率（apy）。
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from models import ArbitrageResult
+
+OBJECTIVES = ('profit', 'apy')
+INV_PHI = (math.sqrt(5) - 1) / 2
+
+
+def round_amount(amount: float, digits: int = 3) -> float:
+    """取整为若干位有效数字，便于缓存命中与页面输入"""
+    if amount <= 0:
+        return amount
+    return float(round(amount, digits - 1 - int(math.floor(math.log10(amount)))))
+
+
+@dataclass
+class SizeSearchResult:
+    """一次金额搜索的结果"""
+    objective: str
+    min_amount: float
+    max_amount: float
+    optimum: Optional[ArbitrageResult]
+    samples: List[ArbitrageResult] = field(default_factory=list)
+    evaluations: int = 0
+    converged: bool = False
+
+    def to_dict(self) -> Dict:
+        return {
+            'objective': self.objective,
+            'bounds': [self.min_amount, self.max_amount],
+            'optimal_amount': self.optimum.initial_amount if self.optimum else None,
+            'optimum': self.optimum.to_dict() if self.optimum else None,
+            'samples': [{
+                'amount': r.initial_amount,
+                'profit_loss': r.profit_loss,
+                'annualized_return': r.annualized_return
+            } for r in self.samples],
+            'evaluations': self.evaluations,
+            'converged': self.converged
+        }
+
+
+class TradeSizeOptimizer:
+    """在 [min_amount, max_amount] 内搜索最优交易金额
+
+    evaluate_many(amounts) 计算一组金额并返回成功的结果（如 ArbitrageCalculator.calculate_ladder）
+    """
+
+    def __init__(self, evaluate_many: Callable[[List[float]], List[ArbitrageResult]],
+                 min_amount: float, max_amount: float, objective: str = 'profit',
+                 min_profit: float = 0.0, tolerance: float = 0.02, max_evaluations: int = 12,
+                 bracket_points: int = 4):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"无效的优化目标: {objective}，可选: {', '.join(OBJECTIVES)}")
+        if not 0 < min_amount < max_amount:
+            raise ValueError(f"金额范围无效: {min_amount} - {max_amount}")
+        self.evaluate_many = evaluate_many
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.objective = objective
+        self.min_profit = min_profit
+        self.tolerance = max(tolerance, 1e-4)
+        self.max_evaluations = max(3, max_evaluations)
+        self.bracket_points = max(3, bracket_points)
+        self._results: Dict[float, Optional[ArbitrageResult]] = {}
+
+    @property
+    def evaluations(self) -> int:
+        return len(self._results)
+
+    def score(self, result: Optional[ArbitrageResult]) -> float:
+        if result is None:
+            return -math.inf
+        if self.objective == 'profit':
+            return result.profit_loss
+        return result.annualized_return if result.profit_loss >= self.min_profit else -math.inf
+
+    def _evaluate(self, amounts: List[float]) -> List[float]:
+        """计算未缓存的金额（一次批量），返回各金额的得分"""
+        amounts = [round_amount(amount) for amount in amounts]
+        missing = [amount for amount in dict.fromkeys(amounts) if amount not in self._results]
+        if missing:
+            results = {r.initial_amount: r for r in self.evaluate_many(missing)}
+            for amount in missing:
+                self._results[amount] = results.get(amount)
+        return [self.score(self._results[amount]) for amount in amounts]
+
+    def _score_at(self, log_amount: float) -> float:
+        amount = round_amount(math.exp(log_amount))
+        if amount not in self._results and self.evaluations >= self.max_evaluations:
+            return -math.inf
+        return self._evaluate([amount])[0]
+
+    def search(self) -> SizeSearchResult:
+        low, high = math.log(self.min_amount), math.log(self.max_amount)
+
+        # 括区间：等比样本一次并发计算
+        grid = [low + (high - low) * i / (self.bracket_points - 1) for i in range(self.bracket_points)]
+        scores = self._evaluate([math.exp(x) for x in grid])
+        best = max(range(len(grid)), key=lambda i: scores[i])
+
+        converged = False
+        if scores[best] > -math.inf:
+            a, b = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+            c, d = b - INV_PHI * (b - a), a + INV_PHI * (b - a)
+            fc, fd = self._score_at(c), self._score_at(d)
+            stop_width = math.log(1 + self.tolerance)
+            while b - a > stop_width and self.evaluations < self.max_evaluations:
+                if fc >= fd:
+                    b, d, fd = d, c, fc
+                    c = b - INV_PHI * (b - a)
+                    fc = self._score_at(c)
+                else:
+                    a, c, fc = c, d, fd
+                    d = a + INV_PHI * (b - a)
+                    fd = self._score_at(d)
+            converged = b - a <= stop_width
+
+        samples = sorted((r for r in self._results.values() if r is not None), key=lambda r: r.initial_amount)
+        feasible = [r for r in samples if self.score(r) > -math.inf]
+        optimum = max(feasible, key=self.score) if feasible else None
+        return SizeSearchResult(self.objective, self.min_amount, self.max_amount, optimum,
+                                samples, self.evaluations, converged)
@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+"""
+存储后端
+
+- SupabaseBackend: 远程Supabase（原有方式）
+- SQLiteBackend: 内嵌SQLite，表结构与索引与 database_schema.sql 一致，可离线独立使用
+- SpoolBackend: 先写入本地SQLite，后台线程再批量同步到Supabase；读取走本地
+
+所有查询方法出错时直接抛出异常，由 DatabaseService 统一记录日志。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from config import (SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY, STORAGE_BACKEND,
+                    SQLITE_PATH, SPOOL_SYNC_INTERVAL, SPOOL_SYNC_BATCH_SIZE)
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# 与 database_schema.sql 对应的SQLite表结构（JSONB/数组以JSON文本存储）
+# synced 列仅在 spool 模式下使用，标记是否已同步到Supabase
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS arbitrage_checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+    check_type VARCHAR(20) NOT NULL DEFAULT 'scheduled',
+    amount REAL NOT NULL,
+    usdt_to_susde_price REAL,
+    susde_to_usde_rate REAL,
+    usde_to_usdt_price REAL,
+    profit_loss REAL,
+    profit_percentage REAL,
+    annualized_return REAL,
+    is_profitable INTEGER NOT NULL DEFAULT 0,
+    execution_steps TEXT,
+    market_data TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+    synced INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+    alert_type VARCHAR(20) NOT NULL DEFAULT 'check',
+    message TEXT NOT NULL,
+    arbitrage_data TEXT,
+    is_opportunity INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')),
+    synced INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_timestamp ON arbitrage_checks(timestamp);
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_is_profitable ON arbitrage_checks(is_profitable);
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_annualized_return ON arbitrage_checks(annualized_return);
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_check_type ON arbitrage_checks(check_type);
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_unsynced ON arbitrage_checks(id) WHERE synced = 0;
+
+CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts(timestamp);
+CREATE INDEX IF NOT EXISTS idx_alerts_alert_type ON alerts(alert_type);
+CREATE INDEX IF NOT EXISTS idx_alerts_is_opportunity ON alerts(is_opportunity);
+CREATE INDEX IF NOT EXISTS idx_alerts_unsynced ON alerts(id) WHERE synced = 0;
+
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_timestamp_id ON arbitrage_checks(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_timestamp_id ON alerts(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_arbitrage_checks_profitable_apy_id ON arbitrage_checks(annualized_return DESC, id DESC)
+    WHERE is_profitable = 1;
+
+CREATE TABLE IF NOT EXISTS arbitrage_checks_hourly (
+    bucket_start TEXT PRIMARY KEY,
+    check_count INTEGER NOT NULL DEFAULT 0,
+    profitable_count INTEGER NOT NULL DEFAULT 0,
+    apy_count INTEGER NOT NULL DEFAULT 0,
+    apy_sum REAL NOT NULL DEFAULT 0,
+    apy_min REAL,
+    apy_max REAL,
+    best_opportunity_id INTEGER,
+    best_opportunity_apy REAL
+);
+
+CREATE TABLE IF NOT EXISTS arbitrage_checks_daily (
+    bucket_start TEXT PRIMARY KEY,
+    check_count INTEGER NOT NULL DEFAULT 0,
+    profitable_count INTEGER NOT NULL DEFAULT 0,
+    apy_count INTEGER NOT NULL DEFAULT 0,
+    apy_sum REAL NOT NULL DEFAULT 0,
+    apy_min REAL,
+    apy_max REAL,
+    best_opportunity_id INTEGER,
+    best_opportunity_apy REAL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_arbitrage_checks_rollup AFTER INSERT ON arbitrage_checks
+BEGIN
+    INSERT INTO arbitrage_checks_hourly VALUES (
+        substr(NEW.timestamp, 1, 13) || ':00:00', 1, NEW.is_profitable, NEW.annualized_return IS NOT NULL,
+        COALESCE(NEW.annualized_return, 0), NEW.annualized_return, NEW.annualized_return,
+        CASE WHEN NEW.is_profitable THEN NEW.id END, CASE WHEN NEW.is_profitable THEN NEW.annualized_return END
+    ) ON CONFLICT(bucket_start) DO UPDATE SET __ROLLUP_UPDATE__;
+
+    INSERT INTO arbitrage_checks_daily VALUES (
+        substr(NEW.timestamp, 1, 10) || 'T00:00:00', 1, NEW.is_profitable, NEW.annualized_return IS NOT NULL,
+        COALESCE(NEW.annualized_return, 0), NEW.annualized_return, NEW.annualized_return,
+        CASE WHEN NEW.is_profitable THEN NEW.id END, CASE WHEN NEW.is_profitable THEN NEW.annualized_return END
+    ) ON CONFLICT(bucket_start) DO UPDATE SET __ROLLUP_UPDATE__;
+END;
+
+CREATE VIEW IF NOT EXISTS recent_profitable_opportunities AS
+SELECT timestamp, amount, profit_loss, profit_percentage, annualized_return, execution_steps, market_data
+FROM arbitrage_checks
+WHERE is_profitable = 1
+ORDER BY timestamp DESC;
+"""
+
+# 汇总行合并规则（SQLite的min/max遇到NULL返回NULL，需先COALESCE）
+ROLLUP_UPDATE = """
+        check_count = check_count + 1,
+        profitable_count = profitable_count + excluded.profitable_count,
+        apy_count = apy_count + excluded.apy_count,
+        apy_sum = apy_sum + excluded.apy_sum,
+        apy_min = min(COALESCE(apy_min, excluded.apy_min), COALESCE(excluded.apy_min, apy_min)),
+        apy_max = max(COALESCE(apy_max, excluded.apy_max), COALESCE(excluded.apy_max, apy_max)),
+        best_opportunity_id = CASE WHEN excluded.best_opportunity_apy IS NOT NULL
+                                        AND (best_opportunity_apy IS NULL OR excluded.best_opportunity_apy > best_opportunity_apy)
+                                   THEN excluded.best_opportunity_id ELSE best_opportunity_id END,
+        best_opportunity_apy = max(COALESCE(best_opportunity_apy, excluded.best_opportunity_apy),
+                                   COALESCE(excluded.best_opportunity_apy, best_opportunity_apy))"""
+SQLITE_SCHEMA = SQLITE_SCHEMA.replace('__ROLLUP_UPDATE__', ROLLUP_UPDATE)
+
+# 已有数据库首次创建汇总表时回填
+ROLLUP_BACKFILL = """
+INSERT INTO {table}
+SELECT {bucket}, COUNT(*), SUM(is_profitable), COUNT(annualized_return), COALESCE(SUM(annualized_return), 0),
+       MIN(annualized_return), MAX(annualized_return),
+       (SELECT c.id FROM arbitrage_checks c WHERE {bucket_c} = {bucket} AND c.is_profitable = 1
+        ORDER BY c.annualized_return DESC LIMIT 1),
+       MAX(CASE WHEN is_profitable = 1 THEN annualized_return END)
+FROM arbitrage_checks GROUP BY 1
+"""
+ROLLUP_BUCKETS = {
+    'arbitrage_checks_hourly': "substr({alias}timestamp, 1, 13) || ':00:00'",
+    'arbitrage_checks_daily': "substr({alias}timestamp, 1, 10) || 'T00:00:00'",
+}
+ROLLUP_INTERVALS = {
+    'arbitrage_checks_hourly': '+1 hour',
+    'arbitrage_checks_daily': '+1 day',
+}
+
+# 清理原始记录后，最佳机会已被删除的汇总行改为桶内剩余盈利记录中最好的一条（没有则置空）
+ROLLUP_FORGET_DELETED = """
+UPDATE {table} SET (best_opportunity_id, best_opportunity_apy) = (
+    SELECT c.id, c.annualized_return FROM arbitrage_checks c
+    WHERE c.timestamp >= {table}.bucket_start
+      AND c.timestamp < strftime('%Y-%m-%dT%H:%M:%S', {table}.bucket_start, '{interval}')
+      AND c.is_profitable = 1
+    ORDER BY c.annualized_return DESC LIMIT 1
+)
+WHERE best_opportunity_id IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM arbitrage_checks c WHERE c.id = {table}.best_opportunity_id)
+"""
+
+# 各表的列定义：JSON列与布尔列需要在读写时转换
+TABLE_COLUMNS = {
+    'arbitrage_checks': ('timestamp', 'check_type', 'amount', 'usdt_to_susde_price', 'susde_to_usde_rate',
+                         'usde_to_usdt_price', 'profit_loss', 'profit_percentage', 'annualized_return',
+                         'is_profitable', 'execution_steps', 'market_data'),
+    'alerts': ('timestamp', 'alert_type', 'message', 'arbitrage_data', 'is_opportunity'),
+}
+JSON_COLUMNS = {'execution_steps', 'market_data', 'arbitrage_data'}
+BOOL_COLUMNS = {'is_profitable', 'is_opportunity'}
+
+# 不含大字段（market_data / arbitrage_data）的列，历史接口默认只返回这些列
+SUMMARY_COLUMNS = {
+    table: ('id',) + tuple(column for column in columns if column not in ('market_data', 'arbitrage_data'))
+    + ('created_at',)
+    for table, columns in TABLE_COLUMNS.items()
+}
+
+
+def statistics_result(days: int, total_checks: int, profitable_count: int, max_apy: Any, avg_apy: Any,
+                      best_opportunity_id: Optional[int] = None) -> Dict[str, Any]:
+    """统一的统计结果格式"""
+    return {
+        'period_days': days,
+        'total_checks': total_checks,
+        'profitable_opportunities': profitable_count,
+        'success_rate': (profitable_count / total_checks * 100) if total_checks > 0 else 0,
+        'max_apy': max_apy,
+        'avg_apy': avg_apy,
+        'best_opportunity_id': best_opportunity_id
+    }
+
+
+class StorageBackend:
+    """存储后端基类"""
+
+    name = 'base'
+
+    @property
+    def connected(self) -> bool:
+        return False
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """多行插入，失败时抛出异常"""
+        raise NotImplementedError
+
+    # 历史查询：after 为上一页最后一条的 (排序键, id)，include_data=False 时不返回大字段
+
+    def get_recent_checks(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        """按 (timestamp, id) 倒序"""
+        raise NotImplementedError
+
+    def get_recent_alerts(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        """按 (timestamp, id) 倒序"""
+        raise NotImplementedError
+
+    def get_profitable_opportunities(self, days: int, min_apy: float, limit: Optional[int] = None,
+                                     after: Optional[Tuple[Any, int]] = None,
+                                     include_data: bool = True) -> List[Dict]:
+        """按 (annualized_return, id) 倒序"""
+        raise NotImplementedError
+
+    def get_statistics(self, days: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def cleanup_old_data(self, days: int):
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源"""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'connected': self.connected}
+
+
+class SupabaseBackend(StorageBackend):
+    """Supabase远程存储，首次使用时建立连接"""
+
+    name = 'supabase'
+
+    def __init__(self, url: Optional[str] = SUPABASE_URL, key: Optional[str] = None):
+        self.url = url
+        # 优先使用服务角色密钥，否则使用匿名密钥
+        self.key = key or SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY
+        self.client: Optional['Client'] = None
+        self._connected = False
+        self._connect_attempted = False
+        self._connect_lock = threading.Lock()
+        self._rollups_available = True
+
+    @property
+    def connected(self) -> bool:
+        if not self._connect_attempted:
+            with self._connect_lock:
+                if not self._connect_attempted:
+                    self._connect()
+                    self._connect_attempted = True
+        return self._connected
+
+    def _connect(self):
+        """连接到Supabase"""
+        try:
+            if not self.url or not self.key:
+                logger.warning("Supabase配置不完整，数据库功能将被禁用")
+                return
+
+            from supabase import create_client
+
+            self.client = create_client(self.url, self.key)
+            self._connected = True
+            logger.info("成功连接到Supabase数据库")
+
+            # 测试连接
+            self._test_connection()
+
+        except Exception as e:
+            logger.error(f"连接Supabase失败: {e}")
+            self._connected = False
+
+    def _test_connection(self):
+        """测试数据库连接"""
+        try:
+            if self.client:
+                # 尝试查询arbitrage_checks表
+                self.client.table('arbitrage_checks').select('*').limit(1).execute()
+                logger.info("数据库连接测试成功")
+        except Exception as e:
+            logger.warning(f"数据库连接测试失败: {e}")
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        if not self.connected or not self.client:
+            raise Exception("数据库未连接")
+
+        response = self.client.table(table).insert(rows).execute()
+        if not response.data:
+            raise Exception("插入无返回数据")
+
+    def _select(self, table: str, include_data: bool):
+        columns = '*' if include_data else ','.join(SUMMARY_COLUMNS[table])
+        return self.client.table(table).select(columns)
+
+    @staticmethod
+    def _after(query, field: str, after: Optional[Tuple[Any, int]]):
+        """keyset条件：(field, id) < after"""
+        if after is None:
+            return query
+        value, last_id = after
+        if not isinstance(value, (int, float)):
+            # 游标来自客户端，只接受时间戳，避免拼入PostgREST过滤语法
+            datetime.fromisoformat(str(value))
+        return query.or_(f'{field}.lt."{value}",and({field}.eq."{value}",id.lt.{int(last_id)})')
+
+    def get_recent_checks(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+        query = self._select('arbitrage_checks', include_data).gte('timestamp', cutoff_time)
+        response = (self._after(query, 'timestamp', after)
+                    .order('timestamp', desc=True)
+                    .order('id', desc=True)
+                    .limit(limit)
+                    .execute())
+        return response.data or []
+
+    def get_recent_alerts(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+        query = self._select('alerts', include_data).gte('timestamp', cutoff_time)
+        response = (self._after(query, 'timestamp', after)
+                    .order('timestamp', desc=True)
+                    .order('id', desc=True)
+                    .limit(limit)
+                    .execute())
+        return response.data or []
+
+    def get_profitable_opportunities(self, days: int, min_apy: float, limit: Optional[int] = None,
+                                     after: Optional[Tuple[Any, int]] = None,
+                                     include_data: bool = True) -> List[Dict]:
+        cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
+        query = (self._select('arbitrage_checks', include_data)
+                 .gte('timestamp', cutoff_time)
+                 .eq('is_profitable', True)
+                 .gte('annualized_return', min_apy))
+        query = (self._after(query, 'annualized_return', after)
+                 .order('annualized_return', desc=True)
+                 .order('id', desc=True))
+        if limit is not None:
+            query = query.limit(limit)
+        response = query.execute()
+        return response.data or []
+
+    def get_statistics(self, days: int) -> Dict[str, Any]:
+        """一次RPC读取汇总表统计；数据库未创建汇总表时退回到扫描原始记录"""
+        cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
+        if self._rollups_available:
+            try:
+                response = self.client.rpc('get_rollup_statistics', {'start_time': cutoff_time}).execute()
+                row = response.data[0] if response.data else {}
+                return statistics_result(days, row.get('total_checks') or 0, row.get('profitable_count') or 0,
+                                         row.get('max_apy') or 0, row.get('avg_apy') or 0,
+                                         row.get('best_opportunity_id'))
+            except Exception as e:
+                self._rollups_available = False
+                logger.warning(f"汇总统计不可用，改为扫描原始记录（请执行 database_schema.sql 第11节）: {e}")
+        return self._scan_statistics(days, cutoff_time)
+
+    def _scan_statistics(self, days: int, cutoff_time: str) -> Dict[str, Any]:
+
+        # 获取总检查次数
+        total_checks_response = (self.client.table('arbitrage_checks')
+                                 .select('id', count='exact')
+                                 .gte('timestamp', cutoff_time)
+                                 .execute())
+
+        # 获取盈利机会次数
+        profitable_response = (self.client.table('arbitrage_checks')
+                               .select('id', count='exact')
+                               .gte('timestamp', cutoff_time)
+                               .eq('is_profitable', True)
+                               .execute())
+
+        # 获取最高年化收益率
+        max_apy_response = (self.client.table('arbitrage_checks')
+                            .select('annualized_return')
+                            .gte('timestamp', cutoff_time)
+                            .order('annualized_return', desc=True)
+                            .limit(1)
+                            .execute())
+
+        # 获取平均年化收益率
+        avg_apy_response = (self.client.rpc('avg_annualized_return', {
+            'start_time': cutoff_time
+        }).execute())
+
+        total_checks = total_checks_response.count or 0
+        profitable_count = profitable_response.count or 0
+        max_apy = max_apy_response.data[0]['annualized_return'] if max_apy_response.data else 0
+        avg_apy = avg_apy_response.data if avg_apy_response.data else 0
+
+        return statistics_result(days, total_checks, profitable_count, max_apy, avg_apy)
+
+    def cleanup_old_data(self, days: int):
+        cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
+        # 删除旧的检查记录
+        self.client.table('arbitrage_checks').delete().lt('timestamp', cutoff_time).execute()
+        # 删除旧的告警记录
+        self.client.table('alerts').delete().lt('timestamp', cutoff_time).execute()
+
+
+class SQLiteBackend(StorageBackend):
+    """内嵌SQLite存储，单连接加锁，读取无网络往返"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            if path != ':memory:':
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SQLITE_SCHEMA)
+            self._backfill_rollups()
+            # 更新统计信息，让查询规划器选用分页复合索引
+            self.conn.execute("PRAGMA optimize")
+        logger.info(f"SQLite存储已就绪: {path}")
+
+    def _backfill_rollups(self):
+        """汇总表为空而原始记录不为空时（升级前的数据库）按原始记录重建汇总"""
+        for table, bucket in ROLLUP_BUCKETS.items():
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                continue
+            if not self.conn.execute("SELECT 1 FROM arbitrage_checks LIMIT 1").fetchone():
+                continue
+            self.conn.execute(ROLLUP_BACKFILL.format(table=table, bucket=bucket.format(alias=''),
+                                                     bucket_c=bucket.format(alias='c.')))
+            logger.info(f"已回填汇总表 {table}")
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    @staticmethod
+    def _encode(column: str, value: Any) -> Any:
+        if column in JSON_COLUMNS:
+            return json.dumps(value, ensure_ascii=False) if value is not None else None
+        if column in BOOL_COLUMNS:
+            return 1 if value else 0
+        return value
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        data.pop('synced', None)
+        for column in JSON_COLUMNS & data.keys():
+            if data[column] is not None:
+                data[column] = json.loads(data[column])
+        for column in BOOL_COLUMNS & data.keys():
+            data[column] = bool(data[column])
+        return data
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]], synced: bool = False):
+        columns = TABLE_COLUMNS[table]
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}, synced) "
+               f"VALUES ({', '.join('?' for _ in columns)}, ?)")
+        values = [tuple(self._encode(column, row.get(column)) for column in columns) + (int(synced),)
+                  for row in rows]
+        with self._lock, self.conn:
+            self.conn.executemany(sql, values)
+
+    def _history(self, table: str, where: str, params: tuple, sort_field: str, limit: Optional[int],
+                 after: Optional[Tuple[Any, int]], include_data: bool) -> List[Dict]:
+        columns = '*' if include_data else ', '.join(SUMMARY_COLUMNS[table])
+        if after is not None:
+            # 行值比较可直接沿 (sort_field DESC, id DESC) 索引定位
+            where += f" AND ({sort_field}, id) < (?, ?)"
+            params += tuple(after)
+        sql = f"SELECT {columns} FROM {table} WHERE {where} ORDER BY {sort_field} DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return self._query(sql, params)
+
+    def get_recent_checks(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+        return self._history('arbitrage_checks', "timestamp >= ?", (cutoff_time,), 'timestamp',
+                             limit, after, include_data)
+
+    def get_recent_alerts(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+        return self._history('alerts', "timestamp >= ?", (cutoff_time,), 'timestamp',
+                             limit, after, include_data)
+
+    def get_profitable_opportunities(self, days: int, min_apy: float, limit: Optional[int] = None,
+                                     after: Optional[Tuple[Any, int]] = None,
+                                     include_data: bool = True) -> List[Dict]:
+        cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
+        return self._history('arbitrage_checks', "timestamp >= ? AND is_profitable = 1 AND annualized_return >= ?",
+                             (cutoff_time, min_apy), 'annualized_return', limit, after, include_data)
+
+    def get_statistics(self, days: int) -> Dict[str, Any]:
+        """读取窗口内完整的天/小时汇总，加上两端不足一小时的原始记录"""
+        start = datetime.now() - timedelta(days=days)
+        now = datetime.now()
+
+        # 窗口内完整小时 [hour_lo, hour_hi)，完整天 [day_lo, day_hi)
+        hour_lo = start.replace(minute=0, second=0, microsecond=0)
+        if hour_lo < start:
+            hour_lo += timedelta(hours=1)
+        hour_hi = now.replace(minute=0, second=0, microsecond=0)
+        if hour_lo >= hour_hi:
+            # 窗口不足一个完整小时，全部读取原始记录
+            hour_lo = hour_hi = start
+        day_lo = hour_lo.replace(hour=0, minute=0, second=0, microsecond=0)
+        if day_lo < hour_lo:
+            day_lo += timedelta(days=1)
+        day_hi = hour_hi.replace(hour=0, minute=0, second=0, microsecond=0)
+        if day_lo >= day_hi:
+            day_lo = day_hi = hour_lo
+
+        columns = ("check_count, profitable_count, apy_count, apy_sum, apy_max, "
+                   "best_opportunity_id, best_opportunity_apy")
+        sql = f"""
+            WITH parts AS (
+                SELECT {columns} FROM arbitrage_checks_daily
+                WHERE bucket_start >= :day_lo AND bucket_start < :day_hi
+                UNION ALL
+                SELECT {columns} FROM arbitrage_checks_hourly
+                WHERE (bucket_start >= :hour_lo AND bucket_start < :day_lo)
+                   OR (bucket_start >= :day_hi AND bucket_start < :hour_hi)
+                UNION ALL
+                SELECT 1, is_profitable, annualized_return IS NOT NULL, COALESCE(annualized_return, 0),
+                       annualized_return, CASE WHEN is_profitable THEN id END,
+                       CASE WHEN is_profitable THEN annualized_return END
+                FROM arbitrage_checks
+                WHERE timestamp >= :start AND (timestamp < :hour_lo OR timestamp >= :hour_hi)
+            )
+            SELECT COALESCE(SUM(check_count), 0) AS total_checks,
+                   COALESCE(SUM(profitable_count), 0) AS profitable_count,
+                   COALESCE(MAX(apy_max), 0) AS max_apy,
+                   CASE WHEN SUM(apy_count) > 0 THEN SUM(apy_sum) / SUM(apy_count) ELSE 0 END AS avg_apy,
+                   (SELECT best_opportunity_id FROM parts WHERE best_opportunity_id IS NOT NULL
+                    ORDER BY best_opportunity_apy DESC LIMIT 1) AS best_opportunity_id
+            FROM parts
+        """
+        params = {name: value.isoformat() for name, value in (
+            ('start', start), ('hour_lo', hour_lo), ('hour_hi', hour_hi), ('day_lo', day_lo), ('day_hi', day_hi))}
+        with self._lock:
+            row = self.conn.execute(sql, params).fetchone()
+
+        return statistics_result(days, row['total_checks'], row['profitable_count'], row['max_apy'],
+                                 row['avg_apy'], row['best_opportunity_id'])
+
+    def cleanup_old_data(self, days: int, synced_only: bool = False):
+        cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
+        condition = "timestamp < ?" + (" AND synced = 1" if synced_only else "")
+        with self._lock, self.conn:
+            self.conn.execute(f"DELETE FROM arbitrage_checks WHERE {condition}", (cutoff_time,))
+            self.conn.execute(f"DELETE FROM alerts WHERE {condition}", (cutoff_time,))
+            # 汇总表保留长期统计，只修正指向已删除记录的 best_opportunity_id
+            for table, interval in ROLLUP_INTERVALS.items():
+                self.conn.execute(ROLLUP_FORGET_DELETED.format(table=table, interval=interval))
+
+    def fetch_unsynced(self, table: str, limit: int) -> List[Dict[str, Any]]:
+        """取出尚未同步的行（按id顺序）"""
+        return self._query(f"SELECT * FROM {table} WHERE synced = 0 ORDER BY id LIMIT ?", (limit,))
+
+    def mark_synced(self, table: str, ids: List[int]):
+        with self._lock, self.conn:
+            self.conn.executemany(f"UPDATE {table} SET synced = 1 WHERE id = ?", [(i,) for i in ids])
+
+    def count_unsynced(self) -> Dict[str, int]:
+        with self._lock:
+            return {table: self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE synced = 0").fetchone()[0]
+                    for table in TABLE_COLUMNS}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), 'path': self.path}
+
+
+class SpoolBackend(StorageBackend):
+    """本地SQLite缓冲 + 后台同步到Supabase；Supabase不可用时数据保留在本地"""
+
+    name = 'spool'
+
+    def __init__(self, local: SQLiteBackend, remote: SupabaseBackend,
+                 sync_interval: float = SPOOL_SYNC_INTERVAL, batch_size: int = SPOOL_SYNC_BATCH_SIZE):
+        self.local = local
+        self.remote = remote
+        self.sync_interval = sync_interval
+        self.batch_size = max(1, batch_size)
+        self._stop = threading.Event()
+        self._sync_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'synced_rows': 0, 'sync_errors': 0, 'last_sync': None, 'last_error': None}
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        self.local.insert_rows(table, rows)
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None and self.sync_interval > 0 and not self._stop.is_set():
+            with self._sync_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='spool-sync', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def sync(self) -> int:
+        """把本地未同步的行批量写入Supabase，返回本次同步的行数"""
+        if not self.remote.connected:
+            return 0
+
+        synced = 0
+        with self._sync_lock:
+            for table in TABLE_COLUMNS:
+                while True:
+                    rows = self.local.fetch_unsynced(table, self.batch_size)
+                    if not rows:
+                        break
+                    try:
+                        # 远程表自行分配id
+                        self.remote.insert_rows(table, [{column: row[column] for column in TABLE_COLUMNS[table]}
+                                                        for row in rows])
+                    except Exception as e:
+                        self._stats['sync_errors'] += 1
+                        self._stats['last_error'] = str(e)
+                        logger.error(f"同步 {table} 到Supabase失败: {e}")
+                        return synced
+                    self.local.mark_synced(table, [row['id'] for row in rows])
+                    synced += len(rows)
+
+        self._stats['synced_rows'] += synced
+        self._stats['last_sync'] = datetime.now().isoformat()
+        if synced:
+            logger.info(f"已同步 {synced} 条本地记录到Supabase")
+        return synced
+
+    def get_recent_checks(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        return self.local.get_recent_checks(hours, limit, after, include_data)
+
+    def get_recent_alerts(self, hours: int, limit: int, after: Optional[Tuple[Any, int]] = None,
+                          include_data: bool = True) -> List[Dict]:
+        return self.local.get_recent_alerts(hours, limit, after, include_data)
+
+    def get_profitable_opportunities(self, days: int, min_apy: float, limit: Optional[int] = None,
+                                     after: Optional[Tuple[Any, int]] = None,
+                                     include_data: bool = True) -> List[Dict]:
+        return self.local.get_profitable_opportunities(days, min_apy, limit, after, include_data)
+
+    def get_statistics(self, days: int) -> Dict[str, Any]:
+        return self.local.get_statistics(days)
+
+    def cleanup_old_data(self, days: int):
+        # 本地只删除已同步的旧数据，未同步的保留到同步完成
+        self.local.cleanup_old_data(days, synced_only=True)
+        if self.remote.connected:
+            self.remote.cleanup_old_data(days)
+
+    def close(self):
+        self._stop.set()
+        try:
+            self.sync()
+        except Exception as e:
+            logger.error(f"关闭前同步失败: {e}")
+        self.local.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            'path': self.local.path,
+            'remote_connected': self.remote._connected,
+            'unsynced': self.local.count_unsynced(),
+            **self._stats
+        }
+
+
+def create_backend(kind: str = STORAGE_BACKEND) -> StorageBackend:
+    """按配置创建存储后端"""
+    if kind == 'sqlite':
+        return SQLiteBackend()
+    if kind == 'spool':
+        return SpoolBackend(SQLiteBackend(), SupabaseBackend())
+    if kind != 'supabase':
+        logger.warning(f"未知的存储后端 {kind}，使用 supabase")
+    return SupabaseBackend()
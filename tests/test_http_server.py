@@ -0,0 +1,79 @@
+"""
+主端口 aiohttp 服务测试
+
+普通接口经WSGI转交Flask，/arbitrage/stream 由事件循环推送，两者共用一个端口。
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+flask = pytest.importorskip('flask')
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from event_stream import EventHub
+from http_server import create_app
+
+
+def make_flask_app():
+    app = flask.Flask(__name__)
+
+    @app.route('/echo/<name>', methods=['GET', 'POST'])
+    def echo(name):
+        response = flask.jsonify({
+            'name': name,
+            'method': flask.request.method,
+            'args': flask.request.args.to_dict(),
+            'json': flask.request.get_json(silent=True),
+            'custom': flask.request.headers.get('X-Custom')
+        })
+        response.set_cookie('a', '1')
+        response.set_cookie('b', '2')
+        return response, 201
+
+    return app
+
+
+def run(coro_fn):
+    async def main():
+        hub = EventHub(replay_size=10)
+        client = TestClient(TestServer(create_app(make_flask_app(), hub, heartbeat=0.2, threads=2)))
+        await client.start_server()
+        try:
+            await coro_fn(client, hub)
+        finally:
+            await client.close()
+    asyncio.run(main())
+
+
+def test_forwards_requests_to_flask():
+    async def check(client, hub):
+        response = await client.post('/echo/%E4%B8%AD?x=1&y=2', json={'amount': 5}, headers={'X-Custom': 'v'})
+        assert response.status == 201
+        assert response.content_type == 'application/json'
+        assert await response.json() == {'name': '中', 'method': 'POST', 'args': {'x': '1', 'y': '2'},
+                                         'json': {'amount': 5}, 'custom': 'v'}
+        assert len(response.headers.getall('Set-Cookie')) == 2
+
+        response = await client.get('/missing')
+        assert response.status == 404
+    run(check)
+
+
+def test_stream_served_by_event_loop():
+    async def check(client, hub):
+        response = await client.get('/arbitrage/stream')
+        assert response.status == 200
+        assert response.content_type == 'text/event-stream'
+        assert await response.content.readuntil(b'\n\n') == b'retry: 3000\n\n'
+
+        # 发布线程与事件循环不同
+        await asyncio.get_running_loop().run_in_executor(None, hub.publish, 'result', {'amount': 1})
+        chunk = await asyncio.wait_for(response.content.readuntil(b'\n\n'), 2)
+        assert chunk == b'id: 1\nevent: result\ndata: {"amount": 1}\n\n'
+        assert hub.stats()['subscribers'] == 1
+        assert hub.stats()['thread_subscribers'] == 0
+        response.close()
+    run(check)
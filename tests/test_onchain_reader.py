@@ -0,0 +1,106 @@
+"""
+SusdeVaultReader 批量读取测试
+
+对 local_standins.py 的本地JSON-RPC替身（/rpc）运行 Multicall3 与 JSON-RPC 批量两种模式，
+验证批量结果与逐个调用一致，且多个金额只产生一次HTTP往返。
+"""
+
+import pytest
+
+pytest.importorskip('web3')
+pytest.importorskip('eth_abi')
+pytest.importorskip('dotenv')
+
+from web3 import Web3
+
+from local_standins import StandinServer, StandinVault, add_jsonrpc_routes
+from onchain_reader import SusdeVaultReader
+
+AMOUNTS = [1.0, 1234.5678, 100000.0, 2500000.0, 0.000001]
+MODES = ['multicall', 'batch']
+
+
+@pytest.fixture
+def standin():
+    server = StandinServer()
+    vault = StandinVault()
+    add_jsonrpc_routes(server, vault)
+    server.start()
+    yield server, vault
+    server.stop()
+
+
+def make_reader(server: StandinServer, mode: str) -> SusdeVaultReader:
+    web3 = Web3(Web3.HTTPProvider(f'{server.url}/rpc', cache_allowed_requests=True))
+    return SusdeVaultReader(web3, mode=mode, rate_mode='rpc', verify_every=0)
+
+
+def count_round_trips(vault: StandinVault, fn):
+    """执行 fn，返回 (结果, 替身收到的HTTP请求数)"""
+    before = vault.rpc_requests
+    result = fn()
+    return result, vault.rpc_requests - before
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_preview_redeem_many_matches_single_calls(standin, mode):
+    server, vault = standin
+    reader = make_reader(server, mode)
+    # 预热：连接与可缓存的请求（如 eth_chainId）不计入批量调用
+    reader.preview_redeem_many(AMOUNTS[:2])
+
+    batched, round_trips = count_round_trips(vault, lambda: reader.preview_redeem_many(AMOUNTS))
+
+    single = [reader.from_wei(reader.vault.functions.previewRedeem(reader.to_wei(amount)).call())
+              for amount in AMOUNTS]
+    assert batched == single
+    assert batched == [reader.from_wei(vault.convert_to_assets(reader.to_wei(amount))) for amount in AMOUNTS]
+    assert round_trips == 1
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_convert_to_assets_many_matches_single_calls(standin, mode):
+    server, vault = standin
+    reader = make_reader(server, mode)
+    reader.convert_to_assets_many(AMOUNTS[:2])
+
+    batched, round_trips = count_round_trips(vault, lambda: reader.convert_to_assets_many(AMOUNTS))
+
+    single = [reader.from_wei(reader.vault.functions.convertToAssets(reader.to_wei(amount)).call())
+              for amount in AMOUNTS]
+    assert batched == single
+    assert round_trips == 1
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_chunks_use_one_round_trip_each(standin, mode):
+    server, vault = standin
+    reader = make_reader(server, mode)
+    reader.chunk_size = 2
+    reader.preview_redeem_many(AMOUNTS[:2])
+
+    _, round_trips = count_round_trips(vault, lambda: reader.preview_redeem_many(AMOUNTS))
+
+    assert round_trips == 3  # 5 个金额，每批 2 个
+
+
+def test_local_mode_refreshes_state_lazily(standin):
+    server, vault = standin
+    web3 = Web3(Web3.HTTPProvider(f'{server.url}/rpc', cache_allowed_requests=True))
+    reader = SusdeVaultReader(web3, rate_mode='local', max_age=60, verify_every=0)
+
+    # 没有后台轮询：读取之前不产生请求
+    assert vault.rpc_requests == 0
+    first, round_trips = count_round_trips(vault, lambda: reader.preview_redeem_many(AMOUNTS))
+    assert first == [reader.from_wei(vault.convert_to_assets(reader.to_wei(amount))) for amount in AMOUNTS]
+
+    # 缓存有效期内不再请求
+    _, round_trips = count_round_trips(vault, lambda: reader.preview_redeem_many(AMOUNTS))
+    assert round_trips == 0
+
+    # 过期后下一次计算用一次eth_call刷新
+    vault.advance_block(asset_growth=10 ** 24)
+    reader.max_age = 0
+    refreshed, round_trips = count_round_trips(vault, lambda: reader.preview_redeem_many(AMOUNTS))
+    assert round_trips == 1
+    assert refreshed == [reader.from_wei(vault.convert_to_assets(reader.to_wei(amount))) for amount in AMOUNTS]
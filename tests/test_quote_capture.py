@@ -0,0 +1,107 @@
+"""
+报价捕获测试
+
+extract_quote 只认报价字段；NetworkQuoteCapture 对 local_standins.py 的1inch页面替身运行，
+报价接口带有延迟，验证捕获到的输出与替身报价一致，且比固定等待的DOM读取路径更快返回。
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip('eth_abi')
+pytest.importorskip('dotenv')
+
+from config import TokenConfig
+from local_standins import StandinQuoteBook, StandinServer, add_oneinch_routes
+from quote_capture import NetworkQuoteCapture, extract_quote, from_raw_amount, to_raw_amount
+
+USDT_DECIMALS = TokenConfig.USDT['decimals']
+SUSDE_DECIMALS = TokenConfig.SUSDE['decimals']
+AMOUNT = 100000
+QUOTE_DELAY = 0.3
+# exchange_service 在非网络模式下输入金额后固定等待的时长
+FIXED_WAIT_MS = 3000
+
+
+def test_extract_quote_from_standin_response():
+    book = StandinQuoteBook()
+    raw = to_raw_amount(AMOUNT, USDT_DECIMALS)
+    payload = book.quote('USDT', 'SUSDE', raw)
+
+    output = extract_quote(payload, 'http://127.0.0.1/quote', None, raw, USDT_DECIMALS, SUSDE_DECIMALS)
+    assert output == from_raw_amount(payload['dstAmount'], SUSDE_DECIMALS)
+
+    # 输入金额不符的报价（如上一次输入的防抖请求）不匹配
+    assert extract_quote(payload, 'http://127.0.0.1/quote', None, raw + 10, USDT_DECIMALS, SUSDE_DECIMALS) is None
+
+
+def test_extract_quote_ignores_generic_amount_fields():
+    raw = to_raw_amount(AMOUNT, USDT_DECIMALS)
+    # 手续费、gas估算等响应中的通用 amount 字段与输入金额恰好相同时也不能当作报价
+    fee_payload = {'fee': {'amount': str(raw)}, 'returnAmount': '123'}
+    assert extract_quote(fee_payload, 'https://app.1inch.io/api/quote-fees', None, raw,
+                         USDT_DECIMALS, SUSDE_DECIMALS) is None
+    assert extract_quote({'returnAmount': '123'}, 'https://app.1inch.io/api/quote-fees', {'amount': str(raw)},
+                         raw, USDT_DECIMALS, SUSDE_DECIMALS) is None
+
+    # 报价请求URL中的 amount 查询参数仍然有效
+    assert extract_quote({'dstAmount': str(10 ** 18)}, f'https://api.1inch.dev/quote?amount={raw}', None, raw,
+                         USDT_DECIMALS, SUSDE_DECIMALS) == 1.0
+
+
+@pytest.fixture
+def swap_page():
+    sync_api = pytest.importorskip('playwright.sync_api')
+    book = StandinQuoteBook(delay=QUOTE_DELAY)
+    server = StandinServer()
+    add_oneinch_routes(server, book)
+    server.start()
+
+    playwright = sync_api.sync_playwright().start()
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as e:
+        playwright.stop()
+        server.stop()
+        pytest.skip(f'无法启动Chromium: {e}')
+
+    def open_page():
+        page = browser.new_page()
+        page.goto(f'{server.url}/swap?src=USDT&dst=SUSDE')
+        page.wait_for_selector('.token-amount-input input')
+        page.click('#src-amount')
+        return page
+
+    yield book, open_page
+    browser.close()
+    playwright.stop()
+    server.stop()
+
+
+def test_network_capture_beats_fixed_wait(swap_page):
+    book, open_page = swap_page
+    expected = from_raw_amount(book.quote('USDT', 'SUSDE', to_raw_amount(AMOUNT, USDT_DECIMALS))['dstAmount'],
+                               SUSDE_DECIMALS)
+
+    # 网络捕获：输入前开始监听，报价响应到达即返回
+    page = open_page()
+    started = time.perf_counter()
+    capture = NetworkQuoteCapture(page, AMOUNT, USDT_DECIMALS, SUSDE_DECIMALS)
+    page.keyboard.type(str(AMOUNT))
+    captured = capture.wait(8000)
+    captured_seconds = time.perf_counter() - started
+
+    # 固定等待：输入后等待固定时长再读取输出框
+    page = open_page()
+    started = time.perf_counter()
+    page.keyboard.type(str(AMOUNT))
+    page.wait_for_timeout(FIXED_WAIT_MS)
+    dom_output = float(page.input_value('#dst-amount'))
+    fixed_seconds = time.perf_counter() - started
+
+    assert captured == expected
+    # 页面只显示6位小数，网络捕获得到完整精度
+    assert dom_output == pytest.approx(expected, abs=1e-6)
+    assert capture.responses_seen == 1
+    assert QUOTE_DELAY <= captured_seconds < fixed_seconds
@@ -0,0 +1,108 @@
+"""
+HttpAggregatorQuoteProvider 测试
+
+对 local_standins.py 的报价接口替身（/quote）运行：正常报价与替身报价一致并复用同一连接池，
+5xx 响应按重试策略重试，响应体格式错误或缺少输出金额时返回None。
+"""
+
+import pytest
+
+pytest.importorskip('requests')
+pytest.importorskip('eth_abi')
+pytest.importorskip('dotenv')
+
+from config import TokenConfig
+from local_standins import StandinQuoteBook, StandinServer, add_oneinch_routes
+from quote_capture import from_raw_amount, to_raw_amount
+from quote_providers import HttpAggregatorQuoteProvider
+
+PAIR = 'USDT_TO_SUSDE'
+AMOUNT = 1000.0
+
+
+@pytest.fixture
+def standin():
+    server = StandinServer()
+    book = StandinQuoteBook()
+    add_oneinch_routes(server, book)
+    server.start()
+    provider = HttpAggregatorQuoteProvider(base_url=server.url, api_key=None, timeout=5, pool_size=4)
+    yield server, book, provider
+    provider.close()
+    server.stop()
+
+
+def replace_quote_route(server: StandinServer, respond):
+    """用 respond(attempt, original, query, body, headers) 替换 /quote，返回请求计数"""
+    original = server.routes[('GET', '/quote')]
+    calls = {'count': 0}
+
+    def handler(query, body, headers):
+        calls['count'] += 1
+        return respond(calls['count'], original, query, body, headers)
+
+    server.add_route('GET', '/quote', handler)
+    return calls
+
+
+def expected_output(amount: float) -> float:
+    raw = to_raw_amount(amount, TokenConfig.USDT['decimals'])
+    dst_raw = StandinQuoteBook().quote('USDT', 'SUSDE', raw)['dstAmount']
+    return from_raw_amount(dst_raw, TokenConfig.SUSDE['decimals'])
+
+
+def test_quote_matches_standin_and_reuses_pool(standin):
+    server, book, provider = standin
+
+    quote = provider.get_quote(PAIR, AMOUNT)
+    assert quote == {
+        'input_amount': AMOUNT,
+        'output_amount': expected_output(AMOUNT),
+        'exchange_rate': expected_output(AMOUNT) / AMOUNT,
+        'source': 'http',
+    }
+    assert provider.get_quote(PAIR, AMOUNT * 2)['output_amount'] == expected_output(AMOUNT * 2)
+    assert book.quotes_served == 2
+
+    # 同一主机的请求共用一个连接池
+    adapter = provider.session.get_adapter(server.url)
+    assert len(adapter.poolmanager.pools) == 1
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 4
+
+
+def test_retries_server_errors(standin):
+    server, book, provider = standin
+
+    def flaky(attempt, original, *args):
+        if attempt == 1:
+            return 503, 'application/json', {'error': 'unavailable'}
+        return original(*args)
+
+    calls = replace_quote_route(server, flaky)
+    assert provider.get_quote(PAIR, AMOUNT)['output_amount'] == expected_output(AMOUNT)
+    assert calls['count'] == 2
+    assert book.quotes_served == 1
+
+
+def test_gives_up_after_retries(standin):
+    server, book, provider = standin
+    calls = replace_quote_route(server, lambda *args: (502, 'application/json', {'error': 'bad gateway'}))
+
+    assert provider.get_quote(PAIR, AMOUNT) is None
+    # 首次请求加 Retry(total=2) 的两次重试
+    assert calls['count'] == 3
+
+
+@pytest.mark.parametrize('content_type, payload', [
+    ('application/json', '{"dstAmount": '),
+    ('text/html', '<html>rate limited</html>'),
+    ('application/json', {'srcAmount': '1000000000'}),
+    ('application/json', {'dstAmount': 'not-a-number'}),
+])
+def test_malformed_body_returns_none(standin, content_type, payload):
+    server, book, provider = standin
+    calls = replace_quote_route(server, lambda *args: (200, content_type, payload))
+
+    assert provider.get_quote(PAIR, AMOUNT) is None
+    # 格式错误不是可重试的状态码
+    assert calls['count'] == 1
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+进程内列式时间序列
+
+每个 ArbitrageResult 记录为一行：时间戳、金额、三段汇率、利润、年化收益率，
+每列存放在一个 array('d') 中。超出保留时长或最大点数的旧数据从头部批量截掉。
+时间窗口用二分查找定位，统计量在数组切片上用内置函数计算，不经过数据库。
+"""
+
+import bisect
+import math
+import threading
+import time
+from array import array
+from itertools import accumulate, compress
+from typing import Any, Dict, List, Optional, Sequence
+
+from models import ArbitrageResult
+
+FIELDS = ('amount', 'usdt_to_susde', 'susde_to_usde', 'usde_to_usdt', 'profit_loss', 'annualized_return')
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """线性插值百分位，q 取 0-100"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Any]:
+    """均值、极值、标准差、波动率（相邻点相对变化的标准差）与常用百分位"""
+    n = len(values)
+    if not n:
+        return {'count': 0}
+
+    mean = math.fsum(values) / n
+    variance = math.fsum((v - mean) ** 2 for v in values) / n
+    changes = [(b - a) / a for a, b in zip(values, values[1:]) if a]
+    if changes:
+        change_mean = math.fsum(changes) / len(changes)
+        volatility = math.sqrt(math.fsum((c - change_mean) ** 2 for c in changes) / len(changes))
+    else:
+        volatility = None
+
+    ordered = sorted(values)
+    return {
+        'count': n,
+        'mean': mean,
+        'min': ordered[0],
+        'max': ordered[-1],
+        'last': values[-1],
+        'stdev': math.sqrt(variance),
+        'volatility': volatility,
+        'p50': percentile(ordered, 50),
+        'p90': percentile(ordered, 90),
+        'p99': percentile(ordered, 99)
+    }
+
+
+def rolling_mean(values: Sequence[float], window: int) -> List[float]:
+    """前缀和计算的滑动平均，前 window-1 个点使用已有的点"""
+    window = max(1, window)
+    sums = [0.0, *accumulate(values)]
+    return [(sums[i + 1] - sums[max(0, i + 1 - window)]) / min(i + 1, window) for i in range(len(values))]
+
+
+def downsample(timestamps: Sequence[float], values: Sequence[float], points: int = 200,
+               rolling: int = 0) -> List[Dict[str, Any]]:
+    """按时间等分为最多 points 个桶，每桶给出均值/极值/末值；rolling>0 时附带桶内末点的滑动平均"""
+    if not values:
+        return []
+
+    smoothed = rolling_mean(values, rolling) if rolling > 0 else None
+    points = max(1, points)
+    first, last = timestamps[0], timestamps[-1]
+    width = (last - first) / points or 1.0
+
+    buckets: List[Dict[str, Any]] = []
+    current = -1
+    for i, (t, v) in enumerate(zip(timestamps, values)):
+        index = min(int((t - first) / width), points - 1)
+        if index != current:
+            current = index
+            buckets.append({'timestamp': first + index * width, 'count': 0, 'sum': 0.0,
+                            'min': v, 'max': v, 'last': v})
+        bucket = buckets[-1]
+        bucket['count'] += 1
+        bucket['sum'] += v
+        bucket['min'] = min(bucket['min'], v)
+        bucket['max'] = max(bucket['max'], v)
+        bucket['last'] = v
+        if smoothed is not None:
+            bucket['rolling_mean'] = smoothed[i]
+
+    for bucket in buckets:
+        bucket['mean'] = bucket.pop('sum') / bucket['count']
+    return buckets
+
+
+class ResultSeries:
+    """套利结果的列式时间序列（线程安全）"""
+
+    def __init__(self, retention_seconds: float = 7 * 86400, max_points: int = 200000):
+        self.retention_seconds = retention_seconds
+        self.max_points = max(1, max_points)
+        self._timestamps = array('d')
+        self._columns: Dict[str, array] = {field: array('d') for field in FIELDS}
+        # 逻辑起点：之前的数据已过期，积累到一定数量后再真正删除
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._timestamps) - self._offset
+
+    def record(self, result: ArbitrageResult):
+        """追加一个套利结果，缺少的汇率记为NaN"""
+        rates = result.leg_rates()
+        row = {
+            'amount': result.initial_amount,
+            'profit_loss': result.profit_loss,
+            'annualized_return': result.annualized_return,
+            **rates
+        }
+        timestamp = result.calculation_time.timestamp()
+
+        with self._lock:
+            if len(self):
+                # 保持时间戳单调，二分查找依赖有序
+                timestamp = max(timestamp, self._timestamps[-1])
+            self._timestamps.append(timestamp)
+            for field, column in self._columns.items():
+                value = row.get(field)
+                column.append(math.nan if value is None else float(value))
+            self._expire(timestamp)
+
+    def record_many(self, results: List[ArbitrageResult]):
+        for result in results:
+            self.record(result)
+
+    def _expire(self, now: float):
+        # 调用方已持有锁
+        cutoff = bisect.bisect_left(self._timestamps, now - self.retention_seconds, self._offset)
+        self._offset = max(cutoff, len(self._timestamps) - self.max_points)
+        if self._offset > 4096 and self._offset * 2 > len(self._timestamps):
+            del self._timestamps[:self._offset]
+            for column in self._columns.values():
+                del column[:self._offset]
+            self._offset = 0
+
+    def window(self, field: str, seconds: Optional[float] = None, amount: Optional[float] = None,
+               now: Optional[float] = None) -> Dict[str, List[float]]:
+        """返回最近 seconds 秒内某列的 (时间戳, 值)，可按金额筛选，NaN被跳过"""
+        if field not in self._columns:
+            raise ValueError(f"未知字段: {field}，可选: {', '.join(FIELDS)}")
+
+        with self._lock:
+            start = self._offset
+            if seconds is not None:
+                now = time.time() if now is None else now
+                start = bisect.bisect_left(self._timestamps, now - seconds, self._offset)
+            timestamps = self._timestamps[start:]
+            values = self._columns[field][start:]
+            amounts = self._columns['amount'][start:] if amount is not None else None
+
+        mask = [v == v for v in values]  # 过滤NaN
+        if amounts is not None:
+            mask = [keep and a == amount for keep, a in zip(mask, amounts)]
+        return {
+            'timestamps': list(compress(timestamps, mask)),
+            'values': list(compress(values, mask))
+        }
+
+    def stats(self, field: str, seconds: Optional[float] = None, amount: Optional[float] = None) -> Dict[str, Any]:
+        """窗口内的汇总统计"""
+        return summarize(self.window(field, seconds, amount)['values'])
+
+    def downsample(self, field: str, seconds: Optional[float] = None, points: int = 200,
+                   amount: Optional[float] = None, rolling: int = 0) -> List[Dict[str, Any]]:
+        """窗口内的降采样序列"""
+        data = self.window(field, seconds, amount)
+        return downsample(data['timestamps'], data['values'], points, rolling)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self)
+            oldest = self._timestamps[self._offset] if size else None
+            newest = self._timestamps[-1] if size else None
+        return {
+            'points': size,
+            'max_points': self.max_points,
+            'retention_seconds': self.retention_seconds,
+            'oldest': oldest,
+            'newest': newest
+        }
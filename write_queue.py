@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+写后（write-behind）批量持久化队列
+
+检查路径只把待写入的行放入有界队列，由后台线程按表合并为多行插入，
+在积累到批量大小或最早一行等待超过最大时长时写入，失败按指数退避重试，
+关闭时尽量写完队列中剩余的数据。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# writer(table, rows) 写入失败时抛出异常
+Writer = Callable[[str, List[Dict[str, Any]]], None]
+
+
+class WriteBehindQueue:
+    """有界写后队列，后台线程批量写入"""
+
+    def __init__(self, writer: Writer, max_size: int = 10000, batch_size: int = 100,
+                 max_age: float = 2.0, max_retries: int = 3, retry_backoff: float = 0.5,
+                 max_backoff: float = 30.0, name: str = 'db-writer'):
+        self.writer = writer
+        self.max_size = max(1, max_size)
+        self.batch_size = max(1, batch_size)
+        self.max_age = max_age
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.name = name
+
+        # (表名, 行, 入队时间)
+        self._items: Deque[Tuple[str, Dict[str, Any], float]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._in_flight = 0
+        # 正在等待的 flush() 调用数，大于0时不等批量大小或最大时长，立即写入
+        self._flush_waiters = 0
+        self._flush_listeners: List[Callable[[str, int], None]] = []
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'retries': 0,
+            'last_flush_ms': None,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'last_error': None
+        }
+
+    def put(self, table: str, row: Dict[str, Any]) -> bool:
+        """放入一行待写数据；队列已满或已关闭时丢弃并返回False"""
+        with self._cond:
+            if self._closing:
+                self._stats['dropped'] += 1
+                logger.warning(f"写入队列已关闭，丢弃 {table} 记录")
+                return False
+            if len(self._items) >= self.max_size:
+                self._stats['dropped'] += 1
+                logger.warning(f"写入队列已满({self.max_size})，丢弃 {table} 记录")
+                return False
+
+            self._items.append((table, row, time.monotonic()))
+            self._stats['enqueued'] += 1
+            self._ensure_thread()
+            if len(self._items) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def add_flush_listener(self, listener: Callable[[str, int], None]):
+        """注册写入成功回调 listener(table, row_count)"""
+        self._flush_listeners.append(listener)
+
+    def _ensure_thread(self):
+        # 调用方已持有锁
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> Optional[List[Tuple[str, Dict[str, Any], float]]]:
+        """等待直到满足写入条件，返回下一批；关闭且队列为空时返回None"""
+        with self._cond:
+            while True:
+                if self._items and (self._closing or self._flush_waiters
+                                    or len(self._items) >= self.batch_size):
+                    break
+                if self._items:
+                    wait_time = self.max_age - (time.monotonic() - self._items[0][2])
+                    if wait_time <= 0:
+                        break
+                    self._cond.wait(wait_time)
+                elif self._closing:
+                    return None
+                else:
+                    self._cond.wait()
+
+            count = min(self.batch_size, len(self._items))
+            batch = [self._items.popleft() for _ in range(count)]
+            self._in_flight = count
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            # 按表分组，保持各表内的入队顺序
+            groups: Dict[str, List[Tuple[str, Dict[str, Any], float]]] = {}
+            for item in batch:
+                groups.setdefault(item[0], []).append(item)
+
+            for table, items in groups.items():
+                if not self._write_with_retry(table, [row for _, row, _ in items]):
+                    self._requeue(table, items)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _write_with_retry(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                self.writer(table, rows)
+            except Exception as e:
+                self._stats['last_error'] = str(e)
+                logger.error(f"批量写入 {table} 失败 ({len(rows)} 行, 第{attempt + 1}次): {e}")
+                if attempt == self.max_retries or self._closing:
+                    break
+                self._stats['retries'] += 1
+                time.sleep(min(self.max_backoff, self.retry_backoff * (2 ** attempt)))
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._stats['flushes'] += 1
+            self._stats['written'] += len(rows)
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['total_flush_ms'] += elapsed_ms
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            logger.debug(f"批量写入 {table} {len(rows)} 行，耗时 {elapsed_ms:.1f}ms")
+            for listener in self._flush_listeners:
+                try:
+                    listener(table, len(rows))
+                except Exception as e:
+                    logger.error(f"写入回调出错: {e}")
+            return True
+
+        self._stats['failed_flushes'] += 1
+        return False
+
+    def _requeue(self, table: str, items: List[Tuple[str, Dict[str, Any], float]]):
+        """重试用尽后放回队首，稍后再试；关闭过程中或队列已满时丢弃"""
+        with self._cond:
+            room = self.max_size - len(self._items)
+            if self._closing or room <= 0:
+                self._stats['dropped'] += len(items)
+                logger.error(f"放弃写入 {table} {len(items)} 行")
+                return
+            kept = items[:room]
+            self._stats['dropped'] += len(items) - len(kept)
+            self._items.extendleft(reversed(kept))
+            # 数据库不可用时不要立即再次写入
+            self._cond.wait(min(self.max_backoff, self.retry_backoff * (2 ** self.max_retries)))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即写入队列中的全部数据并等待完成，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._items:
+                self._ensure_thread()
+            # 等待期间后台线程不再等批量大小或最大时长；入队时间保持不变
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._items or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """停止接收新数据并写完剩余队列，返回是否全部写完"""
+        with self._cond:
+            dropped_before = self._stats['dropped']
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            remaining = len(self._items) + self._in_flight
+        if remaining:
+            logger.error(f"关闭写入队列时仍有 {remaining} 行未写入")
+        return remaining == 0 and self._stats['dropped'] == dropped_before
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._items)
+            oldest_age = time.monotonic() - self._items[0][2] if self._items else 0.0
+            in_flight = self._in_flight
+        flushes = self._stats['flushes']
+        return {
+            'depth': depth,
+            'in_flight': in_flight,
+            'max_size': self.max_size,
+            'oldest_age_seconds': round(oldest_age, 3),
+            'avg_flush_ms': self._stats['total_flush_ms'] / flushes if flushes else None,
+            **{key: value for key, value in self._stats.items() if key != 'total_flush_ms'}
+        }